@@ -1,20 +1,18 @@
 # app.py
 from flask import Flask, request, jsonify
-import pandas as pd
-import joblib
+
+from model_registry import registry
 
 app = Flask(__name__)
-model = joblib.load("emission_model.pkl")
-columns = joblib.load("model_columns.pkl")
 
 @app.route("/predict", methods=["POST"])
 def predict():
     data = request.json  # e.g., {"Plastic":2, "Metal":1}
-    # Convert to DataFrame
-    df = pd.DataFrame([data])
-    df = pd.get_dummies(df).reindex(columns=columns, fill_value=0)
-    pred = model.predict(df)[0]
-    return jsonify({"predicted_emission_CO2e": round(pred, 2)})
+    # Same encoder and fixed-width vector as /api/predict-emission in ml_api.py
+    emission = registry.get("emission")
+    row, unknown_fields = emission["encoder"].encode(data)
+    pred = emission["forest"].predict(row)[0]
+    return jsonify({"predicted_emission_CO2e": round(float(pred), 2), "unknown_fields": unknown_fields})
 
 @app.route("/train", methods=["POST"])
 def retrain():
@@ -0,0 +1,358 @@
+# benchmark_models.py
+"""
+Micro-benchmarks for every step of each model's serving hot path
+Each step is timed on its own at several input sizes, together with the
+memory it allocates; results are written as JSON keyed by step and size so
+two runs can be compared and regressions against a saved baseline flagged
+"""
+
+import io
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+from functools import partial
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RESULTS_FILE = "benchmark_results.json"
+BASELINE_FILE = "benchmark_baseline.json"
+
+DEFAULT_SIZES = [1, 32, 1024]
+CLASSIFIER_SIZES = [1, 16]
+
+# A step is flagged when its median time (or peak allocation) grows by more than this
+DEFAULT_THRESHOLD = 0.25
+# Allocation growth below this many bytes is never flagged
+ALLOC_SLACK_BYTES = 4096
+
+
+def measure(fn, repeats=7, min_repeat_s=0.02):
+    """
+    Time fn like timeit: calls per repeat are chosen so one repeat takes at
+    least min_repeat_s; returns per-call times of every repeat (seconds)
+    and the peak memory of one call traced by tracemalloc
+    """
+    fn()  # warm-up: caches, lazy imports, first-touch allocations
+
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_repeat_s or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_repeat_s / 10 else 2
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            timings.append((time.perf_counter() - start) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return timings, loops, max(0, peak - baseline)
+
+
+# ============================================================================
+# BENCHMARK CASES
+# Each generator yields (step, size, fn) for one model, fn being the exact
+# call the API makes for a request of that size
+# ============================================================================
+
+def emission_cases(registry, sizes):
+    from emission_catalog import CATALOG_CSV, NON_FEATURE_COLUMNS
+
+    bundle = registry.get("emission")
+    encoder, forest = bundle["encoder"], bundle["forest"]
+    table = registry.get("item_emission")["table"]
+
+    records = pd.read_csv(CATALOG_CSV).drop(columns=NON_FEATURE_COLUMNS).to_dict("records")
+    for n in sizes:
+        batch = [records[i % len(records)] for i in range(n)]
+        X, _ = encoder.encode_batch(batch)
+        items = [{"item_id": int(table.item_id[i % len(table)]), "quantity": 2} for i in range(n)]
+
+        # A single request goes through encode(), batches through encode_batch()
+        yield "emission.encode", n, partial(encoder.encode, batch[0]) if n == 1 else partial(
+            encoder.encode_batch, batch)
+        yield "emission.predict", n, partial(forest.predict, X)
+        yield "emission.items_quote", n, partial(table.quote, items)
+
+
+def engagement_cases(registry, sizes):
+    from synthetic_data import iter_users
+    from user_engagement_predictor import build_engagement_matrix
+
+    bundle = registry.get("engagement")
+    model, scaler, forest = bundle["model"], bundle["scaler"], bundle["forest"]
+    features = bundle["features"]
+
+    users = pd.DataFrame(next(iter_users(max(sizes), seed=7)))[features].to_dict("records")
+    for n in sizes:
+        batch = users[:n]
+        X = build_engagement_matrix(batch, features)
+        X_scaled = scaler.transform(pd.DataFrame(X, columns=features))
+
+        yield "engagement.build_matrix", n, partial(build_engagement_matrix, batch, features)
+        yield "engagement.scale", n, lambda X=X: scaler.transform(pd.DataFrame(X, columns=features))
+        # /api/predict-engagement: compiled forest on raw features
+        yield "engagement.predict_compiled", n, partial(forest.predict_proba, X)
+        # /api/predict-engagement-batch: compiled forest up to
+        # ECOTRACK_ENGAGEMENT_COMPILED_MAX_BATCH users, sklearn on scaled features above
+        yield "engagement.predict_sklearn", n, partial(model.predict_proba, X_scaled)
+
+
+def hotspot_cases(registry, sizes):
+    from hotspot_stream import hotspot_report_frame
+    from synthetic_data import iter_reports
+
+    bundle = registry.get("hotspot")
+    model, scaler, features = bundle["model"], bundle["scaler"], bundle["features"]
+    table, center_index = bundle["cluster_table"], bundle["center_index"]
+
+    chunk = pd.DataFrame(next(iter_reports(max(sizes), seed=7)))
+    chunk['report_date'] = chunk['report_date'].dt.strftime('%Y-%m-%d')
+    reports = chunk.drop(columns=['report_id']).to_dict("records")
+    for n in sizes:
+        batch = reports[:n]
+        df = hotspot_report_frame(batch)
+        X = scaler.transform(df[features])
+        predictions = model.predict(X)
+        latitude = df['latitude'].to_numpy(dtype=float)
+        longitude = df['longitude'].to_numpy(dtype=float)
+
+        def cluster_lookup(predictions=predictions, latitude=latitude, longitude=longitude):
+            rows = table.rows(predictions)
+            return table.distances_km(rows, latitude, longitude)
+
+        def nearest_centers(latitude=latitude, longitude=longitude):
+            for lat, lng in zip(latitude.tolist(), longitude.tolist()):
+                center_index.query_nearest(lat, lng, k=5)
+
+        yield "hotspot.recency", n, partial(hotspot_report_frame, batch)
+        yield "hotspot.scale", n, lambda df=df: scaler.transform(df[features])
+        yield "hotspot.predict", n, partial(model.predict, X)
+        yield "hotspot.cluster_lookup", n, cluster_lookup
+        yield "hotspot.nearest_centers", n, nearest_centers
+
+
+def classifier_cases(registry, sizes):
+    from PIL import Image
+    from image_preprocessing import load_image_array
+
+    # A phone-camera sized JPEG upload
+    buffer = io.BytesIO()
+    pixels = np.random.default_rng(7).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    jpeg = buffer.getvalue()
+
+    # Preprocessing does not need the model (or TensorFlow)
+    for n in sizes:
+        yield "classifier.preprocess", n, lambda n=n: [load_image_array(io.BytesIO(jpeg)) for _ in range(n)]
+
+    model = registry.get("waste_classifier")["model"]
+    image = load_image_array(io.BytesIO(jpeg))
+    for n in sizes:
+        yield "classifier.inference", n, partial(model.predict_on_batch, np.stack([image] * n))
+
+
+BENCHMARKS = {
+    "emission": emission_cases,
+    "engagement": engagement_cases,
+    "hotspot": hotspot_cases,
+    "waste_classifier": classifier_cases,
+}
+
+
+def result_key(step, size):
+    return f"{step}[n={size}]"
+
+
+def run_benchmarks(models=None, sizes=None, repeats=7, min_repeat_s=0.02, registry=None):
+    """
+    Run the benchmark cases of the selected models
+
+    Returns {"meta": ..., "results": {"<step>[n=<size>]": timings}, "skipped": {model: reason}}.
+    Models whose artifacts cannot be loaded (e.g. TensorFlow missing) are
+    skipped from the first step that needs them. Run from ml_service/ (the
+    emission cases read beachclean_dataset.csv).
+    """
+    if registry is None:
+        from model_registry import registry
+    sizes = sizes or DEFAULT_SIZES
+
+    results, skipped = {}, {}
+    for name, cases in BENCHMARKS.items():
+        if models is not None and name not in models:
+            continue
+        model_sizes = sizes if name != "waste_classifier" else [s for s in CLASSIFIER_SIZES if s <= max(sizes)]
+        try:
+            for step, size, fn in cases(registry, model_sizes):
+                timings, loops, peak = measure(fn, repeats, min_repeat_s)
+                median = float(np.median(timings))
+                results[result_key(step, size)] = {
+                    "step": step,
+                    "size": size,
+                    "median_us": median * 1e6,
+                    "min_us": float(min(timings)) * 1e6,
+                    "max_us": float(max(timings)) * 1e6,
+                    "per_item_us": median * 1e6 / size,
+                    "loops": loops,
+                    "repeats": repeats,
+                    "peak_alloc_bytes": int(peak),
+                }
+                print(f"  {result_key(step, size):40} {median * 1e6:12.1f} µs "
+                      f"{peak / 1024:10.1f} KiB")
+        except Exception as e:
+            skipped[name] = f"{type(e).__name__}: {e}"
+            print(f"  ✗ {name} skipped - {skipped[name]}")
+
+    import sklearn
+
+    meta = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "sizes": sizes,
+        "repeats": repeats,
+    }
+    return {"meta": meta, "results": results, "skipped": skipped}
+
+
+def compare_to_baseline(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Per-step comparison against a baseline run
+
+    Times are compared on the fastest repeat, which is far less sensitive
+    to noise from other processes than the median.
+    Returns a list of {key, time_ratio, alloc_ratio, status} where status is
+    "regression" (time or allocation grew beyond threshold), "improved",
+    "ok", "new" (not in the baseline) or "missing" (not in this run).
+    """
+    comparison = []
+    base_results = baseline.get("results", {})
+    for key, result in report["results"].items():
+        base = base_results.get(key)
+        if base is None:
+            comparison.append({"key": key, "status": "new"})
+            continue
+        time_ratio = result["min_us"] / max(base["min_us"], 1e-9)
+        alloc_growth = result["peak_alloc_bytes"] - base["peak_alloc_bytes"]
+        alloc_ratio = result["peak_alloc_bytes"] / max(base["peak_alloc_bytes"], 1)
+
+        alloc_regressed = alloc_growth > ALLOC_SLACK_BYTES and alloc_ratio > 1 + threshold
+        if time_ratio > 1 + threshold or alloc_regressed:
+            status = "regression"
+        elif time_ratio < 1 / (1 + threshold):
+            status = "improved"
+        else:
+            status = "ok"
+        comparison.append({
+            "key": key,
+            "time_ratio": round(time_ratio, 3),
+            "alloc_ratio": round(alloc_ratio, 3),
+            "status": status,
+        })
+    for key in base_results:
+        if key not in report["results"]:
+            comparison.append({"key": key, "status": "missing"})
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the serving hot path of every model")
+    parser.add_argument("--models", help="comma-separated subset of: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated batch sizes")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--quick", action="store_true", help="fewer, shorter repeats")
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help="compare against this run (if the file exists)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown flagged as a regression (default 0.25)")
+    args = parser.parse_args()
+
+    models = args.models.split(",") if args.models else None
+    sizes = [int(size) for size in args.sizes.split(",")]
+    repeats, min_repeat_s = (3, 0.005) if args.quick else (args.repeats, 0.02)
+
+    print("="*70)
+    print("⏱️  ECOTRACK ML MODELS - HOT PATH BENCHMARKS")
+    print("="*70)
+    report = run_benchmarks(models, sizes, repeats, min_repeat_s)
+
+    exit_code = 0
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = None
+
+    if baseline is not None and not args.save_baseline:
+        report["baseline"] = {"file": args.baseline, "timestamp": baseline["meta"]["timestamp"]}
+        report["comparison"] = compare_to_baseline(report, baseline, args.threshold)
+
+        print("\n" + "="*70)
+        print(f"📋 COMPARISON WITH {args.baseline} ({baseline['meta']['timestamp']})")
+        print("="*70)
+        for field in ("platform", "processor", "python", "numpy", "sklearn"):
+            if baseline["meta"].get(field) != report["meta"][field]:
+                print(f"  ⚠️  baseline {field} differs: {baseline['meta'].get(field)} "
+                      f"vs {report['meta'][field]}")
+        for entry in report["comparison"]:
+            if entry["status"] in ("new", "missing"):
+                print(f"  {entry['key']:40} {entry['status']}")
+                continue
+            mark = {"regression": "✗", "improved": "↑", "ok": "✓"}[entry["status"]]
+            print(f"  {mark} {entry['key']:38} time x{entry['time_ratio']:<6} "
+                  f"alloc x{entry['alloc_ratio']:<6} {entry['status']}")
+        regressions = [e for e in report["comparison"] if e["status"] == "regression"]
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression{'s' if len(regressions) > 1 else ''} "
+                  f"beyond {args.threshold:.0%}")
+            exit_code = 1
+        else:
+            print("\n✓ No regressions")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results saved to {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Baseline saved to {args.baseline}")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
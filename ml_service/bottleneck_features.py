@@ -0,0 +1,232 @@
+# bottleneck_features.py
+"""
+Bottleneck-feature cache for training the waste classifier head
+The frozen MobileNetV2 base runs once over the (unaugmented) images and
+its pooled features are stored as memory-mapped .npy arrays; the
+Dense/Dropout head then trains from those arrays in minutes
+"""
+
+import glob
+import hashlib
+import os
+
+import numpy as np
+from tensorflow import keras
+from tensorflow.keras.layers import GlobalAveragePooling2D, Input
+from tensorflow.keras.models import Model
+
+from model_registry import atomic_json_dump
+from waste_classifier import (
+    WASTE_CATEGORIES,
+    build_image_dataset,
+    create_waste_classifier_model,
+    image_set_digest,
+    list_image_files,
+    save_classifier,
+)
+
+CACHE_DIR = 'bottleneck_cache'
+
+
+def split_model(model):
+    """
+    Split the classifier into (feature_extractor, head)
+
+    feature_extractor: image -> pooled MobileNetV2 features
+    head: features -> class probabilities, built from the *same* layer
+    objects, so training the head trains the full model's top layers.
+    """
+    pool_index = next(
+        i for i, layer in enumerate(model.layers) if isinstance(layer, GlobalAveragePooling2D)
+    )
+    pooled = model.layers[pool_index].output
+    feature_extractor = Model(inputs=model.input, outputs=pooled, name='feature_extractor')
+
+    features_in = Input(shape=pooled.shape[1:], name='bottleneck_features')
+    x = features_in
+    for layer in model.layers[pool_index + 1:]:
+        x = layer(x)
+    head = Model(inputs=features_in, outputs=x, name='classifier_head')
+
+    return feature_extractor, head
+
+
+def base_model_digest(feature_extractor):
+    """
+    Digest of the frozen base (architecture + weights)
+
+    Changes whenever the base weights change, including every offline
+    (weights=None) build, so features from another base are never reused.
+    """
+    digest = hashlib.sha1(feature_extractor.to_json().encode())
+    for weights in feature_extractor.get_weights():
+        digest.update(np.ascontiguousarray(weights).tobytes())
+    return digest.hexdigest()[:12]
+
+
+def _cache_paths(cache_dir, split, key):
+    prefix = os.path.join(os.path.abspath(cache_dir), f"{split}_{key}")
+    return prefix + '_features.npy', prefix + '_labels.npy', prefix + '.json'
+
+
+def _remove_stale(cache_dir, split, key):
+    for path in glob.glob(os.path.join(cache_dir, f"{split}_*")):
+        if not os.path.basename(path).startswith(f"{split}_{key}"):
+            os.remove(path)
+
+
+def extract_features(feature_extractor, directory, cache_dir=CACHE_DIR, batch_size=64,
+                     base_digest=None):
+    """
+    Pooled features and labels for every image under directory/<category>/
+
+    Returns memory-mapped (features, labels) arrays. They are computed only
+    when no complete cache exists for this image set and base model; the
+    manifest is written last, so an interrupted run is simply redone.
+    """
+    paths, _ = list_image_files(directory)
+    if not paths:
+        raise ValueError(f"No images found under {directory}")
+
+    base_digest = base_digest or base_model_digest(feature_extractor)
+    key = f"{image_set_digest(paths)}_{base_digest}"
+    split = os.path.basename(os.path.normpath(directory))
+    features_path, labels_path, manifest_path = _cache_paths(cache_dir, split, key)
+
+    if os.path.exists(manifest_path):
+        print(f"✓ Using cached {split} features ({len(paths)} images)")
+        return np.load(features_path, mmap_mode='r'), np.load(labels_path, mmap_mode='r')
+
+    os.makedirs(cache_dir, exist_ok=True)
+    _remove_stale(cache_dir, split, key)
+
+    n_features = feature_extractor.output_shape[-1]
+    features = np.lib.format.open_memmap(
+        features_path, mode='w+', dtype=np.float32, shape=(len(paths), n_features)
+    )
+    labels = np.lib.format.open_memmap(
+        labels_path, mode='w+', dtype=np.float32, shape=(len(paths), len(WASTE_CATEGORIES))
+    )
+
+    dataset = build_image_dataset(directory, batch_size=batch_size, training=False)
+    row = 0
+    for images, batch_labels in dataset:
+        n = len(images)
+        features[row:row + n] = feature_extractor.predict_on_batch(images)
+        labels[row:row + n] = batch_labels.numpy()
+        row += n
+    features.flush()
+    labels.flush()
+    del features, labels
+
+    atomic_json_dump({
+        'split': split,
+        'n_images': len(paths),
+        'n_features': int(n_features),
+        'image_set': image_set_digest(paths),
+        'base_model': base_digest,
+        'categories': WASTE_CATEGORIES,
+    }, manifest_path)
+    print(f"✓ Extracted {split} features for {len(paths)} images -> {features_path}")
+
+    return np.load(features_path, mmap_mode='r'), np.load(labels_path, mmap_mode='r')
+
+
+class FeatureBatches(keras.utils.Sequence):
+    """
+    Batches from memory-mapped feature arrays, without loading them whole
+    """
+
+    def __init__(self, features, labels, batch_size=256, shuffle=False, seed=42):
+        super().__init__()
+        self.features = features
+        self.labels = labels
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+        self.order = np.arange(len(features))
+        self.on_epoch_end()
+
+    def __len__(self):
+        return int(np.ceil(len(self.order) / self.batch_size))
+
+    def __getitem__(self, index):
+        # Sorted indices keep the memmap reads sequential within a batch
+        rows = np.sort(self.order[index * self.batch_size:(index + 1) * self.batch_size])
+        return np.asarray(self.features[rows]), np.asarray(self.labels[rows])
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self.rng.shuffle(self.order)
+
+
+def train_head_from_features(data_dir='waste_images', epochs=20, weights='imagenet',
+                             cache_dir=CACHE_DIR, batch_size=256):
+    """
+    Train only the classifier head from cached bottleneck features
+
+    Same model, loss and callbacks as train_waste_classifier, but without
+    augmentation (features are computed once from the original images).
+    Saves the full model, ready for serving.
+    """
+    model = create_waste_classifier_model(weights=weights)
+    feature_extractor, head = split_model(model)
+    head.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.001),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+
+    base_digest = base_model_digest(feature_extractor)
+    train_features, train_labels = extract_features(
+        feature_extractor, f'{data_dir}/train', cache_dir=cache_dir, base_digest=base_digest
+    )
+    val_features, val_labels = extract_features(
+        feature_extractor, f'{data_dir}/validation', cache_dir=cache_dir, base_digest=base_digest
+    )
+
+    callbacks = [
+        keras.callbacks.EarlyStopping(
+            monitor='val_loss',
+            patience=5,
+            restore_best_weights=True
+        ),
+        keras.callbacks.ReduceLROnPlateau(
+            monitor='val_loss',
+            factor=0.5,
+            patience=3,
+            min_lr=1e-7
+        ),
+    ]
+
+    history = head.fit(
+        FeatureBatches(train_features, train_labels, batch_size=batch_size, shuffle=True),
+        epochs=epochs,
+        validation_data=FeatureBatches(val_features, val_labels, batch_size=batch_size),
+        callbacks=callbacks
+    )
+
+    # The head shares its layers with the full model, which is now trained
+    save_classifier(model)
+
+    print("\n✓ Waste classifier head trained from cached features and saved!")
+    print(f"Final Training Accuracy: {history.history['accuracy'][-1]:.4f}")
+    print(f"Final Validation Accuracy: {history.history['val_accuracy'][-1]:.4f}")
+
+    return model, history
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the waste classifier head from cached MobileNetV2 features")
+    parser.add_argument('data_dir', nargs='?', default='waste_images')
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--offline', action='store_true',
+                        help="build MobileNetV2 with weights=None instead of downloading ImageNet weights")
+    args = parser.parse_args()
+
+    train_head_from_features(
+        data_dir=args.data_dir, epochs=args.epochs,
+        weights=None if args.offline else 'imagenet'
+    )
@@ -0,0 +1,299 @@
+# compiled_forest.py
+"""
+Compiled array-based inference for the RandomForest models
+Flattens a fitted sklearn forest into compact NumPy node arrays and
+evaluates them without sklearn at serve time
+"""
+
+import numpy as np
+
+from model_registry import artifact_path, atomic_npz_dump, load_npz
+
+
+def _floor_float32(values):
+    """
+    Round float64 thresholds down to the nearest float32
+
+    For any float32 input x, x <= floor32(t) holds exactly when x <= t,
+    so casting thresholds this way never changes which branch is taken.
+    """
+    rounded = values.astype(np.float32)
+    too_high = rounded.astype(np.float64) > values
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+def _fold_scaler(threshold, feature, scaler):
+    """
+    Map split thresholds from scaled to raw feature space
+
+    sklearn goes left when float32((x - mean) / scale) <= t. The naive
+    t * scale + mean can land a hair below a training value that sits
+    exactly on the threshold, so the exact raw boundary (the largest x
+    that still goes left) is found by bisection, all nodes at once.
+    The boundary is a float64: rounding it to float32 would misroute raw
+    inputs like 3.7 whose float32 value lies on the other side of it.
+    """
+    mean = scaler.mean_[feature]
+    scale = scaler.scale_[feature]
+
+    def goes_left(x):
+        return ((x - mean) / scale).astype(np.float32) <= threshold
+
+    estimate = threshold * scale + mean
+    span = (np.abs(threshold) + 1.0) * scale * 1e-5
+    lo = estimate - span
+    hi = estimate + span
+    for _ in range(100):
+        mid = lo + (hi - lo) / 2
+        left = goes_left(mid)
+        lo = np.where(left, mid, lo)
+        hi = np.where(left, hi, mid)
+    return lo
+
+
+class CompiledForest:
+    """
+    A whole forest stored as flat node arrays
+
+    All trees share one set of arrays; roots holds each tree's first node.
+    Leaves point to themselves, so every row walks exactly `depth` steps.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, depth,
+                 n_features, kind, classes=None):
+        self.feature = feature        # int32, split feature per node
+        self.threshold = threshold    # float32 (float64 with a folded scaler), go left if x[feature] <= threshold
+        self.left = left              # int32, global index of left child
+        self.right = right            # int32, global index of right child
+        self.value = value            # float32 (n_nodes, n_outputs), leaf values
+        self.roots = roots            # int32, root node of each tree
+        self.depth = int(depth)
+        self.n_features = int(n_features)
+        self.kind = kind              # 'regressor' or 'classifier'
+        self.classes = classes
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def classes_(self):
+        """sklearn-style alias of classes"""
+        return self.classes
+
+    def _leaves(self, X):
+        """
+        Leaf node reached in every tree, shape (n_rows, n_trees)
+        """
+        # Same precision as the thresholds: float32 like sklearn's trees, or
+        # float64 raw features when the scaler is folded in
+        X = np.asarray(X, dtype=self.threshold.dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but the forest expects {self.n_features}"
+            )
+
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def _mean_leaf_value(self, X):
+        return self.value[self._leaves(X)].mean(axis=1, dtype=np.float64)
+
+    def predict(self, X):
+        """
+        Same output as the sklearn forest's predict
+        """
+        if self.kind == "classifier":
+            return self.classes.take(np.argmax(self._mean_leaf_value(X), axis=1))
+        out = self._mean_leaf_value(X)
+        return out[:, 0] if out.shape[1] == 1 else out
+
+    def predict_proba(self, X):
+        """
+        Same output as RandomForestClassifier.predict_proba
+        """
+        if self.kind != "classifier":
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._mean_leaf_value(X)
+
+    def save(self, filename):
+        """
+        Write the node arrays to an aligned, uncompressed .npz artifact, atomically
+
+        API workers memory-map the node arrays, so all of them share one copy.
+        """
+        arrays = {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "right": self.right,
+            "value": self.value,
+            "roots": self.roots,
+            "meta": np.array([self.depth, self.n_features], dtype=np.int64),
+            "kind": np.array(self.kind),
+        }
+        if self.classes is not None:
+            arrays["classes"] = self.classes
+
+        return atomic_npz_dump(arrays, filename)
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_arrays(load_npz(path))
+
+    @classmethod
+    def from_arrays(cls, data):
+        depth, n_features = data["meta"]
+        return cls(
+            feature=data["feature"],
+            threshold=data["threshold"],
+            left=data["left"],
+            right=data["right"],
+            value=data["value"],
+            roots=data["roots"],
+            depth=depth,
+            n_features=n_features,
+            kind=str(data["kind"]),
+            classes=data.get("classes"),
+        )
+
+
+def compile_forest(forest, scaler=None):
+    """
+    Flatten a fitted RandomForestRegressor/RandomForestClassifier
+
+    If a fitted StandardScaler is given, it is folded into the split
+    thresholds so the compiled forest takes raw (unscaled) features; the
+    thresholds then stay float64.
+    """
+    is_classifier = hasattr(forest, "classes_")
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes) + offset
+        is_leaf = tree.children_left == -1
+
+        feature = np.where(is_leaf, 0, tree.feature)
+        threshold = np.where(is_leaf, 0.0, tree.threshold)
+        if scaler is not None:
+            threshold = np.where(is_leaf, 0.0, _fold_scaler(threshold, feature, scaler))
+
+        if is_classifier:
+            value = tree.value[:, 0, :]
+            value = value / value.sum(axis=1, keepdims=True)
+        else:
+            value = tree.value[:, :, 0]
+
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+        rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+        values.append(value)
+        roots.append(offset)
+
+        offset += n_nodes
+        depth = max(depth, tree.max_depth)
+
+    return CompiledForest(
+        feature=np.concatenate(features).astype(np.int32),
+        threshold=(
+            _floor_float32(np.concatenate(thresholds)) if scaler is None
+            else np.concatenate(thresholds).astype(np.float64)
+        ),
+        left=np.concatenate(lefts).astype(np.int32),
+        right=np.concatenate(rights).astype(np.int32),
+        value=np.concatenate(values).astype(np.float32),
+        roots=np.array(roots, dtype=np.int32),
+        depth=depth,
+        n_features=forest.n_features_in_,
+        kind="classifier" if is_classifier else "regressor",
+        classes=forest.classes_ if is_classifier else None,
+    )
+
+
+def check_parity(forest, compiled, X, scaler=None):
+    """
+    Compare compiled outputs with sklearn on X (raw features)
+
+    Returns the max absolute difference in predictions (regressor) or
+    probabilities (classifier).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    X_model = scaler.transform(X) if scaler is not None else X
+
+    if compiled.kind == "classifier":
+        expected = forest.predict_proba(X_model)
+        actual = compiled.predict_proba(X)
+    else:
+        expected = forest.predict(X_model)
+        actual = compiled.predict(X)
+
+    return float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+
+
+def export_compiled_forests():
+    """
+    Compile the saved emission and engagement forests and check parity
+    """
+    import joblib
+    import json
+    import pandas as pd
+    import warnings
+
+    from emission_catalog import CATALOG_CSV, NON_FEATURE_COLUMNS
+    from model_registry import publishing
+    from user_engagement_predictor import generate_sample_user_data
+
+    # Emission: parity on the training catalog
+    emission_model = joblib.load(artifact_path("emission_model.pkl"))
+    emission_columns = joblib.load(artifact_path("model_columns.pkl"))
+    df = pd.read_csv(artifact_path(CATALOG_CSV))
+    X_emission = pd.get_dummies(
+        df.drop(columns=NON_FEATURE_COLUMNS)
+    ).reindex(columns=emission_columns, fill_value=0).to_numpy(dtype=np.float64)
+
+    emission_forest = compile_forest(emission_model)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # sklearn warns about missing feature names
+        emission_diff = check_parity(emission_model, emission_forest, X_emission)
+    with publishing("emission"):
+        emission_forest.save("emission_forest.npz")
+    print(f"✓ Emission forest exported ({emission_forest.n_trees} trees, "
+          f"{len(emission_forest.feature)} nodes), max |diff| vs sklearn: {emission_diff:.2e}")
+
+    # Engagement: scaler folded into thresholds, parity on synthetic users
+    engagement_model = joblib.load(artifact_path("engagement_model.pkl"))
+    engagement_scaler = joblib.load(artifact_path("engagement_scaler.pkl"))
+    with open(artifact_path("engagement_features.json"), "r") as f:
+        engagement_features = json.load(f)
+    X_engagement = generate_sample_user_data(n_samples=1000)[engagement_features]
+
+    engagement_forest = compile_forest(engagement_model, scaler=engagement_scaler)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        engagement_diff = check_parity(
+            engagement_model, engagement_forest, X_engagement.to_numpy(dtype=np.float64),
+            scaler=engagement_scaler
+        )
+    with publishing("engagement"):
+        engagement_forest.save("engagement_forest.npz")
+    print(f"✓ Engagement forest exported ({engagement_forest.n_trees} trees, "
+          f"{len(engagement_forest.feature)} nodes), max |diff| vs sklearn: {engagement_diff:.2e}")
+
+    return emission_diff, engagement_diff
+
+
+if __name__ == "__main__":
+    export_compiled_forests()
@@ -0,0 +1,192 @@
+# density_hotspots.py
+"""
+Density-based hotspot detection (DBSCAN on geographic coordinates)
+Finds hotspots of any shape and count, and leaves stray reports as noise
+instead of forcing them into a cluster like K-Means with a fixed k
+"""
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from hotspot_clusters import EARTH_RADIUS_KM
+
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000
+
+# Label for reports that belong to no hotspot
+NOISE = -1
+
+
+class DensityHotspotModel:
+    """
+    Serves a fitted DBSCAN clustering like a K-Means model
+
+    predict() takes [latitude, longitude] rows in degrees and returns the
+    cluster of the nearest core point if it lies within eps, else NOISE,
+    which is how DBSCAN itself assigns border points.
+    """
+
+    density_based = True
+
+    def __init__(self, core_latitude, core_longitude, core_labels, eps_m, min_samples,
+                 core_weights=None):
+        self.core_labels = np.asarray(core_labels, dtype=np.int64)
+        self.eps_m = float(eps_m)
+        self.min_samples = int(min_samples)
+        self.tree = BallTree(
+            np.radians(np.column_stack([core_latitude, core_longitude])), metric='haversine'
+        )
+
+        if core_weights is None:
+            core_weights = np.ones(len(self.core_labels))
+        n_clusters = int(self.core_labels.max()) + 1 if len(self.core_labels) else 0
+        weight = np.bincount(self.core_labels, weights=core_weights, minlength=n_clusters)
+        self.cluster_centers_ = np.column_stack([
+            np.bincount(self.core_labels, weights=core_weights * core_latitude, minlength=n_clusters),
+            np.bincount(self.core_labels, weights=core_weights * core_longitude, minlength=n_clusters),
+        ]) / np.maximum(weight, 1e-12)[:, None]
+        self.n_clusters = n_clusters
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if len(self.core_labels) == 0:
+            return np.full(len(X), NOISE, dtype=np.int64)
+        distances, nearest = self.tree.query(np.radians(X[:, :2]), k=1)
+        labels = self.core_labels[nearest[:, 0]]
+        return np.where(distances[:, 0] * EARTH_RADIUS_M <= self.eps_m, labels, NOISE)
+
+
+def snap_coordinates(latitude, longitude, snap_m):
+    """
+    Group reports into cells of about snap_m x snap_m meters
+
+    Returns (cell latitude, cell longitude, reports per cell, cell of each
+    report); a cell sits at the mean position of its reports. snap_m=None
+    only merges identical coordinates.
+    """
+    coords = np.column_stack([latitude, longitude]).astype(np.float64)
+    if snap_m:
+        step = np.degrees(snap_m / EARTH_RADIUS_M)
+        rows = np.floor(coords[:, 0] / step)
+        # Longitude cells widen towards the poles to stay about snap_m wide
+        cos_lat = np.maximum(np.cos(np.radians(rows * step)), 1e-6)
+        keys = np.column_stack([rows, np.floor(coords[:, 1] * cos_lat / step)])
+    else:
+        keys = coords
+    _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    cell_latitude = np.bincount(inverse, weights=coords[:, 0]) / counts
+    cell_longitude = np.bincount(inverse, weights=coords[:, 1]) / counts
+    return cell_latitude, cell_longitude, counts, inverse
+
+
+def fit_density_clusters(latitude, longitude, eps_m=250, min_samples=15, snap_m='auto',
+                         n_jobs=-1):
+    """
+    DBSCAN with the haversine metric on a ball tree
+
+    eps_m: neighbourhood radius in meters
+    snap_m: reports are first merged into weighted cells of this size
+        ('auto' = eps_m / 10); DBSCAN's memory grows with the neighbours per
+        point, which the merge caps at about (eps_m / snap_m)^2 in dense
+        hotspots. Distances shift by less than snap_m. None merges only
+        identical coordinates, which is exact.
+    Returns (labels per report, DensityHotspotModel).
+    """
+    from sklearn.cluster import DBSCAN
+
+    if snap_m == 'auto':
+        snap_m = eps_m / 10
+    cell_latitude, cell_longitude, counts, inverse = snap_coordinates(latitude, longitude, snap_m)
+
+    dbscan = DBSCAN(
+        eps=eps_m / EARTH_RADIUS_M,
+        min_samples=min_samples,
+        metric='haversine',
+        algorithm='ball_tree',
+        n_jobs=n_jobs
+    )
+    dbscan.fit(np.radians(np.column_stack([cell_latitude, cell_longitude])), sample_weight=counts)
+
+    core = dbscan.core_sample_indices_
+    model = DensityHotspotModel(
+        cell_latitude[core], cell_longitude[core], dbscan.labels_[core],
+        eps_m=eps_m, min_samples=min_samples, core_weights=counts[core]
+    )
+    return dbscan.labels_[inverse], model
+
+
+def train_density_hotspot_detector(df=None, eps_m=250, min_samples=15, snap_m='auto', n_jobs=-1,
+                                   store=None, start=None, end=None):
+    """
+    Train the density-based hotspot model and publish it in place of the K-Means one
+
+    Writes the same artifacts and cluster_statistics.json schema as
+    train_hotspot_detector, so the API serves either mode unchanged;
+    reports outside every hotspot get cluster_id -1 ('Unknown' priority).
+    Training reports come from df / store as in train_hotspot_detector.
+    """
+    import time
+    from sklearn.preprocessing import FunctionTransformer
+
+    from model_registry import atomic_joblib_dump, atomic_json_dump, publishing
+    from spatial_index import INDEX_FILE
+    from waste_hotspot_detector import (
+        build_report_index, compute_cluster_statistics, load_training_reports
+    )
+
+    df = load_training_reports(df, store, start, end)
+
+    print(f"Running DBSCAN (eps={eps_m} m, min_samples={min_samples}) on {len(df)} reports...")
+    started = time.perf_counter()
+    labels, model = fit_density_clusters(
+        df['latitude'], df['longitude'], eps_m, min_samples, snap_m, n_jobs
+    )
+    df['cluster'] = labels
+    n_noise = int((labels == NOISE).sum())
+    print(f"✓ {model.n_clusters} hotspots found in {time.perf_counter() - started:.1f}s "
+          f"({n_noise} reports are noise)")
+
+    cluster_stats = compute_cluster_statistics(df[df['cluster'] != NOISE], model.n_clusters)
+
+    print("\nTop hotspots (Sorted by Priority):")
+    print("="*80)
+    for stats in cluster_stats[:10]:
+        print(f"\nCluster {stats['cluster_id']} - {stats['priority']} Priority:")
+        print(f"  Location: ({stats['avg_latitude']:.4f}, {stats['avg_longitude']:.4f})")
+        print(f"  Reports: {stats['num_reports']}")
+        print(f"  Total Waste: {stats['total_waste_kg']:.1f} kg")
+        print(f"  Priority Score: {stats['priority_score']:.2f}")
+
+    # The model works on raw degrees, so the "scaler" is the identity
+    # (validate=True: it returns an array like StandardScaler, not the DataFrame)
+    scaler = FunctionTransformer(validate=True).fit(df[['latitude', 'longitude']])
+    with publishing('hotspot'):
+        atomic_joblib_dump(model, 'hotspot_model.pkl')
+        atomic_joblib_dump(scaler, 'hotspot_scaler.pkl')
+        atomic_json_dump(['latitude', 'longitude'], 'hotspot_features.json')
+        atomic_json_dump(cluster_stats, 'cluster_statistics.json')
+        build_report_index(df).save(INDEX_FILE)
+
+    print("\n✓ Density hotspot model, statistics and spatial index saved!")
+
+    return model, cluster_stats, df
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the density-based (DBSCAN) hotspot model")
+    parser.add_argument('--eps-m', type=float, default=250, help="neighbourhood radius in meters")
+    parser.add_argument('--min-samples', type=int, default=15)
+    parser.add_argument('--store', help="train on the reports in this report store")
+    parser.add_argument('--start', help="first report date to train on (with --store)")
+    parser.add_argument('--end', help="last report date to train on (with --store)")
+    parser.add_argument('--snap-m', type=float, default=None,
+                        help="pre-aggregation cell size in meters (default: eps / 10, 0 = exact)")
+    args = parser.parse_args()
+
+    snap_m = 'auto' if args.snap_m is None else (args.snap_m or None)
+    train_density_hotspot_detector(eps_m=args.eps_m, min_samples=args.min_samples, snap_m=snap_m,
+                                   store=args.store, start=args.start, end=args.end)
@@ -0,0 +1,136 @@
+# emission_catalog.py
+"""
+Precomputed per-item emission table for the beachclean catalog
+Runs the emission model once over every catalog item so that
+"N x item X + M x item Y" queries are answered with plain arithmetic
+"""
+
+import numpy as np
+
+from model_registry import atomic_json_dump
+
+CATALOG_CSV = "beachclean_dataset.csv"
+TABLE_FILE = "item_emission_table.json"
+
+# Columns that are not model inputs
+NON_FEATURE_COLUMNS = ["Emission_Impact_CO2e", "Item_ID", "Item_Name"]
+
+
+def build_item_emission_table(forest, encoder, csv_path=CATALOG_CSV):
+    """
+    Predict the emission of every catalog item in one batch
+
+    Returns a compact, column-oriented dict ready to be saved as JSON.
+    """
+    import pandas as pd
+
+    catalog = pd.read_csv(csv_path)
+    records = catalog.drop(columns=NON_FEATURE_COLUMNS).to_dict("records")
+
+    X, _ = encoder.encode_batch(records)
+    emissions = forest.predict(X)
+
+    return {
+        "item_id": catalog["Item_ID"].astype(int).tolist(),
+        "item_name": catalog["Item_Name"].astype(str).tolist(),
+        "emission_CO2e": [float(e) for e in emissions],
+    }
+
+
+def save_item_emission_table(table, filename=TABLE_FILE):
+    return atomic_json_dump(table, filename)
+
+
+class UnknownItemError(ValueError):
+    """Raised when a quote references an item that is not in the catalog"""
+
+
+class ItemEmissionTable:
+    """
+    Lookup table of model-predicted emission per catalog item
+    """
+
+    def __init__(self, table):
+        self.item_id = np.asarray(table["item_id"], dtype=np.int64)
+        self.item_name = list(table["item_name"])
+        self.emission = np.asarray(table["emission_CO2e"], dtype=np.float64)
+
+        self.row_for_id = {int(item_id): i for i, item_id in enumerate(self.item_id)}
+        self.row_for_name = {name.strip().lower(): i for i, name in enumerate(self.item_name)}
+
+    def __len__(self):
+        return len(self.item_id)
+
+    def row(self, item):
+        """
+        Catalog row for an {"item_id": ...} or {"item_name": ...} entry
+        """
+        if "item_id" in item:
+            row = self.row_for_id.get(int(item["item_id"]))
+        else:
+            row = self.row_for_name.get(str(item["item_name"]).strip().lower())
+        if row is None:
+            key = "item_id" if "item_id" in item else "item_name"
+            raise UnknownItemError(f"Unknown catalog item: {key}={item[key]!r}")
+        return row
+
+    def quote(self, items, forest=None, encoder=None):
+        """
+        Total emission for a list of
+            {"item_id": 1, "quantity": 3}
+            {"item_name": "Bottle Caps", "quantity": 2}
+            {"features": {...}, "quantity": 1}      # off-catalog, uses the model
+
+        Catalog items are pure table arithmetic; only "features" entries
+        touch the model, and all of them go through it in one batch.
+        """
+        quantities = np.array([float(item.get("quantity", 1)) for item in items])
+        per_item = np.zeros(len(items))
+        sources = ["catalog"] * len(items)
+        unknown_fields = [[] for _ in items]
+
+        catalog_idx = [i for i, item in enumerate(items) if "features" not in item]
+        model_idx = [i for i, item in enumerate(items) if "features" in item]
+
+        catalog_rows = {i: self.row(items[i]) for i in catalog_idx}
+        if catalog_idx:
+            rows = np.array([catalog_rows[i] for i in catalog_idx], dtype=np.int64)
+            per_item[catalog_idx] = self.emission[rows]
+
+        if model_idx:
+            if forest is None or encoder is None:
+                raise ValueError("Off-catalog items need the emission model")
+            X, unknown = encoder.encode_batch([items[i]["features"] for i in model_idx])
+            per_item[model_idx] = forest.predict(X)
+            for i, fields in zip(model_idx, unknown):
+                sources[i] = "model"
+                unknown_fields[i] = fields
+
+        totals = per_item * quantities
+        breakdown = []
+        for i in range(len(items)):
+            entry = {
+                "quantity": float(quantities[i]),
+                "emission_per_item_CO2e": round(float(per_item[i]), 4),
+                "emission_CO2e": round(float(totals[i]), 4),
+                "source": sources[i],
+            }
+            if sources[i] == "catalog":
+                row = catalog_rows[i]
+                entry["item_id"] = int(self.item_id[row])
+                entry["item_name"] = self.item_name[row]
+            else:
+                entry["unknown_fields"] = unknown_fields[i]
+            breakdown.append(entry)
+
+        return float(totals.sum()), breakdown
+
+
+if __name__ == "__main__":
+    from model_registry import publishing, registry
+
+    emission = registry.get("emission")
+    table = build_item_emission_table(emission["forest"], emission["encoder"])
+    with publishing("item_emission"):
+        path = save_item_emission_table(table)
+    print(f"✓ Item emission table for {len(table['item_id'])} catalog items saved to {path}")
@@ -0,0 +1,84 @@
+# emission_encoder.py
+"""
+Precomputed one-hot encoder for the CO2 emission model
+Maps (field, value) pairs straight to column slots of the fixed-width
+feature vector defined by model_columns.pkl
+"""
+
+import numpy as np
+
+
+class EmissionEncoder:
+    """
+    Encodes emission requests exactly like
+    pd.get_dummies(pd.DataFrame([data])).reindex(columns=columns, fill_value=0)
+    without building any DataFrames
+
+    - numeric values go to the column named after the field
+    - string values set the one-hot column "<field>_<value>" to 1
+    - anything without a matching column is reported instead of dropped
+    """
+
+    def __init__(self, columns, dtype=np.float32):
+        self.columns = list(columns)
+        self.index = {column: i for i, column in enumerate(self.columns)}
+        self.dtype = dtype
+
+    @property
+    def n_features(self):
+        return len(self.columns)
+
+    def slot(self, field, value):
+        """
+        Column index for a (field, value) pair, or None if the model has no such column
+        """
+        if value is None:
+            return None
+        if isinstance(value, str):
+            return self.index.get(f"{field}_{value}")
+        return self.index.get(field)
+
+    def _fill(self, record, row):
+        """
+        Write one record into a zeroed row; returns the unknown fields
+        """
+        unknown = []
+        for field, value in record.items():
+            i = self.slot(field, value)
+            if i is None:
+                unknown.append(f"{field}={value}" if isinstance(value, str) else field)
+            elif isinstance(value, str):
+                row[i] = 1
+            else:
+                row[i] = value
+        return unknown
+
+    def encode(self, record, out=None):
+        """
+        Encode one request dict
+
+        out: optional preallocated buffer of shape (n_features,)
+        Returns (row, unknown_fields).
+        """
+        if out is None:
+            out = np.zeros(self.n_features, dtype=self.dtype)
+        else:
+            out[:] = 0
+        unknown = self._fill(record, out)
+        return out, unknown
+
+    def encode_batch(self, records, out=None):
+        """
+        Encode a list of request dicts into one matrix
+
+        out: optional preallocated buffer with at least len(records) rows
+        Returns (matrix, unknown_fields_per_record).
+        """
+        n = len(records)
+        if out is None:
+            out = np.zeros((n, self.n_features), dtype=self.dtype)
+        else:
+            out = out[:n]
+            out[:] = 0
+        unknown = [self._fill(record, out[i]) for i, record in enumerate(records)]
+        return out, unknown
@@ -0,0 +1,99 @@
+# hotspot_clusters.py
+"""
+Array-backed cluster statistics for hotspot serving
+Replaces per-report scans of cluster_statistics with O(1) indexed lookups
+"""
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Vectorized great-circle distance in km between two sets of points (degrees)
+    """
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    dlat = lat2 - lat1
+    dlng = np.radians(lng2) - np.radians(lng1)
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def rank_clusters(cluster_stats, n_clusters):
+    """
+    Sort cluster statistics by priority score and assign High/Medium/Low
+
+    The top third of n_clusters is High, the next third Medium, the rest Low.
+    """
+    cluster_stats = sorted(cluster_stats, key=lambda x: x['priority_score'], reverse=True)
+    for i, stats in enumerate(cluster_stats):
+        if i < n_clusters // 3:
+            stats['priority'] = 'High'
+        elif i < 2 * n_clusters // 3:
+            stats['priority'] = 'Medium'
+        else:
+            stats['priority'] = 'Low'
+    return cluster_stats
+
+
+class ClusterTable:
+    """
+    cluster_statistics held as columns, indexed by cluster_id
+
+    Row order matches the (priority sorted) cluster_statistics list, and
+    row_for_id maps a cluster_id to its row, or -1 if the id is unknown.
+    """
+
+    def __init__(self, cluster_statistics):
+        self.records = cluster_statistics
+        n = len(cluster_statistics)
+
+        self.cluster_id = np.array([s['cluster_id'] for s in cluster_statistics], dtype=np.int64)
+        self.num_reports = np.array([s['num_reports'] for s in cluster_statistics], dtype=np.int64)
+        self.avg_latitude = np.array([s['avg_latitude'] for s in cluster_statistics], dtype=np.float64)
+        self.avg_longitude = np.array([s['avg_longitude'] for s in cluster_statistics], dtype=np.float64)
+        self.total_waste_kg = np.array([s['total_waste_kg'] for s in cluster_statistics], dtype=np.float64)
+        self.avg_severity = np.array([s['avg_severity'] for s in cluster_statistics], dtype=np.float64)
+        self.priority_score = np.array([s['priority_score'] for s in cluster_statistics], dtype=np.float64)
+        self.priority = np.array([s['priority'] for s in cluster_statistics], dtype=object)
+
+        size = int(self.cluster_id.max()) + 1 if n else 0
+        self.row_for_id = np.full(size, -1, dtype=np.int64)
+        self.row_for_id[self.cluster_id] = np.arange(n)
+
+    def __len__(self):
+        return len(self.records)
+
+    def rows(self, cluster_ids):
+        """
+        Vectorized cluster_id -> row lookup; unknown ids map to -1
+        """
+        cluster_ids = np.asarray(cluster_ids, dtype=np.int64)
+        rows = np.full(cluster_ids.shape, -1, dtype=np.int64)
+        in_range = (cluster_ids >= 0) & (cluster_ids < len(self.row_for_id))
+        rows[in_range] = self.row_for_id[cluster_ids[in_range]]
+        return rows
+
+    def get(self, cluster_id):
+        """
+        Statistics dict for a single cluster_id, or None
+        """
+        row = self.rows([cluster_id])[0]
+        return self.records[row] if row >= 0 else None
+
+    def distances_km(self, rows, latitudes, longitudes):
+        """
+        Distance from each point to the center of its cluster row (NaN if unknown)
+        """
+        known = rows >= 0
+        if len(self) == 0:
+            return np.full(rows.shape, np.nan)
+        safe_rows = np.where(known, rows, 0)
+        distances = haversine_km(
+            latitudes, longitudes,
+            self.avg_latitude[safe_rows], self.avg_longitude[safe_rows]
+        )
+        return np.where(known, distances, np.nan)
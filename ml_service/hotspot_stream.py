@@ -0,0 +1,371 @@
+# hotspot_stream.py
+"""
+Incremental hotspot updates from streaming waste reports
+New reports move their nearest centroid (mini-batch K-Means update) and
+update running per-cluster aggregates; the result is persisted to the
+hotspot artifacts every few seconds instead of waiting for a retrain
+"""
+
+import os
+import copy
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development server only
+    fcntl = None
+
+from hotspot_clusters import rank_clusters
+from model_registry import (
+    artifact_path, atomic_joblib_dump, atomic_json_dump, publishing, registry
+)
+
+# Seconds between writes of the updated model and cluster_statistics.json
+PERSIST_INTERVAL = float(os.environ.get("ECOTRACK_HOTSPOT_PERSIST_INTERVAL", "60"))
+
+
+def hotspot_report_frame(reports):
+    """
+    DataFrame of the reports with their recency_weight
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(reports)
+    df['report_date'] = pd.to_datetime(df['report_date'])
+    days_old = (pd.Timestamp.now() - df['report_date']).dt.days
+    df['recency_weight'] = 1 / (1 + days_old / 30)
+    return df
+
+
+def hotspot_feature_matrix(reports, features, scaler):
+    """
+    DataFrame of the reports (with recency_weight) and their scaled feature matrix
+    """
+    df = hotspot_report_frame(reports)
+    return df, np.asarray(scaler.transform(df[features]), dtype=np.float64)
+
+
+# Report fields the running aggregates are built from
+INGEST_COLUMNS = ('latitude', 'longitude', 'waste_amount_kg', 'severity', 'report_date')
+
+
+def validate_ingest_frame(df):
+    """
+    Raise ValueError unless every report has the fields the aggregates need
+    """
+    missing = [column for column in INGEST_COLUMNS if column not in df]
+    if missing:
+        raise ValueError(f"reports are missing {', '.join(missing)}")
+    incomplete = df[list(INGEST_COLUMNS)].isna().any(axis=1).to_numpy()
+    if incomplete.any():
+        rows = ', '.join(str(i) for i in incomplete.nonzero()[0][:10])
+        raise ValueError(f"reports with missing values at index {rows}")
+
+
+def model_lineage(model):
+    """
+    Identity of the trained hotspot model a (possibly stream-updated) model descends from
+
+    Stream writes carry their lineage along; a retrained model has none,
+    so it is identified by its own initial centers.
+    """
+    lineage = getattr(model, "stream_lineage", None)
+    if lineage is None:
+        centers = np.ascontiguousarray(model.cluster_centers_, dtype=np.float64)
+        lineage = hashlib.sha1(centers.tobytes()).hexdigest()[:12]
+    return lineage
+
+
+@contextmanager
+def _writer_lock(model_dir=None):
+    """
+    Serialize stream writes of all API worker processes sharing the model directory
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(artifact_path(".hotspot_stream.lock", model_dir), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class HotspotStream:
+    """
+    Live centroids and running cluster aggregates on top of the hotspot model
+
+    Per cluster it keeps count, sum of latitude/longitude, total waste and
+    sum of severity; every statistic in cluster_statistics.json follows from
+    those, so an update costs O(new reports), not O(all reports).
+
+    The sums of the reports ingested since the last write are also kept
+    separately. When another API worker persists its own updates, the
+    stream reloads from that write and re-applies its pending sums on top,
+    so no worker's reports are lost. When a retrained model is published
+    (a different lineage), the stream restarts from it.
+    """
+
+    def __init__(self, persist_interval=PERSIST_INTERVAL, registry=registry):
+        self.persist_interval = persist_interval
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._version = None
+        self._lineage = None
+        self._flusher = None
+        self._stop = threading.Event()
+        self._reset()
+
+    def _reset(self):
+        self.model = None
+        self.centers = None
+        self.counts = None
+        self.sum_latitude = None
+        self.sum_longitude = None
+        self.total_waste_kg = None
+        self.sum_severity = None
+        self.records = None
+        self.pending = None
+        self.dirty = False
+        self.ingested = 0
+        self.updated_at = None
+        self.persisted_at = time.monotonic()
+
+    def _clear_pending(self):
+        # Caller holds the lock; sums of the reports not yet persisted
+        k, d = self.centers.shape
+        self.pending = {
+            "counts": np.zeros(k),
+            "features": np.zeros((k, d)),
+            "latitude": np.zeros(k),
+            "longitude": np.zeros(k),
+            "waste_amount_kg": np.zeros(k),
+            "severity": np.zeros(k),
+        }
+
+    def _init_from(self, bundle):
+        # Caller holds the lock
+        model = bundle["model"]
+        k = len(model.cluster_centers_)
+        self.model = model
+        self.centers = np.array(model.cluster_centers_, dtype=np.float64)
+        self.counts = np.zeros(k)
+        self.sum_latitude = np.zeros(k)
+        self.sum_longitude = np.zeros(k)
+        self.total_waste_kg = np.zeros(k)
+        self.sum_severity = np.zeros(k)
+
+        for stats in bundle["cluster_statistics"]:
+            c = stats['cluster_id']
+            n = stats['num_reports']
+            self.counts[c] = n
+            self.sum_latitude[c] = stats['avg_latitude'] * n
+            self.sum_longitude[c] = stats['avg_longitude'] * n
+            self.total_waste_kg[c] = stats['total_waste_kg']
+            self.sum_severity[c] = stats['avg_severity'] * n
+        self.records = bundle["cluster_statistics"]
+
+    def _apply(self, counts, features, latitude, longitude, waste_amount_kg, severity):
+        # Caller holds the lock; fold per-cluster sums into the live state
+        if not getattr(self.model, "density_based", False):
+            # Each center becomes the running mean of all reports it has absorbed
+            moved = counts > 0
+            self.centers[moved] = (
+                (self.centers[moved] * self.counts[moved, None] + features[moved])
+                / (self.counts[moved] + counts[moved])[:, None]
+            )
+        self.counts += counts
+        self.sum_latitude += latitude
+        self.sum_longitude += longitude
+        self.total_waste_kg += waste_amount_kg
+        self.sum_severity += severity
+
+    def _sync(self, bundle):
+        # Caller holds the lock
+        if bundle.version == self._version:
+            return
+        lineage = model_lineage(bundle["model"])
+        if lineage != self._lineage:
+            # A retrain: reports not yet persisted are in the report store
+            # and therefore part of its training data
+            self._reset()
+            self._init_from(bundle)
+            self._clear_pending()
+        else:
+            # Another worker persisted its updates: keep ours on top of them
+            self._init_from(bundle)
+            if self.pending["counts"].any():
+                self._apply(**self.pending)
+                self.records = self._build_records()
+        self._version = bundle.version
+        self._lineage = lineage
+
+    def _build_records(self):
+        # Caller holds the lock
+        records = []
+        for c in np.flatnonzero(self.counts > 0):
+            n = self.counts[c]
+            avg_severity = self.sum_severity[c] / n
+            records.append({
+                'cluster_id': int(c),
+                'num_reports': int(round(n)),
+                'avg_latitude': float(self.sum_latitude[c] / n),
+                'avg_longitude': float(self.sum_longitude[c] / n),
+                'total_waste_kg': float(self.total_waste_kg[c]),
+                'avg_severity': float(avg_severity),
+                'priority_score': float(avg_severity * self.total_waste_kg[c] / 100)
+            })
+        return rank_clusters(records, len(self.centers))
+
+    def ingest(self, bundle, reports, prepared=None, before_apply=None):
+        """
+        Assign new reports to their nearest centroid and fold them in
+
+        Centroids move like MiniBatchKMeans: each center becomes the running
+        mean of all reports it has absorbed. Density (DBSCAN) hotspots keep
+        their shape and only their aggregates change; reports outside every
+        hotspot get -1. Returns (cluster ids, whether the update was persisted).
+        prepared: (df, X) from hotspot_feature_matrix if the caller already built it
+        before_apply: called once the reports are assigned, before any state
+        changes; if it raises, the stream is left as it was
+        """
+        if prepared is None:
+            prepared = hotspot_feature_matrix(reports, bundle["features"], bundle["scaler"])
+        df, X = prepared
+
+        self._ensure_flusher()
+        with self._lock:
+            self._sync(bundle)
+            k = len(self.centers)
+
+            if getattr(self.model, "density_based", False):
+                # Density hotspots keep their core reports; noise (-1) is not aggregated
+                all_labels = self.model.predict(X)
+                member = all_labels >= 0
+            else:
+                # Nearest current centroid
+                distances = ((X[:, None, :] - self.centers[None, :, :]) ** 2).sum(axis=2)
+                all_labels = np.argmin(distances, axis=1)
+                member = np.ones(len(all_labels), dtype=bool)
+            labels = all_labels[member]
+
+            def cluster_sums(values):
+                return np.bincount(labels, weights=values[member], minlength=k)
+
+            sums = {"counts": np.bincount(labels, minlength=k).astype(np.float64)}
+            if getattr(self.model, "density_based", False):
+                # Density hotspots have no centers to move
+                sums["features"] = np.zeros_like(self.pending["features"])
+            else:
+                sums["features"] = np.column_stack([cluster_sums(X[:, dim]) for dim in range(X.shape[1])])
+            for column in ('latitude', 'longitude', 'waste_amount_kg', 'severity'):
+                sums[column] = cluster_sums(df[column].to_numpy(float))
+
+            if before_apply is not None:
+                before_apply()
+
+            self._apply(**sums)
+            for key, values in sums.items():
+                self.pending[key] += values
+
+            self.records = self._build_records()
+            self.ingested += len(df)
+            self.dirty = True
+            self.updated_at = datetime.now().isoformat()
+
+            persisted = False
+            if time.monotonic() - self.persisted_at >= self.persist_interval:
+                persisted = self._persist()
+
+        return all_labels, persisted
+
+    def _persist(self):
+        # Caller holds the lock
+        if not self.dirty:
+            return False
+        with _writer_lock(self.registry.model_dir):
+            # Take in what other workers wrote since our last sync before overwriting it
+            self._sync(self.registry.get('hotspot', refresh=True))
+            if not self.dirty:
+                return False
+            centers = self.centers.copy()
+            with publishing('hotspot'):
+                if not getattr(self.model, "density_based", False):
+                    # Density models do not move; only their statistics change
+                    model = copy.deepcopy(self.model)
+                    model.cluster_centers_ = centers
+                    model.stream_lineage = self._lineage
+                    atomic_joblib_dump(model, 'hotspot_model.pkl')
+                atomic_json_dump(self.records, 'cluster_statistics.json')
+            self._clear_pending()
+        self.dirty = False
+        self.persisted_at = time.monotonic()
+        return True
+
+    def _ensure_flusher(self):
+        # Started on first ingest, i.e. in the worker process after a fork
+        if self._flusher is None:
+            with self._lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(
+                        target=self._flush_loop, name="hotspot-stream-flush", daemon=True
+                    )
+                    self._flusher.start()
+
+    def _flush_loop(self):
+        # Writes pending reports once persist_interval has passed since the
+        # last write, even if no further report arrives to trigger it
+        delay = self.persist_interval
+        while not self._stop.wait(max(delay, 0.1)):
+            with self._lock:
+                due = self.persisted_at + self.persist_interval - time.monotonic()
+                if self.dirty and due <= 0:
+                    try:
+                        self._persist()
+                    except Exception as e:
+                        print(f"⚠ Hotspot stream write failed, retrying later: {e}")
+                    delay = self.persist_interval
+                else:
+                    delay = due if self.dirty else self.persist_interval
+
+    def persist(self):
+        """
+        Write pending updates now; True if anything was written
+        """
+        with self._lock:
+            return self._persist()
+
+    def close(self):
+        """
+        Stop the background writer and write pending updates (on shutdown);
+        True if anything was written
+        """
+        if self._flusher is not None:
+            self._stop.set()
+            self._flusher.join()
+            self._flusher = None
+        return self.persist()
+
+    def cluster_statistics(self, bundle):
+        """
+        Live cluster statistics, sorted by priority (the bundle's until reports arrive)
+        """
+        with self._lock:
+            self._sync(bundle)
+            return self.records
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ingested_reports": self.ingested,
+                "pending_persist": self.dirty,
+                "updated_at": self.updated_at,
+                "persist_interval_s": self.persist_interval,
+            }
@@ -0,0 +1,22 @@
+# image_preprocessing.py
+"""
+Image preprocessing shared by training, the Keras model and the TFLite runtime
+Kept free of TensorFlow so API workers can decode images without importing it
+"""
+
+import numpy as np
+from PIL import Image
+
+IMAGE_SIZE = (224, 224)
+
+
+def load_image_array(source):
+    """
+    Decode an image (path or file-like) into a (224, 224, 3) float32 array in [0, 1]
+    
+    Uses nearest-neighbour resizing like load_img/flow_from_directory,
+    so serving sees the same pixels as training.
+    """
+    with Image.open(source) as img:
+        img = img.convert('RGB').resize(IMAGE_SIZE, Image.NEAREST)
+        return np.asarray(img, dtype=np.float32) / 255.0
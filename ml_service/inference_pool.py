@@ -0,0 +1,108 @@
+# inference_pool.py
+"""
+Bounded thread pool for CPU-heavy model inference
+Request threads hand forest, KMeans and image work to a fixed number of
+inference threads, so a burst of slow batch requests queues up here instead
+of occupying every request thread and stalling cheap endpoints like /api/health
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+
+class InferencePoolBusy(Exception):
+    """Raised when max_workers calls are running and max_pending more are waiting"""
+
+
+class InferencePool:
+    """
+    Runs inference calls on at most max_workers threads
+
+    max_workers: calls running at once; NumPy and sklearn release the GIL in
+        their kernels, so about one per CPU core available to the process
+    max_pending: calls allowed to wait for a free thread; beyond that
+        run() fails fast with InferencePoolBusy instead of queueing unboundedly
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, name="inference"):
+        self.max_workers = max(1, int(max_workers or os.cpu_count() or 1))
+        self.max_pending = max(0, int(self.max_workers * 4 if max_pending is None else max_pending))
+        self.name = name
+
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+        self._executor = None
+        self._start_lock = threading.Lock()
+
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @classmethod
+    def from_env(cls, prefix="ECOTRACK_INFERENCE", **kwargs):
+        """
+        Pool sized by {prefix}_THREADS and {prefix}_QUEUE
+        """
+        threads = os.environ.get(f"{prefix}_THREADS")
+        pending = os.environ.get(f"{prefix}_QUEUE")
+        return cls(
+            max_workers=int(threads) if threads else None,
+            max_pending=int(pending) if pending else None,
+            **kwargs
+        )
+
+    def _ensure_started(self):
+        # Threads are created on first use, i.e. in the worker process after a fork
+        if self._executor is None:
+            with self._start_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _release(self, future):
+        self._slots.release()
+        if not future.cancelled():
+            self.completed += 1
+
+    def run(self, fn, *args, timeout=None, wait=0, **kwargs):
+        """
+        Blocking call of fn(*args, **kwargs) on an inference thread
+
+        Raises InferencePoolBusy when the pool is still full after wait
+        seconds (0: fail fast) and TimeoutError when the result is not
+        ready after timeout seconds.
+        """
+        acquired = self._slots.acquire(timeout=wait) if wait else self._slots.acquire(blocking=False)
+        if not acquired:
+            self.rejected += 1
+            raise InferencePoolBusy(f"{self.name} pool is full ({self.max_workers} running, "
+                                    f"{self.max_pending} waiting)")
+        try:
+            future = self._ensure_started().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            self.timeouts += 1
+            raise
+
+    def close(self, wait=True):
+        """
+        Finish running and queued calls, then stop the threads
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,466 @@
+# load_test.py
+"""
+End-to-end HTTP load generator for the ML API
+Starts the API on localhost (or targets a running one), replays a weighted
+mix of requests across the endpoints at a fixed rate or concurrency, and
+reports throughput, latency percentiles and errors per endpoint
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import random
+import signal
+import argparse
+import threading
+import subprocess
+import http.client
+from datetime import datetime
+from urllib.parse import urlsplit, urlencode
+
+import numpy as np
+import pandas as pd
+
+RESULTS_FILE = "load_test_results.json"
+DEFAULT_PORT = 5011
+PERCENTILES = [50, 95, 99, 99.9]
+
+# Endpoint name -> relative weight in the default mix. Ingest writes to the
+# hotspot model and the report store, so it is off unless asked for.
+DEFAULT_MIX = {
+    "emission": 20,
+    "emission_items": 10,
+    "engagement": 20,
+    "engagement_batch": 5,
+    "detect_hotspots": 15,
+    "top_priority": 10,
+    "nearby": 10,
+    "classify": 5,
+    "health": 5,
+    "ingest": 0,
+}
+
+# Model (as named in /api/health) each endpoint needs
+ENDPOINT_MODELS = {
+    "emission": "emission_model",
+    "emission_items": "emission_model",
+    "engagement": "engagement_model",
+    "engagement_batch": "engagement_model",
+    "detect_hotspots": "hotspot_model",
+    "top_priority": "hotspot_model",
+    "nearby": "hotspot_model",
+    "classify": "waste_classifier",
+    "ingest": "hotspot_model",
+}
+
+# Distinct payloads prepared per endpoint; requests cycle through them
+PAYLOADS_PER_ENDPOINT = 256
+
+
+def _multipart(field, filename, content, content_type):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _json_request(path, payload):
+    return ("POST", path, json.dumps(payload).encode(), "application/json")
+
+
+def build_requests(n=PAYLOADS_PER_ENDPOINT, seed=42):
+    """
+    Pre-encoded (method, path, body, content type) requests per endpoint,
+    built from the catalog and the synthetic data generators
+    """
+    from PIL import Image
+
+    from emission_catalog import CATALOG_CSV, NON_FEATURE_COLUMNS
+    from synthetic_data import iter_item_mixes, iter_reports, iter_users
+
+    rng = random.Random(seed)
+    catalog = pd.read_csv(CATALOG_CSV)
+    records = catalog.drop(columns=NON_FEATURE_COLUMNS).to_dict("records")
+    records = [{k: v for k, v in record.items() if pd.notna(v)} for record in records]
+
+    users = pd.DataFrame(next(iter_users(n * 50, seed=seed)))
+    users = users.drop(columns=['will_participate']).to_dict("records")
+
+    reports = pd.DataFrame(next(iter_reports(n * 10, seed=seed)))
+    reports['report_date'] = reports['report_date'].dt.strftime('%Y-%m-%d')
+    reports = reports.drop(columns=['report_id']).to_dict("records")
+
+    mixes = pd.DataFrame(next(iter_item_mixes(n, seed=seed)))
+    mixes = [
+        [{"item_id": int(item), "quantity": int(quantity)}
+         for item, quantity in zip(group['item_id'], group['quantity'])]
+        for _, group in mixes.groupby('event_id')
+    ]
+
+    images = []
+    np_rng = np.random.default_rng(seed)
+    for _ in range(8):
+        buffer = io.BytesIO()
+        pixels = np_rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(buffer, format="JPEG", quality=85)
+        images.append(buffer.getvalue())
+
+    def nearby(i):
+        report = reports[i]
+        params = {"latitude": report["latitude"], "longitude": report["longitude"]}
+        params.update({"k": 5} if i % 2 else {"radius_km": 1, "limit": 50})
+        return ("GET", "/api/hotspots/nearby?" + urlencode(params), None, None)
+
+    def classify(i):
+        body, content_type = _multipart("image", "upload.jpg", images[i % len(images)], "image/jpeg")
+        return ("POST", "/api/classify-waste", body, content_type)
+
+    return {
+        "emission": [_json_request("/api/predict-emission", rng.choice(records)) for _ in range(n)],
+        "emission_items": [_json_request("/api/predict-emission/items", {"items": mixes[i]})
+                           for i in range(n)],
+        "engagement": [_json_request("/api/predict-engagement", users[i]) for i in range(n)],
+        "engagement_batch": [_json_request("/api/predict-engagement-batch",
+                                           {"users": users[i * 50:(i + 1) * 50]}) for i in range(n)],
+        "detect_hotspots": [_json_request("/api/detect-hotspots",
+                                          {"reports": reports[i * 10:(i + 1) * 10]}) for i in range(n)],
+        "ingest": [_json_request("/api/hotspots/ingest", {"reports": reports[i * 10:(i + 1) * 10]})
+                   for i in range(n)],
+        "top_priority": [("GET", "/api/hotspots/top-priority?top_n=5", None, None)],
+        "nearby": [nearby(i) for i in range(n)],
+        "classify": [classify(i) for i in range(n)],
+        "health": [("GET", "/api/health", None, None)],
+    }
+
+
+# ============================================================================
+# LOCAL SERVER
+# ============================================================================
+
+def start_server(port, command=None, env=None, timeout=120):
+    """
+    Start the API in its own process group and wait until /api/health answers
+
+    command: shell command with {port} in it; default is ml_api's Flask app
+    (threaded, without the debug reloader).
+    """
+    if command is None:
+        command = (f"{sys.executable} -c \"import ml_api; "
+                   f"ml_api.app.run(host='127.0.0.1', port={port}, threaded=True)\"")
+    process = subprocess.Popen(
+        command.format(port=port), shell=True, env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}: {command}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connection.request("GET", "/api/health")
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            pass
+        time.sleep(0.25)
+    stop_server(process)
+    raise RuntimeError(f"Server did not become healthy within {timeout}s")
+
+
+def available_mix(base_url, mix, timeout=10):
+    """
+    The mix without the endpoints whose model /api/health reports as unavailable
+    """
+    url = urlsplit(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+    connection.request("GET", "/api/health")
+    models = json.loads(connection.getresponse().read()).get("models", {})
+    connection.close()
+
+    available = {}
+    for name, weight in mix.items():
+        model = ENDPOINT_MODELS.get(name)
+        if weight > 0 and model is not None and not models.get(model, True):
+            print(f"⚠ Skipping {name}: {model} is not available")
+            continue
+        available[name] = weight
+    return available
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+# ============================================================================
+# LOAD GENERATION
+# ============================================================================
+
+class _Client:
+    """
+    One keep-alive connection per worker thread, reopened after errors
+    """
+
+    def __init__(self, host, port, timeout):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.connection = None
+
+    def send(self, method, path, body, content_type):
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {"Content-Type": content_type} if content_type else {}
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            if response.getheader("Connection", "").lower() == "close":
+                self.close()
+            return response.status
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def run_load(base_url, requests, mix, duration, concurrency, rate=None, warmup=2.0,
+             timeout=30.0, seed=42):
+    """
+    Replay the request mix for warmup + duration seconds
+
+    Without rate, `concurrency` workers send back-to-back requests (closed
+    loop). With rate, requests are scheduled at fixed intervals and
+    latency is measured from the scheduled send time, so time spent
+    waiting for a free worker counts (no coordinated omission).
+
+    Returns {endpoint: list of (latency_s, status or None)} for requests
+    scheduled after the warm-up, plus the measured duration.
+    """
+    url = urlsplit(base_url)
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    missing = [name for name in names if name not in requests]
+    if missing:
+        raise ValueError(f"Unknown endpoints in mix: {', '.join(missing)}")
+
+    samples = {name: [] for name in names}
+    lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+    picker = random.Random(seed)
+    picks = threading.local()
+
+    def pick():
+        if not hasattr(picks, "rng"):
+            with lock:
+                picks.rng = random.Random(picker.random())
+        name = picks.rng.choices(names, weights)[0]
+        pool = requests[name]
+        return name, pool[picks.rng.randrange(len(pool))]
+
+    def send(client, name, request, scheduled):
+        try:
+            status = client.send(*request)
+        except Exception:
+            status = None
+        finished = time.perf_counter()
+        if scheduled >= measure_from:
+            with lock:
+                samples[name].append((finished - scheduled, status))
+
+    def closed_loop_worker():
+        client = _Client(url.hostname, url.port, timeout)
+        while time.perf_counter() < stop_at:
+            name, request = pick()
+            send(client, name, request, time.perf_counter())
+        client.close()
+
+    def open_loop_worker(tasks):
+        client = _Client(url.hostname, url.port, timeout)
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            name, request, scheduled = task
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            send(client, name, request, scheduled)
+        client.close()
+
+    if rate is None:
+        workers = [threading.Thread(target=closed_loop_worker, daemon=True) for _ in range(concurrency)]
+        for worker in workers:
+            worker.start()
+    else:
+        tasks = queue.Queue()
+        workers = [threading.Thread(target=open_loop_worker, args=(tasks,), daemon=True)
+                   for _ in range(concurrency)]
+        for worker in workers:
+            worker.start()
+        interval = 1.0 / rate
+        i = 0
+        while True:
+            scheduled = start + i * interval
+            if scheduled >= stop_at:
+                break
+            # Stay a little ahead of the schedule so workers can sleep until the exact time
+            ahead = scheduled - time.perf_counter() - 0.05
+            if ahead > 0:
+                time.sleep(ahead)
+            tasks.put((*pick(), scheduled))
+            i += 1
+        for _ in workers:
+            tasks.put(None)
+
+    for worker in workers:
+        worker.join()
+    return samples, time.perf_counter() - measure_from
+
+
+def summarize(samples, elapsed):
+    """
+    Throughput, latency percentiles (ms) and error counts per endpoint and overall
+    """
+    def stats(entries):
+        latencies = np.array([latency for latency, _ in entries]) * 1000
+        statuses = [status for _, status in entries]
+        errors = sum(status is None or status >= 400 for status in statuses)
+        codes = {}
+        for status in statuses:
+            key = str(status) if status is not None else "connection_error"
+            codes[key] = codes.get(key, 0) + 1
+        result = {
+            "requests": len(entries),
+            "throughput_rps": len(entries) / elapsed if elapsed > 0 else 0.0,
+            "errors": errors,
+            "error_rate": errors / len(entries) if entries else 0.0,
+            "status_codes": codes,
+        }
+        if len(entries):
+            result["latency_ms"] = {
+                "mean": float(latencies.mean()),
+                "max": float(latencies.max()),
+                **{f"p{p:g}": float(np.percentile(latencies, p)) for p in PERCENTILES},
+            }
+        return result
+
+    endpoints = {name: stats(entries) for name, entries in samples.items()}
+    overall = stats([entry for entries in samples.values() for entry in entries])
+    return {"overall": overall, "endpoints": endpoints}
+
+
+def parse_mix(text):
+    """
+    "emission=5,nearby=2" -> weights for just those endpoints
+    """
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight) if weight else 1.0
+    return mix
+
+
+def print_summary(summary):
+    header = f"  {'endpoint':18} {'reqs':>7} {'rps':>8} {'err%':>6}" + "".join(
+        f" {'p' + format(p, 'g'):>8}" for p in PERCENTILES) + f" {'max':>8}"
+    print(header)
+    rows = list(summary["endpoints"].items()) + [("TOTAL", summary["overall"])]
+    for name, stats in rows:
+        latency = stats.get("latency_ms", {})
+        print(f"  {name:18} {stats['requests']:7d} {stats['throughput_rps']:8.1f} "
+              f"{stats['error_rate'] * 100:6.2f}"
+              + "".join(f" {latency.get(f'p{p:g}', float('nan')):8.1f}" for p in PERCENTILES)
+              + f" {latency.get('max', float('nan')):8.1f}")
+    print("  (latencies in ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the ML API on localhost")
+    parser.add_argument("--url", help="test an already running API instead of starting one")
+    parser.add_argument("--server-cmd",
+                        help="command that starts the API, with {port} (default: ml_api's Flask app)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds first")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="client threads (closed loop), or the sender pool with --rate")
+    parser.add_argument("--rate", type=float, help="target requests per second (open loop)")
+    parser.add_argument("--mix", help="endpoint weights, e.g. emission=5,nearby=2 "
+                        "(default: all endpoints but ingest whose model is available; names: "
+                        + ", ".join(DEFAULT_MIX) + ")")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    requests = build_requests(seed=args.seed)
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        print(f"Starting API on port {args.port}...")
+        process = start_server(args.port, args.server_cmd)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    if not args.mix:
+        # An explicit --mix is replayed as given, unavailable models included
+        mix = available_mix(base_url, mix, timeout=args.timeout)
+
+    mode = f"{args.rate:g} req/s" if args.rate else f"{args.concurrency} concurrent clients"
+    print(f"Load testing {base_url} for {args.duration:g}s ({mode}, {args.warmup:g}s warm-up)...")
+    try:
+        samples, elapsed = run_load(
+            base_url, requests, mix, args.duration, args.concurrency,
+            rate=args.rate, warmup=args.warmup, timeout=args.timeout, seed=args.seed
+        )
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    summary = summarize(samples, elapsed)
+    print()
+    print_summary(summary)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "config": {
+            "url": base_url,
+            "server_cmd": args.server_cmd if args.url is None else None,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "mix": mix,
+            "cpu_count": os.cpu_count(),
+        },
+        **summary,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results saved to {args.output}")
+
+    return 0 if summary["overall"]["error_rate"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+# micro_batcher.py
+"""
+Dynamic micro-batching for model inference
+Collects concurrent requests for a few milliseconds and runs them as a
+single batched call, which is what makes a CNN affordable on CPU pods
+"""
+
+import threading
+import time
+import queue
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Groups single-item requests into batches for predict_batch
+
+    predict_batch: callable(list of inputs) -> sequence of outputs, same order
+    max_batch_size: run as soon as this many requests are waiting
+    max_wait_ms: how long the first request in a batch may wait for company
+    """
+
+    def __init__(self, predict_batch, max_batch_size=16, max_wait_ms=5.0, name="micro-batcher"):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def submit(self, item):
+        """
+        Queue one input; returns a Future for its output
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def predict(self, item, timeout=None):
+        """
+        Blocking single-item call that is batched with concurrent callers
+        """
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        stopping = False
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                stopping = True
+                break
+            batch.append(entry)
+        return batch, stopping
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch, stopping = self._collect(first)
+            futures = [future for _, future in batch]
+            try:
+                outputs = self.predict_batch([item for item, _ in batch])
+                for future, output in zip(futures, outputs):
+                    future.set_result(output)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+            self.batches += 1
+            self.items += len(batch)
+            if stopping:
+                return
+
+    def close(self):
+        """
+        Stop the worker thread after the batch in progress
+        """
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
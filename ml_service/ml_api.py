@@ -8,29 +8,124 @@ Serves all 4 ML models:
 4. Waste Hotspot Detection
 """
 
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import pandas as pd
-import numpy as np
-import joblib
+import io
 import json
-from datetime import datetime
 import os
+import time
+import threading
+from concurrent.futures import TimeoutError as InferenceTimeout
+from datetime import datetime
+
+from startup import startup_report
+
+# pandas, sklearn and the model files are only loaded by the first request
+# (or /api/warmup) that needs them
+with startup_report.step("import flask"):
+    from flask import Flask, Response, g, request, jsonify, stream_with_context
+    from flask.json.provider import DefaultJSONProvider
+    from flask_cors import CORS
+
+with startup_report.step("import numpy"):
+    import numpy as np
+
+with startup_report.step("import service modules"):
+    from hotspot_stream import HotspotStream, hotspot_feature_matrix, validate_ingest_frame
+    from inference_pool import InferencePool, InferencePoolBusy
+    from metrics import (
+        metrics, CONTENT_TYPE, REQUESTS, ERRORS, REQUEST_SECONDS, STAGE_SECONDS,
+        BATCH_SIZE, MICRO_BATCH_SIZE
+    )
+    from micro_batcher import MicroBatcher
+    from model_registry import registry, ModelUnavailableError
+    from prediction_cache import PredictionCache, row_key
+    from report_store import ReportStore
+    from user_engagement_predictor import (
+        build_engagement_matrix, engagement_recommendation, score_engagement_batch
+    )
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that records response serialization as the "serialize" stage"""
+    
+    def response(self, *args, **kwargs):
+        if "metrics_route" not in g:
+            return super().response(*args, **kwargs)
+        with STAGE_SECONDS.time(g.metrics_route, "serialize"):
+            return super().response(*args, **kwargs)
 
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
 CORS(app)  # Enable CORS for frontend requests
 
+# ============================================================================
+# REQUEST METRICS
+# ============================================================================
+
+def stage(name):
+    """Time a stage (features / inference) of the current request"""
+    return STAGE_SECONDS.time(g.metrics_route, name)
+
+def route_stage():
+    """stage() bound to the current route, for work running on the inference pool"""
+    route = g.metrics_route
+    return lambda name: STAGE_SECONDS.time(route, name)
+
+@app.before_request
+def start_request_timer():
+    # Label by route pattern, not raw path, so label cardinality stays bounded
+    g.metrics_route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    g.metrics_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    if "metrics_start" not in g:
+        return response
+    route = g.metrics_route
+    REQUEST_SECONDS.observe(time.perf_counter() - g.metrics_start, route, request.method)
+    REQUESTS.inc(route, request.method, response.status_code)
+    if response.status_code >= 400:
+        ERRORS.inc(route, request.method, "server" if response.status_code >= 500 else "client")
+    return response
+
+@app.route("/api/metrics", methods=["GET"])
+def prometheus_metrics():
+    """
+    Request, stage and batch-size metrics in the Prometheus text format
+    
+    Counters and histograms are kept per process; with several server
+    workers, scrape each one (or aggregate them in Prometheus).
+    """
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+@app.errorhandler(ModelUnavailableError)
+def model_unavailable(e):
+    """Models are loaded lazily; report missing artifacts instead of crashing"""
+    return jsonify({"error": f"Model not loaded: {e}", "status": "error"}), 500
+
+# Batch forests, hotspot scoring and image decoding run here, off the request threads
+# (ECOTRACK_INFERENCE_THREADS, ECOTRACK_INFERENCE_QUEUE)
+inference_pool = InferencePool.from_env(name="inference")
+INFERENCE_TIMEOUT = float(os.environ.get("ECOTRACK_INFERENCE_TIMEOUT", 30))
+
+@app.errorhandler(InferencePoolBusy)
+def inference_busy(e):
+    """Shed load when the inference pool queue is full"""
+    return jsonify({"error": str(e), "status": "error"}), 503, {"Retry-After": "1"}
+
+@app.errorhandler(InferenceTimeout)
+def inference_timeout(e):
+    """Inference (pool or classifier micro-batch) did not finish in time: a server-side failure"""
+    return jsonify({"error": "Inference timed out", "status": "error"}), 504
+
+def offload(fn, *args, **kwargs):
+    """Run fn on the inference pool and wait for its result"""
+    return inference_pool.run(fn, *args, timeout=INFERENCE_TIMEOUT, **kwargs)
+
 # ============================================================================
 # MODEL 1: CO2 EMISSION IMPACT PREDICTION
 # ============================================================================
 
-try:
-    emission_model = joblib.load("emission_model.pkl")
-    emission_columns = joblib.load("model_columns.pkl")
-    print("✓ Emission model loaded")
-except:
-    print("⚠ Emission model not found")
-    emission_model = None
+# Event-day traffic repeats the same compositions; cache per model version
+emission_cache = PredictionCache.from_env("ECOTRACK_EMISSION_CACHE")
 
 @app.route("/api/predict-emission", methods=["POST"])
 def predict_emission():
@@ -48,30 +143,101 @@ def predict_emission():
     Response:
     {
         "predicted_emission_CO2e": 45.23,
+        "unknown_fields": [],
         "status": "success"
     }
     """
+    bundle = registry.get("emission")
+    emission_forest = bundle["forest"]
+    emission_encoder = bundle["encoder"]
+    
     try:
-        if emission_model is None:
-            return jsonify({"error": "Emission model not loaded"}), 500
-        
         data = request.json
-        df = pd.DataFrame([data])
-        df = pd.get_dummies(df).reindex(columns=emission_columns, fill_value=0)
-        pred = emission_model.predict(df)[0]
+        with stage("features"):
+            row, unknown_fields = emission_encoder.encode(data)
+            key = row_key(row)
+        
+        with stage("inference"):
+            pred = emission_cache.get(key, bundle.version)
+            if pred is None:
+                pred = float(emission_forest.predict(row)[0])
+                emission_cache.put(key, bundle.version, pred)
         
         return jsonify({
             "predicted_emission_CO2e": round(float(pred), 2),
+            "unknown_fields": unknown_fields,
             "status": "success",
             "message": f"This waste will produce approximately {round(pred, 2)} kg of CO2 equivalent"
         })
     except Exception as e:
         return jsonify({"error": str(e), "status": "error"}), 400
 
+@app.route("/api/predict-emission/items", methods=["POST"])
+def predict_emission_items():
+    """
+    Emission for a mix of catalog items, answered from the precomputed table
+    
+    Request body:
+    {
+        "items": [
+            {"item_id": 1, "quantity": 3},
+            {"item_name": "Bottle Caps", "quantity": 2},
+            {"features": {"Risk_Score": 4, "Weight_grams": 25}, "quantity": 1}
+        ]
+    }
+    
+    Catalog entries (item_id / item_name) are pure table arithmetic; only
+    off-catalog "features" entries are sent to the emission model.
+    
+    Response:
+    {
+        "total_emission_CO2e": 2.85,
+        "items": [...],
+        "status": "success"
+    }
+    """
+    table = registry.get("item_emission")["table"]
+    
+    try:
+        items = request.json.get("items", [])
+        
+        forest = encoder = None
+        if any("features" in item for item in items):
+            emission = registry.get("emission")
+            forest, encoder = emission["forest"], emission["encoder"]
+        
+        BATCH_SIZE.observe(len(items), g.metrics_route)
+        with stage("inference"):
+            total, breakdown = table.quote(items, forest=forest, encoder=encoder)
+        
+        return jsonify({
+            "total_emission_CO2e": round(total, 2),
+            "items": breakdown,
+            "total_items": len(breakdown),
+            "status": "success"
+        })
+    except Exception as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+
 # ============================================================================
 # MODEL 2: WASTE IMAGE CLASSIFICATION
 # ============================================================================
 
+def _classify_batch(images):
+    """One forward pass over a micro-batch of preprocessed images"""
+    model = registry.get("waste_classifier")["model"]
+    MICRO_BATCH_SIZE.observe(len(images), classifier_batcher.name)
+    return model.predict_on_batch(np.stack(images))
+
+# Concurrent classify requests are grouped into a single CNN forward pass
+classifier_batcher = MicroBatcher(
+    _classify_batch,
+    max_batch_size=int(os.environ.get("ECOTRACK_CLASSIFIER_MAX_BATCH", 16)),
+    max_wait_ms=float(os.environ.get("ECOTRACK_CLASSIFIER_MAX_WAIT_MS", 5)),
+    name="waste-classifier-batcher"
+)
+CLASSIFIER_TIMEOUT = float(os.environ.get("ECOTRACK_CLASSIFIER_TIMEOUT", 30))
+
 @app.route("/api/classify-waste", methods=["POST"])
 def classify_waste():
     """
@@ -79,6 +245,9 @@ def classify_waste():
     
     Request: multipart/form-data with 'image' file
     
+    Requests are micro-batched: each one waits at most
+    ECOTRACK_CLASSIFIER_MAX_WAIT_MS for others before the batched forward pass.
+    
     Response:
     {
         "category": "Plastic",
@@ -87,24 +256,30 @@ def classify_waste():
         "status": "success"
     }
     """
+    bundle = registry.get("waste_classifier")
+    categories = bundle["categories"]
+    
     try:
         # Check if image file is present
         if 'image' not in request.files:
             return jsonify({"error": "No image file provided"}), 400
         
         file = request.files['image']
+        with stage("features"):
+            image = offload(bundle["preprocess"], file.stream)
         
-        # For demo purposes, return mock prediction
-        # In production, this would use the trained CNN model
-        categories = ['Plastic', 'Paper', 'Metal', 'Glass', 'Organic', 'E-waste']
-        mock_probs = np.random.dirichlet(np.ones(6))
-        predicted_idx = np.argmax(mock_probs)
+        # Includes the wait for the micro-batch to fill
+        with stage("inference"):
+            probabilities = np.asarray(
+                classifier_batcher.predict(image, timeout=CLASSIFIER_TIMEOUT), dtype=np.float64
+            )
+        predicted_idx = int(np.argmax(probabilities))
         
         result = {
             "category": categories[predicted_idx],
-            "confidence": float(mock_probs[predicted_idx]),
+            "confidence": float(probabilities[predicted_idx]),
             "all_probabilities": {
-                cat: float(prob) for cat, prob in zip(categories, mock_probs)
+                cat: float(prob) for cat, prob in zip(categories, probabilities)
             },
             "status": "success",
             "message": f"Detected waste type: {categories[predicted_idx]}"
@@ -112,6 +287,8 @@ def classify_waste():
         
         return jsonify(result)
         
+    except (InferencePoolBusy, InferenceTimeout):
+        raise
     except Exception as e:
         return jsonify({"error": str(e), "status": "error"}), 400
 
@@ -119,16 +296,6 @@ def classify_waste():
 # MODEL 3: USER ENGAGEMENT PREDICTION
 # ============================================================================
 
-try:
-    engagement_model = joblib.load("engagement_model.pkl")
-    engagement_scaler = joblib.load("engagement_scaler.pkl")
-    with open("engagement_features.json", "r") as f:
-        engagement_features = json.load(f)
-    print("✓ Engagement model loaded")
-except:
-    print("⚠ Engagement model not found")
-    engagement_model = None
-
 @app.route("/api/predict-engagement", methods=["POST"])
 def predict_engagement():
     """
@@ -157,27 +324,26 @@ def predict_engagement():
         "status": "success"
     }
     """
+    bundle = registry.get("engagement")
+    engagement_forest = bundle["forest"]
+    engagement_features = bundle["features"]
+    
     try:
-        if engagement_model is None:
-            return jsonify({"error": "Engagement model not loaded"}), 500
-        
         user_data = request.json
-        user_df = pd.DataFrame([user_data])[engagement_features]
-        user_scaled = engagement_scaler.transform(user_df)
         
-        prediction = engagement_model.predict(user_scaled)[0]
-        probability = engagement_model.predict_proba(user_scaled)[0]
+        # Compiled forest takes raw features; the scaler is folded into its thresholds
+        with stage("features"):
+            user_row = build_engagement_matrix([user_data], engagement_features)
+        with stage("inference"):
+            probability = engagement_forest.predict_proba(user_row)[0]
+            prediction = engagement_forest.classes[np.argmax(probability)]
         
         result = {
             "will_participate": bool(prediction),
             "participation_probability": float(probability[1]),
             "non_participation_probability": float(probability[0]),
             "confidence": float(max(probability)),
-            "recommendation": (
-                "High priority for event invitation" if probability[1] > 0.7 
-                else "Moderate priority" if probability[1] > 0.5 
-                else "Send reminder with incentives"
-            ),
+            "recommendation": engagement_recommendation(probability[1]),
             "status": "success"
         }
         
@@ -186,6 +352,8 @@ def predict_engagement():
     except Exception as e:
         return jsonify({"error": str(e), "status": "error"}), 400
 
+ENGAGEMENT_COMPILED_MAX_BATCH = int(os.environ.get("ECOTRACK_ENGAGEMENT_COMPILED_MAX_BATCH", 256))
+
 @app.route("/api/predict-engagement-batch", methods=["POST"])
 def predict_engagement_batch():
     """
@@ -199,54 +367,232 @@ def predict_engagement_batch():
         ]
     }
     """
+    bundle = registry.get("engagement")
+    engagement_features = bundle["features"]
+    
     try:
-        if engagement_model is None:
-            return jsonify({"error": "Engagement model not loaded"}), 500
-        
         users_data = request.json.get("users", [])
-        results = []
+        BATCH_SIZE.observe(len(users_data), g.metrics_route)
         
-        for user_data in users_data:
-            user_df = pd.DataFrame([user_data])[engagement_features]
-            user_scaled = engagement_scaler.transform(user_df)
-            
-            prediction = engagement_model.predict(user_scaled)[0]
-            probability = engagement_model.predict_proba(user_scaled)[0]
-            
-            result = {
+        # Compiled forest (shared, memory-mapped) for typical batches; sklearn's
+        # tree walk is faster for large ones, so its pickle is loaded on first need
+        if len(users_data) <= ENGAGEMENT_COMPILED_MAX_BATCH:
+            engagement_model, engagement_scaler = bundle["forest"], None
+        else:
+            engagement_model, engagement_scaler = bundle["model"], bundle["scaler"]
+        
+        # Single scaler/forest pass over the whole batch
+        will_participate, probabilities = offload(
+            score_engagement_batch,
+            users_data, engagement_model, engagement_scaler, engagement_features,
+            stage=route_stage()
+        )
+        participation = probabilities[:, 1]
+        participation_list = participation.tolist()
+        confidence_list = probabilities.max(axis=1).tolist()
+        will_participate_list = will_participate.tolist()
+        
+        results = [
+            {
                 "user_id": user_data.get("user_id", "unknown"),
-                "will_participate": bool(prediction),
-                "participation_probability": float(probability[1]),
-                "confidence": float(max(probability))
+                "will_participate": will_participate_list[i],
+                "participation_probability": participation_list[i],
+                "confidence": confidence_list[i]
             }
-            results.append(result)
+            for i, user_data in enumerate(users_data)
+        ]
         
         return jsonify({
             "predictions": results,
             "total_users": len(results),
-            "high_probability_count": sum(1 for r in results if r["participation_probability"] > 0.7),
+            "high_probability_count": int((participation > 0.7).sum()),
             "status": "success"
         })
         
+    except (InferencePoolBusy, InferenceTimeout):
+        raise
     except Exception as e:
         return jsonify({"error": str(e), "status": "error"}), 400
 
+# Users read, scored and written per step of a streaming request, and the longest accepted line
+ENGAGEMENT_STREAM_CHUNK = int(os.environ.get("ECOTRACK_ENGAGEMENT_STREAM_CHUNK", 256))
+NDJSON_MAX_LINE_BYTES = 64 * 1024
+
+def ndjson_chunks(stream, chunk_size, max_line_bytes=NDJSON_MAX_LINE_BYTES):
+    """
+    Parse newline-delimited JSON records from a binary stream, chunk_size at a time
+    
+    Yields lists of (line_number, record, error) where record is None if the
+    line is not a JSON object. Blank lines are skipped. Only the current
+    chunk is held in memory; longer lines than max_line_bytes are rejected
+    without being buffered.
+    """
+    chunk = []
+    line_number = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            break
+        line_number += 1
+        if len(line) > max_line_bytes and not line.endswith(b"\n"):
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(max_line_bytes + 1)
+            chunk.append((line_number, None, f"line longer than {max_line_bytes} bytes"))
+        else:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                chunk.append((line_number, None, f"invalid JSON: {e}"))
+            else:
+                if isinstance(record, dict):
+                    chunk.append((line_number, record, None))
+                else:
+                    chunk.append((line_number, None, "record is not a JSON object"))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def score_engagement_chunk(chunk, model, scaler, feature_columns, stage):
+    """
+    NDJSON result lines for one chunk of streamed users, in input order
+    
+    The chunk is scored in one vectorized pass. If that fails, the records
+    are checked one by one, so a bad record only fails its own line.
+    Returns (body_bytes, scored, high_probability_count).
+    """
+    errors = {line_number: error for line_number, _, error in chunk if error is not None}
+    valid = [(line_number, record) for line_number, record, error in chunk if error is None]
+    try:
+        will_participate, probabilities = score_engagement_batch(
+            [record for _, record in valid], model, scaler, feature_columns, stage=stage
+        )
+    except (KeyError, TypeError, ValueError):
+        checked = []
+        for line_number, record in valid:
+            try:
+                build_engagement_matrix([record], feature_columns)
+                checked.append((line_number, record))
+            except KeyError as e:
+                errors[line_number] = f"missing feature {e}"
+            except (TypeError, ValueError) as e:
+                errors[line_number] = str(e)
+        valid = checked
+        will_participate, probabilities = score_engagement_batch(
+            [record for _, record in valid], model, scaler, feature_columns, stage=stage
+        )
+    
+    with stage("serialize"):
+        participation_list = probabilities[:, 1].tolist()
+        confidence_list = probabilities.max(axis=1).tolist()
+        will_participate_list = will_participate.tolist()
+        results = iter(range(len(valid)))
+        lines = []
+        for line_number, record, _ in chunk:
+            if line_number in errors:
+                line = {"line": line_number, "error": errors[line_number], "status": "error"}
+            else:
+                i = next(results)
+                line = {
+                    "user_id": record.get("user_id", "unknown"),
+                    "will_participate": will_participate_list[i],
+                    "participation_probability": participation_list[i],
+                    "confidence": confidence_list[i]
+                }
+            lines.append(json.dumps(line, separators=(",", ":")))
+        lines.append("")
+    
+    high_probability = sum(1 for p in participation_list if p > 0.7)
+    return "\n".join(lines).encode(), len(valid), high_probability
+
+@app.route("/api/predict-engagement-stream", methods=["POST"])
+def predict_engagement_stream():
+    """
+    Predict engagement for a stream of users (newline-delimited JSON)
+    
+    Request body (Content-Type: application/x-ndjson), one user per line:
+    {"user_id": "u1", "age": 28, "points_earned": 150, ...}
+    {"user_id": "u2", ...}
+    
+    Response (application/x-ndjson), one line per input user in input order,
+    streamed as each chunk is scored, then a summary line:
+    {"user_id": "u1", "will_participate": true, "participation_probability": 0.85, "confidence": 0.85}
+    {"line": 2, "error": "missing feature 'age'", "status": "error"}
+    {"total_users": 2, "scored": 1, "high_probability_count": 1, "errors": 1, "status": "success"}
+    
+    Users are read, scored and written ECOTRACK_ENGAGEMENT_STREAM_CHUNK at a
+    time, so memory use does not grow with the input size.
+    """
+    bundle = registry.get("engagement")
+    engagement_features = bundle["features"]
+    if ENGAGEMENT_STREAM_CHUNK <= ENGAGEMENT_COMPILED_MAX_BATCH:
+        engagement_model, engagement_scaler = bundle["forest"], None
+    else:
+        engagement_model, engagement_scaler = bundle["model"], bundle["scaler"]
+    route = g.metrics_route
+    chunk_stage = route_stage()
+    
+    def score(chunk, wait=0):
+        return inference_pool.run(
+            score_engagement_chunk,
+            chunk, engagement_model, engagement_scaler, engagement_features, chunk_stage,
+            timeout=INFERENCE_TIMEOUT, wait=wait
+        )
+    
+    # The first chunk is scored before the response starts, so a full pool
+    # or an unreadable body still gets a proper status code
+    chunks = ndjson_chunks(request.stream, ENGAGEMENT_STREAM_CHUNK)
+    try:
+        first = next(chunks, None)
+        first_result = score(first) if first else None
+    except (InferencePoolBusy, InferenceTimeout):
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+    
+    @stream_with_context
+    def generate():
+        total = scored = high_probability = 0
+        chunk, result = first, first_result
+        try:
+            while chunk:
+                body, chunk_scored, chunk_high = result
+                total += len(chunk)
+                scored += chunk_scored
+                high_probability += chunk_high
+                yield body
+                chunk = next(chunks, None)
+                if chunk:
+                    # Headers are sent: wait for the pool instead of failing the stream
+                    result = score(chunk, wait=INFERENCE_TIMEOUT)
+        except Exception as e:
+            yield json.dumps({
+                "error": str(e) or type(e).__name__,
+                "total_users": total,
+                "status": "error"
+            }).encode() + b"\n"
+            return
+        finally:
+            BATCH_SIZE.observe(total, route)
+        
+        yield json.dumps({
+            "total_users": total,
+            "scored": scored,
+            "high_probability_count": high_probability,
+            "errors": total - scored,
+            "status": "success"
+        }).encode() + b"\n"
+    
+    return Response(generate(), content_type="application/x-ndjson")
+
 # ============================================================================
 # MODEL 4: WASTE HOTSPOT DETECTION
 # ============================================================================
 
-try:
-    hotspot_model = joblib.load("hotspot_model.pkl")
-    hotspot_scaler = joblib.load("hotspot_scaler.pkl")
-    with open("hotspot_features.json", "r") as f:
-        hotspot_features = json.load(f)
-    with open("cluster_statistics.json", "r") as f:
-        cluster_statistics = json.load(f)
-    print("✓ Hotspot model loaded")
-except:
-    print("⚠ Hotspot model not found")
-    hotspot_model = None
-
 @app.route("/api/detect-hotspots", methods=["POST"])
 def detect_hotspots():
     """
@@ -271,42 +617,61 @@ def detect_hotspots():
         "status": "success"
     }
     """
+    bundle = registry.get("hotspot")
+    hotspot_model = bundle["model"]
+    hotspot_scaler = bundle["scaler"]
+    hotspot_features = bundle["features"]
+    cluster_table = bundle["cluster_table"]
+    
     try:
-        if hotspot_model is None:
-            return jsonify({"error": "Hotspot model not loaded"}), 500
-        
         reports = request.json.get("reports", [])
-        df = pd.DataFrame(reports)
+        BATCH_SIZE.observe(len(reports), g.metrics_route)
         
-        # Calculate recency weight
-        df['report_date'] = pd.to_datetime(df['report_date'])
-        days_old = (pd.Timestamp.now() - df['report_date']).dt.days
-        df['recency_weight'] = 1 / (1 + days_old / 30)
+        def score(stage):
+            # Recency weight + scaling
+            with stage("features"):
+                df, X_scaled = hotspot_feature_matrix(reports, hotspot_features, hotspot_scaler)
+            
+            with stage("inference"):
+                return df, hotspot_model.predict(X_scaled)
         
-        X = df[hotspot_features]
-        X_scaled = hotspot_scaler.transform(X)
+        df, predictions = offload(score, route_stage())
         
-        predictions = hotspot_model.predict(X_scaled)
+        # Indexed cluster lookup and distance to each hotspot center, whole batch at once
+        rows = cluster_table.rows(predictions)
+        distances = cluster_table.distances_km(
+            rows, df['latitude'].to_numpy(dtype=float), df['longitude'].to_numpy(dtype=float)
+        )
+        distances = np.round(distances, 3)
         
-        results = []
-        for i, cluster_id in enumerate(predictions):
-            stats = next((s for s in cluster_statistics if s['cluster_id'] == cluster_id), None)
-            
-            result = {
-                "report_index": i,
-                "cluster_id": int(cluster_id),
-                "priority": stats['priority'] if stats else 'Unknown',
-                "hotspot_location": {
-                    "latitude": stats['avg_latitude'],
-                    "longitude": stats['avg_longitude']
-                } if stats else None,
-                "cluster_info": {
+        # Per-cluster response fragments are built once and shared across reports
+        cluster_fragments = [
+            (
+                stats['priority'],
+                {"latitude": stats['avg_latitude'], "longitude": stats['avg_longitude']},
+                {
                     "num_reports": stats['num_reports'],
                     "total_waste_kg": stats['total_waste_kg'],
                     "avg_severity": stats['avg_severity']
-                } if stats else None
-            }
-            results.append(result)
+                }
+            )
+            for stats in cluster_table.records
+        ]
+        unknown_fragment = ('Unknown', None, None)
+        
+        results = []
+        for i, (cluster_id, row, distance) in enumerate(
+            zip(predictions.tolist(), rows.tolist(), distances.tolist())
+        ):
+            priority, location, info = cluster_fragments[row] if row >= 0 else unknown_fragment
+            results.append({
+                "report_index": i,
+                "cluster_id": cluster_id,
+                "priority": priority,
+                "hotspot_location": location,
+                "distance_to_center_km": distance if row >= 0 else None,
+                "cluster_info": info
+            })
         
         return jsonify({
             "predictions": results,
@@ -314,6 +679,61 @@ def detect_hotspots():
             "status": "success"
         })
         
+    except (InferencePoolBusy, InferenceTimeout):
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+
+# New reports update centroids and cluster aggregates between retrains
+hotspot_stream = HotspotStream()
+
+# Raw reports, kept for the next hotspot retrain
+report_store = ReportStore()
+
+@app.route("/api/hotspots/ingest", methods=["POST"])
+def ingest_hotspot_reports():
+    """
+    Fold new waste reports into the hotspot clusters without retraining
+    
+    Request body: same "reports" list as /api/detect-hotspots
+    
+    Updated statistics are served by /api/hotspots/top-priority right away
+    and written to the hotspot artifacts every ECOTRACK_HOTSPOT_PERSIST_INTERVAL
+    seconds. The reports are also appended to the report store
+    (ECOTRACK_REPORT_STORE), which the next retrain reads.
+    
+    Response:
+    {
+        "ingested": 2,
+        "cluster_ids": [1, 0],
+        "persisted": false,
+        "status": "success"
+    }
+    """
+    bundle = registry.get("hotspot")
+    
+    try:
+        reports = request.json.get("reports", [])
+        if not reports:
+            return jsonify({"error": "No reports provided", "status": "error"}), 400
+        BATCH_SIZE.observe(len(reports), g.metrics_route)
+        
+        # The reports are stored only once they are assigned, and folded into
+        # the stream only once stored, so a failed request changes nothing and
+        # its retry is not counted twice
+        prepared = hotspot_feature_matrix(reports, bundle["features"], bundle["scaler"])
+        validate_ingest_frame(prepared[0])
+        labels, persisted = hotspot_stream.ingest(
+            bundle, reports, prepared, before_apply=lambda: report_store.append(reports)
+        )
+        
+        return jsonify({
+            "ingested": len(labels),
+            "cluster_ids": labels.tolist(),
+            "persisted": persisted,
+            "status": "success"
+        })
+    
     except Exception as e:
         return jsonify({"error": str(e), "status": "error"}), 400
 
@@ -324,16 +744,17 @@ def get_top_hotspots():
     
     Query params: ?top_n=5
     
+    Includes reports received through /api/hotspots/ingest since the last retrain.
+    
     Response:
     {
         "hotspots": [...],
         "status": "success"
     }
     """
+    cluster_statistics = hotspot_stream.cluster_statistics(registry.get("hotspot"))
+    
     try:
-        if hotspot_model is None:
-            return jsonify({"error": "Hotspot model not loaded"}), 500
-        
         top_n = int(request.args.get('top_n', 5))
         top_hotspots = cluster_statistics[:top_n]
         
@@ -357,12 +778,212 @@ def get_top_hotspots():
         return jsonify({
             "hotspots": recommendations,
             "total_clusters": len(cluster_statistics),
+            "updated_at": hotspot_stream.stats()["updated_at"],
             "status": "success"
         })
         
     except Exception as e:
         return jsonify({"error": str(e), "status": "error"}), 400
 
+@app.route("/api/hotspots/nearby", methods=["GET"])
+def get_nearby_hotspots():
+    """
+    Hotspot centers and waste reports near a point
+    
+    Query params: ?latitude=19.076&longitude=72.8777 plus
+        radius_km=2        everything within 2 km
+        k=5                the 5 nearest (within radius_km, if also given)
+        limit=100          max reports returned for a radius query
+    
+    Response:
+    {
+        "hotspots": [{"cluster_id": 0, "distance_km": 0.41, ...}],
+        "reports": [{"report_id": "R0042", "distance_km": 0.02, ...}],
+        "total_reports": 37,
+        "status": "success"
+    }
+    """
+    bundle = registry.get("hotspot")
+    cluster_table = bundle["cluster_table"]
+    center_index = bundle["center_index"]
+    report_index = bundle.get("report_index")
+    
+    try:
+        latitude = float(request.args["latitude"])
+        longitude = float(request.args["longitude"])
+        radius_km = float(request.args["radius_km"]) if "radius_km" in request.args else None
+        k = int(request.args["k"]) if "k" in request.args else None
+        limit = int(request.args.get("limit", 100))
+        if radius_km is None and k is None:
+            return jsonify({"error": "Provide radius_km and/or k", "status": "error"}), 400
+        
+        def query(index, limit=None):
+            # (indices, distances, number of matches), at most limit of them
+            if k is not None:
+                indices, distances = index.query_nearest(latitude, longitude, k, max_radius_km=radius_km)
+                return indices[:limit], distances[:limit], len(indices)
+            return index.query_radius(latitude, longitude, radius_km, limit=limit, return_count=True)
+        
+        hotspots = []
+        center_idx, center_dist, _ = query(center_index)
+        for row, distance in zip(center_index.columns["row"][center_idx].tolist(), center_dist.tolist()):
+            stats = cluster_table.records[row]
+            hotspots.append({
+                "cluster_id": stats['cluster_id'],
+                "location": {"latitude": stats['avg_latitude'], "longitude": stats['avg_longitude']},
+                "priority": stats['priority'],
+                "num_reports": stats['num_reports'],
+                "total_waste_kg": stats['total_waste_kg'],
+                "distance_km": round(distance, 3)
+            })
+        
+        reports = []
+        total_reports = 0
+        if report_index is not None:
+            report_idx, report_dist, total_reports = query(report_index, limit)
+            for report_id, lat, lng, cluster_id, distance in zip(
+                report_index.columns["report_id"][report_idx].tolist(),
+                report_index.latitude[report_idx].tolist(),
+                report_index.longitude[report_idx].tolist(),
+                report_index.columns["cluster"][report_idx].tolist(),
+                report_dist.tolist()
+            ):
+                reports.append({
+                    "report_id": report_id,
+                    "latitude": lat,
+                    "longitude": lng,
+                    "cluster_id": cluster_id,
+                    "distance_km": round(distance, 3)
+                })
+        
+        return jsonify({
+            "hotspots": hotspots,
+            "reports": reports,
+            "total_reports": total_reports,
+            "reports_indexed": report_index is not None,
+            "status": "success"
+        })
+    
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Invalid query: {e}", "status": "error"}), 400
+
+# ============================================================================
+# WARMUP & READINESS
+# ============================================================================
+
+def _warm_emission():
+    bundle = registry.get("emission")
+    row, _ = bundle["encoder"].encode({})
+    bundle["forest"].predict(row)
+
+def _warm_item_emission():
+    table = registry.get("item_emission")["table"]
+    table.quote([{"item_id": int(table.item_id[0]), "quantity": 1}] if len(table) else [])
+
+def _warm_engagement():
+    bundle = registry.get("engagement")
+    user = {feature: 0.0 for feature in bundle["features"]}
+    score_engagement_batch([user], bundle["forest"], None, bundle["features"])
+
+def _warm_hotspot():
+    bundle = registry.get("hotspot")
+    table = bundle["cluster_table"]
+    latitude = float(table.avg_latitude[0]) if len(table) else 0.0
+    longitude = float(table.avg_longitude[0]) if len(table) else 0.0
+    report = {
+        "latitude": latitude, "longitude": longitude, "waste_amount_kg": 1.0,
+        "severity": 1, "report_date": datetime.now().isoformat()
+    }
+    df, X_scaled = hotspot_feature_matrix([report], bundle["features"], bundle["scaler"])
+    table.rows(bundle["model"].predict(X_scaled))
+    bundle["center_index"].query_nearest(latitude, longitude, 1)
+
+def _warm_waste_classifier():
+    from PIL import Image
+    
+    bundle = registry.get("waste_classifier")
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(buffer, format="JPEG")
+    buffer.seek(0)
+    classifier_batcher.predict(bundle["preprocess"](buffer), timeout=CLASSIFIER_TIMEOUT)
+
+# One dummy inference per model through the same code the endpoints use
+WARMUPS = {
+    "emission": _warm_emission,
+    "item_emission": _warm_item_emission,
+    "engagement": _warm_engagement,
+    "hotspot": _warm_hotspot,
+    "waste_classifier": _warm_waste_classifier,
+}
+
+# Models a pod warms up before it reports ready (default: every model with artifacts)
+WARMUP_MODELS = [
+    name.strip() for name in os.environ.get("ECOTRACK_WARMUP_MODELS", "").split(",") if name.strip()
+]
+
+warmup_state = {"status": "not started", "ready": False, "models": {}}
+_warmup_lock = threading.Lock()
+
+def warmup(models=None):
+    """
+    Load each model and run one dummy inference through its serving path
+    
+    Models without artifacts are skipped. Returns True (ready) when every
+    other model loaded and answered.
+    """
+    with _warmup_lock:
+        warmup_state["status"] = "running"
+        results = {}
+        for name in models or WARMUP_MODELS or list(WARMUPS):
+            if not registry.is_available(name):
+                results[name] = {"status": "unavailable"}
+                continue
+            try:
+                started = time.perf_counter()
+                with startup_report.step(f"load {name}"):
+                    registry.get(name)
+                with startup_report.step(f"warm up {name}"):
+                    WARMUPS[name]()
+                results[name] = {"status": "ready", "seconds": round(time.perf_counter() - started, 4)}
+            except Exception as e:
+                results[name] = {"status": "error", "error": str(e)}
+        
+        ready = all(result["status"] != "error" for result in results.values())
+        warmup_state.update(status="done" if ready else "failed", ready=ready, models=results)
+        return ready
+
+@app.route("/api/warmup", methods=["POST"])
+def warmup_models():
+    """
+    Load and exercise the models, then report per-step startup timings
+    
+    Request body (optional): {"models": ["emission", "engagement"]}
+    200 once ready, 503 if a model failed to load or answer.
+    """
+    models = (request.get_json(silent=True) or {}).get("models")
+    unknown = [name for name in models or [] if name not in WARMUPS]
+    if unknown:
+        return jsonify({"error": f"Unknown models: {', '.join(unknown)}", "status": "error"}), 400
+    
+    ready = warmup(models)
+    return jsonify({
+        "ready": ready,
+        "models": warmup_state["models"],
+        "startup": startup_report.as_dict(),
+        "status": "success" if ready else "error"
+    }), 200 if ready else 503
+
+@app.route("/api/ready", methods=["GET"])
+def readiness_check():
+    """
+    Readiness probe: 503 until warmup has completed successfully
+    """
+    return jsonify({
+        "ready": warmup_state["ready"],
+        "warmup": warmup_state["status"],
+        "models": warmup_state["models"]
+    }), 200 if warmup_state["ready"] else 503
+
 # ============================================================================
 # HEALTH CHECK & INFO ENDPOINTS
 # ============================================================================
@@ -371,16 +992,22 @@ def get_top_hotspots():
 def health_check():
     """Health check endpoint"""
     models_status = {
-        "emission_model": emission_model is not None,
-        "engagement_model": engagement_model is not None,
-        "hotspot_model": hotspot_model is not None,
-        "waste_classifier": False  # Image model requires TensorFlow
+        "emission_model": registry.is_available("emission"),
+        "engagement_model": registry.is_available("engagement"),
+        "hotspot_model": registry.is_available("hotspot"),
+        "waste_classifier": registry.is_available("waste_classifier")
     }
     
     return jsonify({
         "status": "healthy",
         "service": "EcoTrack ML API",
         "models": models_status,
+        "versions": {name: info["version"] for name, info in registry.status().items()},
+        "emission_cache": emission_cache.stats(),
+        "hotspot_stream": hotspot_stream.stats(),
+        "report_store": report_store.stats(),
+        "inference_pool": inference_pool.stats(),
+        "warmup": warmup_state["status"],
         "timestamp": datetime.now().isoformat()
     })
 
@@ -393,28 +1020,28 @@ def models_info():
             "endpoint": "/api/predict-emission",
             "method": "POST",
             "description": "Predicts CO2 emissions from waste items",
-            "status": "active" if emission_model else "not loaded"
+            "status": "active" if registry.is_available("emission") else "not loaded"
         },
         {
             "name": "Waste Image Classifier",
             "endpoint": "/api/classify-waste",
             "method": "POST",
             "description": "Classifies waste type from images",
-            "status": "demo mode"
+            "status": "active" if registry.is_available("waste_classifier") else "not loaded"
         },
         {
             "name": "User Engagement Predictor",
             "endpoint": "/api/predict-engagement",
             "method": "POST",
             "description": "Predicts user participation likelihood",
-            "status": "active" if engagement_model else "not loaded"
+            "status": "active" if registry.is_available("engagement") else "not loaded"
         },
         {
             "name": "Waste Hotspot Detector",
             "endpoint": "/api/detect-hotspots",
             "method": "POST",
             "description": "Identifies waste accumulation hotspots",
-            "status": "active" if hotspot_model else "not loaded"
+            "status": "active" if registry.is_available("hotspot") else "not loaded"
         }
     ]
     
@@ -424,6 +1051,22 @@ def models_info():
         "active_models": sum(1 for m in models if m["status"] == "active")
     })
 
+# ============================================================================
+# SHUTDOWN
+# ============================================================================
+
+def shutdown():
+    """
+    Drain in-flight inference and flush pending hotspot updates
+    
+    Called by serve.py when a worker exits; requests still being served
+    finish first (gunicorn's graceful timeout).
+    """
+    inference_pool.close()
+    classifier_batcher.close()
+    if hotspot_stream.close():
+        print("✓ Pending hotspot updates written")
+
 # ============================================================================
 # RUN SERVER
 # ============================================================================
@@ -434,13 +1077,24 @@ if __name__ == "__main__":
     print("="*60)
     print("\nAvailable Endpoints:")
     print("  • POST /api/predict-emission")
+    print("  • POST /api/predict-emission/items")
     print("  • POST /api/classify-waste")
     print("  • POST /api/predict-engagement")
     print("  • POST /api/predict-engagement-batch")
+    print("  • POST /api/predict-engagement-stream")
     print("  • POST /api/detect-hotspots")
+    print("  • POST /api/hotspots/ingest")
     print("  • GET  /api/hotspots/top-priority")
+    print("  • GET  /api/hotspots/nearby")
     print("  • GET  /api/health")
     print("  • GET  /api/models/info")
+    print("  • GET  /api/metrics")
+    print("  • POST /api/warmup")
+    print("  • GET  /api/ready")
     print("\n" + "="*60)
     
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    warmup()
+    startup_report.print_report()
+    print("\nDevelopment server; use `python serve.py` in production")
+    
+    app.run(host='0.0.0.0', port=5001, threaded=True)
@@ -0,0 +1,535 @@
+# model_registry.py
+"""
+Model Registry for the EcoTrack ML Service
+Knows the artifacts of every model, loads them on first use and swaps in
+new versions written by the training scripts without a restart
+"""
+
+import os
+import json
+import mmap
+import time
+import struct
+import zipfile
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+# Artifacts live next to this file unless overridden
+MODEL_DIR = os.environ.get(
+    "ECOTRACK_MODEL_DIR", os.path.dirname(os.path.abspath(__file__))
+)
+
+# Seconds between artifact change checks for an already loaded model
+CHECK_INTERVAL = float(os.environ.get("ECOTRACK_MODEL_CHECK_INTERVAL", "2.0"))
+
+# Waste classifier artifact: the Keras .h5 model, or the int8 .tflite export
+# which is served with the TFLite interpreter alone (no TensorFlow import)
+CLASSIFIER_MODEL_FILE = os.environ.get("ECOTRACK_CLASSIFIER_MODEL", "waste_classifier_model.h5")
+
+# A publish marker older than this is treated as left over from a crashed trainer
+PUBLISH_MARKER_TIMEOUT = 600
+
+# .npz members start on this boundary so they can be used straight from a memory map;
+# smaller arrays are copied into memory on load
+NPZ_ALIGNMENT = 64
+NPZ_MMAP_MIN_BYTES = 4096
+
+
+class ModelUnavailableError(Exception):
+    """Raised when a model's artifacts are missing or cannot be loaded"""
+
+
+def artifact_path(filename, model_dir=None):
+    """
+    Resolve an artifact filename against the model directory
+    """
+    if os.path.isabs(filename):
+        return filename
+    return os.path.join(model_dir or MODEL_DIR, filename)
+
+
+def _replace_atomically(path, write):
+    """
+    Write a file through a temp file in the same directory, then rename it
+    into place so readers only ever see the old or the new file
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    os.close(fd)
+    try:
+        write(tmp_path)
+        # mkstemp creates 0600 files; give artifacts the usual umask-based mode
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write(filename, write):
+    """
+    Atomically create an artifact; write(tmp_path) produces the file contents
+    """
+    path = artifact_path(filename)
+    _replace_atomically(path, write)
+    return path
+
+
+def atomic_joblib_dump(obj, filename):
+    """
+    joblib.dump that never leaves a half-written artifact behind
+    """
+    import joblib
+
+    path = artifact_path(filename)
+    _replace_atomically(path, lambda tmp: joblib.dump(obj, tmp))
+    return path
+
+
+def atomic_json_dump(obj, filename):
+    """
+    json.dump that never leaves a half-written artifact behind
+    """
+    path = artifact_path(filename)
+
+    def write(tmp):
+        with open(tmp, "w") as f:
+            json.dump(obj, f)
+
+    _replace_atomically(path, write)
+    return path
+
+
+def atomic_npz_dump(arrays, filename):
+    """
+    Uncompressed .npz with every array aligned in the file, written atomically
+
+    Same format as np.savez (np.load reads it), but each member's local
+    header is padded (zipalign-style extra field) so the array data starts
+    on an NPZ_ALIGNMENT boundary, which is what lets load_npz map it.
+    """
+    path = artifact_path(filename)
+
+    def write(tmp):
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for name, value in arrays.items():
+                value = np.asanyarray(value)
+                info = zipfile.ZipInfo(f"{name}.npy", date_time=(1980, 1, 1, 0, 0, 0))
+                # Local header: 30 bytes, file name, padding field, 20-byte zip64 field;
+                # np.lib.format pads the .npy header to a multiple of 64 itself
+                header_end = archive.fp.tell() + 30 + len(info.filename) + 4 + 20
+                padding = -header_end % NPZ_ALIGNMENT
+                info.extra = struct.pack("<HH", 0xD935, padding) + b"\0" * padding
+                with archive.open(info, "w", force_zip64=True) as member:
+                    np.lib.format.write_array(member, value, allow_pickle=False)
+
+    _replace_atomically(path, write)
+    return path
+
+
+_NPY_HEADER_READERS = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0,
+}
+
+
+def load_npz(path):
+    """
+    Arrays of an .npz artifact, memory-mapped read-only where possible
+
+    Every process that loads the same file shares its page-cache pages
+    instead of holding a private copy. Compressed, unaligned (plain
+    np.savez) and small members are read into memory as usual.
+    """
+    arrays = {}
+    with open(path, "rb") as f, zipfile.ZipFile(f) as archive:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            array = None
+            if info.compress_type == zipfile.ZIP_STORED:
+                name_length, extra_length = struct.unpack(
+                    "<HH", mapped[info.header_offset + 26:info.header_offset + 30]
+                )
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                version = np.lib.format.read_magic(f)
+                read_header = _NPY_HEADER_READERS.get(version)
+                if read_header is not None:
+                    shape, fortran_order, dtype = read_header(f)
+                    offset = f.tell()
+                    count = int(np.prod(shape))
+                    if (not dtype.hasobject and offset % dtype.alignment == 0
+                            and count * dtype.itemsize >= NPZ_MMAP_MIN_BYTES):
+                        array = np.frombuffer(mapped, dtype=dtype, count=count, offset=offset)
+                        array = array.reshape(shape, order="F" if fortran_order else "C")
+            if array is None:
+                with archive.open(info) as member:
+                    array = np.lib.format.read_array(member, allow_pickle=False)
+            arrays[name] = array
+    return arrays
+
+
+def _publish_marker(name, model_dir=None):
+    return artifact_path(f".{name}.publishing", model_dir)
+
+
+@contextmanager
+def publishing(name):
+    """
+    Mark a model as being republished while its artifacts are rewritten
+
+    The registry keeps serving the previous version until the block exits,
+    so a reader never combines, say, a new model with an old scaler.
+    """
+    marker = _publish_marker(name)
+    with open(marker, "w") as f:
+        f.write(str(os.getpid()))
+    try:
+        yield
+    finally:
+        if os.path.exists(marker):
+            os.remove(marker)
+
+
+class ModelSpec:
+    """
+    Declares the artifacts that make up one model
+
+    artifacts: dict of artifact key -> filename, all required
+    optional: dict of artifact key -> filename, loaded when present
+    deferred: dict of artifact key -> filename, required but only loaded on
+              first lookup (e.g. an sklearn pickle that is only needed when
+              its compiled form is missing or for large batches)
+    prepare: optional callable(artifacts) -> artifacts that derives serving
+             structures once per loaded version
+    """
+
+    def __init__(self, name, artifacts, optional=None, prepare=None, deferred=None):
+        self.name = name
+        self.artifacts = dict(artifacts)
+        self.optional = dict(optional or {})
+        self.deferred = dict(deferred or {})
+        self.prepare = prepare
+
+
+class _Artifacts(dict):
+    """
+    Loaded artifacts of one version; deferred keys are loaded on first lookup
+    """
+
+    def __init__(self, deferred_paths):
+        super().__init__()
+        self.deferred_paths = deferred_paths
+        self._lock = threading.Lock()
+
+    def __missing__(self, key):
+        if key not in self.deferred_paths:
+            raise KeyError(key)
+        with self._lock:
+            if not dict.__contains__(self, key):
+                self[key] = _load_artifact(self.deferred_paths[key])
+            return dict.__getitem__(self, key)
+
+
+class ModelBundle:
+    """
+    Immutable snapshot of one loaded model version
+
+    Requests hold on to the bundle they started with, so a hot swap never
+    changes the artifacts under an in-flight request.
+    """
+
+    def __init__(self, name, version, artifacts):
+        self.name = name
+        self.version = version
+        self.artifacts = artifacts
+        self.loaded_at = datetime.now().isoformat()
+
+    def __getitem__(self, key):
+        return self.artifacts[key]
+
+    def __contains__(self, key):
+        return key in self.artifacts or key in self.artifacts.deferred_paths
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+def _load_artifact(path):
+    """
+    Load a single artifact based on its file extension
+    """
+    if path.endswith(".json"):
+        with open(path, "r") as f:
+            return json.load(f)
+    if path.endswith(".npz"):
+        arrays = load_npz(path)
+        if "format" in arrays and str(arrays["format"]) == "grid_index":
+            from spatial_index import GridIndex
+            return GridIndex.from_arrays(arrays)
+        from compiled_forest import CompiledForest
+        return CompiledForest.from_arrays(arrays)
+    if path.endswith(".h5"):
+        from waste_classifier import load_classifier
+        return load_classifier(path)
+    if path.endswith(".tflite"):
+        from waste_classifier_tflite import load_tflite_classifier
+        return load_tflite_classifier(path)
+    import joblib
+    return joblib.load(path)
+
+
+class _Entry:
+    def __init__(self, spec):
+        self.spec = spec
+        self.bundle = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Lazily loads models and atomically swaps in retrained versions
+    """
+
+    def __init__(self, model_dir=None, check_interval=None):
+        self.model_dir = model_dir or MODEL_DIR
+        self.check_interval = CHECK_INTERVAL if check_interval is None else check_interval
+        self._entries = {}
+
+    def register(self, spec):
+        self._entries[spec.name] = _Entry(spec)
+
+    def names(self):
+        return list(self._entries)
+
+    def _path(self, filename):
+        return artifact_path(filename, self.model_dir)
+
+    def _signature(self, spec):
+        """
+        (filename, size, mtime) of every artifact present on disk
+        """
+        signature = []
+        files = list(spec.artifacts.items()) + list(spec.deferred.items()) + list(spec.optional.items())
+        for key, filename in files:
+            try:
+                st = os.stat(self._path(filename))
+            except FileNotFoundError:
+                if key not in spec.optional:
+                    raise ModelUnavailableError(
+                        f"{spec.name}: missing artifact {self._path(filename)}"
+                    )
+                continue
+            signature.append((filename, st.st_size, st.st_mtime_ns))
+        return tuple(signature)
+
+    @staticmethod
+    def _version(signature):
+        digest = hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()
+        return digest[:12]
+
+    def _is_publishing(self, name):
+        marker = _publish_marker(name, self.model_dir)
+        try:
+            age = time.time() - os.stat(marker).st_mtime
+        except FileNotFoundError:
+            return False
+        return age < PUBLISH_MARKER_TIMEOUT
+
+    def _load(self, spec, signature):
+        """
+        Load every artifact, retrying if they change underneath us
+        """
+        for _ in range(3):
+            artifacts = _Artifacts({
+                key: self._path(filename) for key, filename in spec.deferred.items()
+            })
+            for key, filename in spec.artifacts.items():
+                artifacts[key] = _load_artifact(self._path(filename))
+            for key, filename in spec.optional.items():
+                path = self._path(filename)
+                if os.path.exists(path):
+                    artifacts[key] = _load_artifact(path)
+
+            current = self._signature(spec)
+            if current == signature:
+                break
+            signature = current
+        else:
+            raise ModelUnavailableError(f"{spec.name}: artifacts kept changing while loading")
+
+        if spec.prepare is not None:
+            artifacts = spec.prepare(artifacts)
+
+        return ModelBundle(spec.name, self._version(signature), artifacts)
+
+    def get(self, name, refresh=False):
+        """
+        Return the current bundle for a model, loading or reloading it if needed
+
+        refresh: check the artifacts on disk now instead of every check_interval
+        """
+        entry = self._entries[name]
+        bundle = entry.bundle
+        if not refresh and bundle is not None and time.monotonic() - entry.checked_at < self.check_interval:
+            return bundle
+
+        with entry.lock:
+            bundle = entry.bundle
+            if not refresh and bundle is not None and time.monotonic() - entry.checked_at < self.check_interval:
+                return bundle
+
+            try:
+                if bundle is not None and self._is_publishing(name):
+                    return bundle
+
+                signature = self._signature(entry.spec)
+                if bundle is not None and self._version(signature) == bundle.version:
+                    return bundle
+
+                new_bundle = self._load(entry.spec, signature)
+            except ModelUnavailableError:
+                if bundle is not None:
+                    return bundle
+                raise
+            except Exception as e:
+                if bundle is not None:
+                    print(f"⚠ Keeping {name} model {bundle.version}, reload failed: {e}")
+                    return bundle
+                raise ModelUnavailableError(f"{name}: {e}") from e
+            finally:
+                entry.checked_at = time.monotonic()
+
+            if bundle is None:
+                print(f"✓ {name} model loaded (version {new_bundle.version})")
+            else:
+                print(f"✓ {name} model swapped {bundle.version} -> {new_bundle.version}")
+            entry.bundle = new_bundle
+            return new_bundle
+
+    def is_available(self, name):
+        """
+        True if the model is loaded or all of its required artifacts exist
+        """
+        entry = self._entries[name]
+        if entry.bundle is not None:
+            return True
+        try:
+            self._signature(entry.spec)
+            return True
+        except ModelUnavailableError:
+            return False
+
+    def status(self):
+        """
+        Per-model load state, for health and info endpoints
+        """
+        status = {}
+        for name, entry in self._entries.items():
+            bundle = entry.bundle
+            status[name] = {
+                "available": self.is_available(name),
+                "loaded": bundle is not None,
+                "version": bundle.version if bundle else None,
+                "loaded_at": bundle.loaded_at if bundle else None,
+            }
+        return status
+
+
+# ============================================================================
+# DEFAULT REGISTRY
+# ============================================================================
+
+def _prepare_emission(artifacts):
+    from compiled_forest import compile_forest
+    from emission_encoder import EmissionEncoder
+
+    artifacts["encoder"] = EmissionEncoder(artifacts["columns"])
+    if "forest" not in artifacts:
+        artifacts["forest"] = compile_forest(artifacts["model"])
+    return artifacts
+
+
+def _prepare_engagement(artifacts):
+    from compiled_forest import compile_forest
+
+    if "forest" not in artifacts:
+        artifacts["forest"] = compile_forest(artifacts["model"], scaler=artifacts["scaler"])
+    return artifacts
+
+
+def _prepare_item_emission(artifacts):
+    from emission_catalog import ItemEmissionTable
+
+    artifacts["table"] = ItemEmissionTable(artifacts["table"])
+    return artifacts
+
+
+def _prepare_waste_classifier(artifacts):
+    from image_preprocessing import load_image_array
+
+    artifacts["preprocess"] = load_image_array
+    return artifacts
+
+
+def _prepare_hotspot(artifacts):
+    from hotspot_clusters import ClusterTable
+    from spatial_index import GridIndex
+
+    table = ClusterTable(artifacts["cluster_statistics"])
+    artifacts["cluster_table"] = table
+    artifacts["center_index"] = GridIndex.build(
+        table.avg_latitude, table.avg_longitude, row=np.arange(len(table))
+    )
+    return artifacts
+
+
+MODEL_SPECS = [
+    # The sklearn pickles are only unpickled when a compiled forest is missing
+    # (or, for engagement, for large batches); the forests are memory-mapped
+    ModelSpec("emission", {
+        "columns": "model_columns.pkl",
+    }, deferred={
+        "model": "emission_model.pkl",
+    }, optional={
+        "forest": "emission_forest.npz",
+    }, prepare=_prepare_emission),
+    ModelSpec("item_emission", {
+        "table": "item_emission_table.json",
+    }, prepare=_prepare_item_emission),
+    ModelSpec("waste_classifier", {
+        "model": CLASSIFIER_MODEL_FILE,
+        "categories": "waste_categories.json",
+    }, prepare=_prepare_waste_classifier),
+    ModelSpec("engagement", {
+        "scaler": "engagement_scaler.pkl",
+        "features": "engagement_features.json",
+    }, deferred={
+        "model": "engagement_model.pkl",
+    }, optional={
+        "forest": "engagement_forest.npz",
+    }, prepare=_prepare_engagement),
+    ModelSpec("hotspot", {
+        "model": "hotspot_model.pkl",
+        "scaler": "hotspot_scaler.pkl",
+        "features": "hotspot_features.json",
+        "cluster_statistics": "cluster_statistics.json",
+    }, optional={
+        "report_index": "hotspot_spatial_index.npz",
+    }, prepare=_prepare_hotspot),
+]
+
+registry = ModelRegistry()
+for _spec in MODEL_SPECS:
+    registry.register(_spec)
@@ -0,0 +1,138 @@
+# prediction_cache.py
+"""
+Bounded LRU/TTL cache for model predictions
+Entries are tied to a model version and dropped as soon as it changes
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Rough per-entry bookkeeping cost on top of the key (OrderedDict node, tuple, floats)
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def row_key(row):
+    """
+    Canonical, order-independent key for an encoded feature row
+
+    Built from the non-zero slots of the model input, so requests that
+    differ only in field order or int/float spelling share one entry.
+    """
+    row = np.asarray(row, dtype=np.float32)
+    slots = np.flatnonzero(row).astype(np.int32)
+    return slots.tobytes() + row[slots].tobytes()
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with a TTL, an entry limit and a memory bound
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=300.0, max_bytes=16 * 1024 * 1024):
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_bytes = int(max_bytes)
+
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, prefix):
+        """
+        Build a cache from <prefix>_ENTRIES, <prefix>_TTL and <prefix>_MAX_BYTES
+        """
+        return cls(
+            max_entries=int(os.environ.get(f"{prefix}_ENTRIES", 10000)),
+            ttl_seconds=float(os.environ.get(f"{prefix}_TTL", 300)),
+            max_bytes=int(os.environ.get(f"{prefix}_MAX_BYTES", 16 * 1024 * 1024)),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def _check_version(self, version):
+        # Caller holds the lock
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, key, version):
+        """
+        Cached value for key under the given model version, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, version, value):
+        if not self.enabled:
+            return
+        size = sys.getsizeof(key) + ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            self._check_version(version)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "model_version": self._version,
+            }
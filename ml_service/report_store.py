@@ -0,0 +1,295 @@
+# report_store.py
+"""
+Columnar on-disk store of waste reports
+Every append writes one segment of typed .npy column files, sorted by
+report date; reads memory-map the columns and skip segments (and rows)
+outside the requested date range, so a retrain never re-parses CSV or JSON
+"""
+
+import os
+import json
+import shutil
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from model_registry import artifact_path, atomic_json_dump
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within one process
+    fcntl = None
+
+STORE_DIR = os.environ.get("ECOTRACK_REPORT_STORE", "report_store")
+MANIFEST_FILE = "manifest.json"
+
+# Column name -> dtype on disk (report ids are ASCII, a quarter of the size of unicode)
+COLUMNS = {
+    "report_id": "S24",
+    "latitude": "float64",
+    "longitude": "float64",
+    "waste_amount_kg": "float32",
+    "severity": "int8",
+    "report_date": "datetime64[s]",
+}
+REQUIRED_COLUMNS = ["latitude", "longitude", "waste_amount_kg", "severity", "report_date"]
+
+# Segments below SMALL_SEGMENT_ROWS rows are merged once there are
+# MAX_SMALL_SEGMENTS of them, so many small appends stay cheap to read
+SMALL_SEGMENT_ROWS = 100_000
+MAX_SMALL_SEGMENTS = 16
+
+
+def _to_datetime64(value):
+    if value is None:
+        return None
+    import pandas as pd
+    return np.datetime64(pd.Timestamp(value).to_datetime64(), 's')
+
+
+def _to_columns(reports, id_prefix):
+    """
+    Typed column arrays from a DataFrame, a dict of arrays or a list of report dicts
+    """
+    import pandas as pd
+
+    if isinstance(reports, dict):
+        reports = {name: np.asarray(values) for name, values in reports.items()}
+    elif not isinstance(reports, pd.DataFrame):
+        reports = pd.DataFrame(reports)
+    missing = [name for name in REQUIRED_COLUMNS if name not in reports]
+    if missing:
+        raise ValueError(f"Missing report columns: {', '.join(missing)}")
+
+    n = len(reports['latitude'])
+    if 'report_id' in reports:
+        report_id = np.asarray(reports['report_id'])
+        if report_id.dtype.kind not in 'SU':
+            report_id = report_id.astype(str)
+    else:
+        report_id = np.char.add(f"{id_prefix}:", np.arange(n).astype(str))
+    max_length = np.dtype(COLUMNS['report_id']).itemsize
+    width = report_id.dtype.itemsize // (4 if report_id.dtype.kind == 'U' else 1)
+    if n and width > max_length and np.char.str_len(report_id).max() > max_length:
+        raise ValueError(f"report_id longer than {max_length} characters")
+    try:
+        report_id = report_id.astype(COLUMNS['report_id'])
+    except UnicodeEncodeError:
+        raise ValueError("report_id must be ASCII")
+
+    columns = {
+        'report_id': report_id,
+        'report_date': np.asarray(pd.to_datetime(reports['report_date'])).astype('datetime64[s]'),
+    }
+    for name in ['latitude', 'longitude', 'waste_amount_kg', 'severity']:
+        columns[name] = np.asarray(reports[name], dtype=float)
+    return {name: np.asarray(values).astype(COLUMNS[name]) for name, values in columns.items()}
+
+
+class ReportStore:
+    """
+    Append-only segments of report columns, listed in manifest.json
+
+        report_store/
+            manifest.json       segments with row counts and date ranges
+            seg-000001/         latitude.npy, longitude.npy, ... one file per column
+
+    A segment is written completely before the manifest (replaced
+    atomically) refers to it, so readers always see whole appends.
+    """
+
+    def __init__(self, path=None):
+        self.path = artifact_path(path or STORE_DIR)
+        self._lock = threading.Lock()
+
+    def _manifest_path(self):
+        return os.path.join(self.path, MANIFEST_FILE)
+
+    def manifest(self):
+        try:
+            with open(self._manifest_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"columns": COLUMNS, "segments": [], "next_segment": 1}
+
+    def _write_manifest(self, manifest):
+        atomic_json_dump(manifest, self._manifest_path())
+
+    @contextmanager
+    def _writer(self):
+        """
+        Exclusive writer: thread lock plus a file lock shared by all processes
+        """
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock, open(os.path.join(self.path, ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield self.manifest()
+
+    def exists(self):
+        return os.path.exists(self._manifest_path())
+
+    def __len__(self):
+        return sum(segment["rows"] for segment in self.manifest()["segments"])
+
+    def _write_segment(self, manifest, columns):
+        # Caller holds the writer lock
+        order = np.argsort(columns['report_date'], kind='stable')
+        name = f"seg-{manifest['next_segment']:06d}"
+        tmp_dir = os.path.join(self.path, f".{name}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for column, values in columns.items():
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), values[order])
+        os.replace(tmp_dir, os.path.join(self.path, name))
+
+        dates = columns['report_date']
+        manifest['next_segment'] += 1
+        return {
+            "name": name,
+            "rows": int(len(order)),
+            "min_date": str(dates.min()) if len(order) else None,
+            "max_date": str(dates.max()) if len(order) else None,
+        }
+
+    def append(self, reports):
+        """
+        Add reports as a new segment; returns the number of rows written
+        """
+        with self._writer() as manifest:
+            columns = _to_columns(reports, id_prefix=f"S{manifest['next_segment']}")
+            if len(columns['latitude']) == 0:
+                return 0
+            manifest['segments'].append(self._write_segment(manifest, columns))
+            self._write_manifest(manifest)
+
+            small = [s for s in manifest['segments'] if s['rows'] < SMALL_SEGMENT_ROWS]
+            if len(small) >= MAX_SMALL_SEGMENTS:
+                self._merge(manifest, small)
+        return len(columns['latitude'])
+
+    def compact(self, max_rows=None):
+        """
+        Merge all segments (or those under max_rows rows) into one
+        """
+        with self._writer() as manifest:
+            segments = [s for s in manifest['segments'] if max_rows is None or s['rows'] < max_rows]
+            if len(segments) > 1:
+                self._merge(manifest, segments)
+            return len(manifest['segments'])
+
+    def _merge(self, manifest, segments):
+        # Caller holds the writer lock
+        columns = {
+            name: np.concatenate([self._column(s, name) for s in segments])
+            for name in COLUMNS
+        }
+        merged = self._write_segment(manifest, columns)
+        names = {s['name'] for s in segments}
+        manifest['segments'] = [s for s in manifest['segments'] if s['name'] not in names]
+        manifest['segments'].append(merged)
+        self._write_manifest(manifest)
+        # Readers that already mapped the old files keep them until they are done
+        for name in names:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def _column(self, segment, name):
+        return np.load(os.path.join(self.path, segment['name'], f"{name}.npy"), mmap_mode='r')
+
+    def segments(self, start=None, end=None):
+        """
+        Manifest entries of the segments that can hold reports dated in [start, end]
+        """
+        start, end = _to_datetime64(start), _to_datetime64(end)
+        return [
+            s for s in self.manifest()['segments']
+            if s['rows']
+            and (start is None or np.datetime64(s['max_date']) >= start)
+            and (end is None or np.datetime64(s['min_date']) <= end)
+        ]
+
+    def read_columns(self, columns=None, start=None, end=None):
+        """
+        Column arrays of the reports dated in [start, end]
+
+        Rows come segment by segment, each sorted by date. With a single
+        matching segment the arrays are read-only memory-mapped views;
+        otherwise the matching rows are concatenated.
+        """
+        columns = list(columns or COLUMNS)
+        start64, end64 = _to_datetime64(start), _to_datetime64(end)
+
+        for attempt in range(3):
+            try:
+                parts = {name: [] for name in columns}
+                for segment in self.segments(start, end):
+                    dates = self._column(segment, 'report_date')
+                    lo = 0 if start64 is None else np.searchsorted(dates, start64, side='left')
+                    hi = len(dates) if end64 is None else np.searchsorted(dates, end64, side='right')
+                    for name in columns:
+                        parts[name].append(self._column(segment, name)[lo:hi])
+                break
+            except FileNotFoundError:
+                # A merge replaced the segments between reading the manifest and opening them
+                if attempt == 2:
+                    raise
+
+        return {
+            name: arrays[0] if len(arrays) == 1 else (
+                np.concatenate(arrays) if arrays else np.empty(0, dtype=COLUMNS[name])
+            )
+            for name, arrays in parts.items()
+        }
+
+    def read_frame(self, columns=None, start=None, end=None):
+        """
+        DataFrame of the reports dated in [start, end], built straight from the column arrays
+        """
+        import pandas as pd
+
+        data = self.read_columns(columns, start, end)
+        if 'report_id' in data:
+            data['report_id'] = data['report_id'].astype(f"U{data['report_id'].dtype.itemsize}")
+        return pd.DataFrame(data)
+
+    def import_csv(self, csv_path, chunksize=500_000):
+        """
+        Append a CSV export of reports in chunks; returns the number of rows imported
+        """
+        import pandas as pd
+
+        rows = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            rows += self.append(chunk)
+        return rows
+
+    def stats(self):
+        manifest = self.manifest()
+        segments = [s for s in manifest['segments'] if s['rows']]
+        return {
+            "path": self.path,
+            "reports": sum(s['rows'] for s in segments),
+            "segments": len(manifest['segments']),
+            "min_date": min((s['min_date'] for s in segments), default=None),
+            "max_date": max((s['max_date'] for s in segments), default=None),
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the columnar waste report store")
+    parser.add_argument('--store', default=STORE_DIR)
+    parser.add_argument('--import-csv', metavar='CSV', help="append the reports in a CSV file")
+    parser.add_argument('--compact', action='store_true', help="merge all segments into one")
+    args = parser.parse_args()
+
+    store = ReportStore(args.store)
+    if args.import_csv:
+        rows = store.import_csv(args.import_csv)
+        print(f"✓ Imported {rows} reports from {args.import_csv}")
+    if args.compact:
+        segments = store.compact()
+        print(f"✓ Compacted into {segments} segment{'s' if segments != 1 else ''}")
+    print(json.dumps(store.stats(), indent=2))
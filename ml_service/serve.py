@@ -0,0 +1,101 @@
+# serve.py
+"""
+Production entry point for the ML API
+Runs ml_api under gunicorn: several worker processes, each serving requests
+on a few threads (gthread) and running heavy inference on its bounded
+inference pool. Each worker warms its models up before it accepts
+requests. SIGTERM stops accepting connections, lets in-flight requests
+finish and flushes pending hotspot updates before exiting.
+
+    python serve.py                          # ECOTRACK_* settings below
+    python serve.py --workers 4 --threads 8 --bind 0.0.0.0:5001
+"""
+
+import os
+
+from gunicorn.app.base import BaseApplication
+
+CPUS = os.cpu_count() or 1
+
+BIND = os.environ.get("ECOTRACK_BIND", "0.0.0.0:5001")
+# Worker processes (each loads its own models) and request threads per worker
+WORKERS = int(os.environ.get("ECOTRACK_WORKERS", min(4, CPUS)))
+THREADS = int(os.environ.get("ECOTRACK_THREADS", 8))
+# Seconds a silent worker may block before it is restarted, and seconds
+# in-flight requests get to finish on shutdown or reload
+WORKER_TIMEOUT = int(os.environ.get("ECOTRACK_WORKER_TIMEOUT", 120))
+GRACEFUL_TIMEOUT = int(os.environ.get("ECOTRACK_GRACEFUL_TIMEOUT", 30))
+# Load and exercise the models (ECOTRACK_WARMUP_MODELS) before a worker takes requests
+WARMUP_ON_START = os.environ.get("ECOTRACK_WARMUP_ON_START", "1") != "0"
+
+
+def post_worker_init(worker):
+    if not WARMUP_ON_START:
+        return
+    import ml_api
+    ready = ml_api.warmup()
+    print(f"{'✓' if ready else '⚠'} Worker {worker.pid} warmup {ml_api.warmup_state['status']}")
+    ml_api.startup_report.print_report()
+
+
+def worker_exit(server, worker):
+    import ml_api
+    ml_api.shutdown()
+
+
+class EcoTrackServer(BaseApplication):
+    """
+    gunicorn application serving ml_api.app with the options given in code
+    """
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from ml_api import app
+        return app
+
+
+def server_options(bind=BIND, workers=WORKERS, threads=THREADS,
+                   timeout=WORKER_TIMEOUT, graceful_timeout=GRACEFUL_TIMEOUT):
+    return {
+        "bind": bind,
+        "workers": workers,
+        "worker_class": "gthread",
+        "threads": threads,
+        "timeout": timeout,
+        "graceful_timeout": graceful_timeout,
+        "keepalive": 5,
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+        "accesslog": os.environ.get("ECOTRACK_ACCESS_LOG"),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the EcoTrack ML API with gunicorn")
+    parser.add_argument('--bind', default=BIND, help="host:port (ECOTRACK_BIND)")
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help="worker processes (ECOTRACK_WORKERS)")
+    parser.add_argument('--threads', type=int, default=THREADS,
+                        help="request threads per worker (ECOTRACK_THREADS)")
+    parser.add_argument('--inference-threads', type=int,
+                        help="inference pool threads per worker (ECOTRACK_INFERENCE_THREADS, "
+                             "default: CPU cores / workers)")
+    args = parser.parse_args()
+
+    # Split the cores between the workers' inference pools
+    inference_threads = args.inference_threads or max(1, CPUS // max(1, args.workers))
+    if args.inference_threads or "ECOTRACK_INFERENCE_THREADS" not in os.environ:
+        os.environ["ECOTRACK_INFERENCE_THREADS"] = str(inference_threads)
+
+    print(f"✓ Serving on {args.bind}: {args.workers} workers x {args.threads} threads, "
+          f"{os.environ['ECOTRACK_INFERENCE_THREADS']} inference threads per worker")
+    EcoTrackServer(server_options(args.bind, args.workers, args.threads)).run()
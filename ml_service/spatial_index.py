@@ -0,0 +1,212 @@
+# spatial_index.py
+"""
+Grid spatial index for report coordinates and hotspot centers
+Points are bucketed into fixed lat/lng cells and stored cell by cell, so a
+radius query only touches the few cells around the query point and then
+filters them with the exact haversine distance
+"""
+
+import numpy as np
+
+from hotspot_clusters import EARTH_RADIUS_KM, haversine_km
+from model_registry import atomic_npz_dump, load_npz
+
+INDEX_FILE = "hotspot_spatial_index.npz"
+
+# Cell size is chosen so that an average cell over the data's bounding box
+# holds about this many points, within these bounds (degrees)
+TARGET_POINTS_PER_CELL = 32
+MIN_CELL_DEG = 1e-4
+MAX_CELL_DEG = 1.0
+
+KM_PER_DEG_LAT = EARTH_RADIUS_KM * np.pi / 180
+
+
+def auto_cell_deg(latitude, longitude, points_per_cell=TARGET_POINTS_PER_CELL):
+    """
+    Cell size giving about points_per_cell points per cell over the bounding box
+    """
+    if len(latitude) == 0:
+        return MAX_CELL_DEG
+    area = (np.ptp(latitude) + MIN_CELL_DEG) * (np.ptp(longitude) + MIN_CELL_DEG)
+    cell_deg = np.sqrt(area * points_per_cell / len(latitude))
+    return float(np.clip(cell_deg, MIN_CELL_DEG, MAX_CELL_DEG))
+
+
+class GridIndex:
+    """
+    Points sorted by grid cell, with CSR-style offsets per occupied cell
+
+    cells[i] is the key (row * n_cols + col) of the i-th occupied cell and
+    its points are latitude/longitude[offsets[i]:offsets[i + 1]].
+    Extra per-point columns (ids, cluster ids, ...) are kept in the same order.
+    """
+
+    def __init__(self, latitude, longitude, cells, offsets, cell_deg, columns=None):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.cells = cells
+        self.offsets = offsets
+        self.cell_deg = float(cell_deg)
+        self.n_cols = int(np.ceil(360.0 / self.cell_deg))
+        self.n_rows = int(np.ceil(180.0 / self.cell_deg))
+        self.columns = columns or {}
+
+    def __len__(self):
+        return len(self.latitude)
+
+    @classmethod
+    def build(cls, latitude, longitude, cell_deg=None, **columns):
+        """
+        Index points given in degrees; keyword arrays travel along with them
+
+        cell_deg: grid cell size; by default derived from the point density
+        """
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        if cell_deg is None:
+            cell_deg = auto_cell_deg(latitude, longitude)
+        index = cls(latitude, longitude, None, None, cell_deg)
+
+        keys = index._keys(latitude, longitude)
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        cells, starts = np.unique(keys, return_index=True)
+
+        index.latitude = latitude[order]
+        index.longitude = longitude[order]
+        index.cells = cells
+        index.offsets = np.append(starts, len(keys)).astype(np.int64)
+        index.columns = {name: np.asarray(values)[order] for name, values in columns.items()}
+        return index
+
+    def _rows_cols(self, latitude, longitude):
+        rows = np.floor((np.asarray(latitude) + 90.0) / self.cell_deg).astype(np.int64)
+        cols = np.floor((np.asarray(longitude) + 180.0) / self.cell_deg).astype(np.int64)
+        return np.clip(rows, 0, self.n_rows - 1), np.mod(cols, self.n_cols)
+
+    def _keys(self, latitude, longitude):
+        rows, cols = self._rows_cols(latitude, longitude)
+        return rows * self.n_cols + cols
+
+    def _blocks(self, latitude, longitude, radius_km):
+        """
+        (starts, ends) of the point ranges in the cells that can hold points within radius_km
+        """
+        dlat = radius_km / KM_PER_DEG_LAT
+        lat_lo = max(latitude - dlat, -90.0)
+        lat_hi = min(latitude + dlat, 90.0)
+        max_abs_lat = max(abs(lat_lo), abs(lat_hi))
+        cos_lat = np.cos(np.radians(max_abs_lat))
+        dlng = 180.0 if cos_lat < 1e-9 else min(radius_km / (KM_PER_DEG_LAT * cos_lat), 180.0)
+
+        row_lo, col_lo = self._rows_cols(lat_lo, longitude - dlng)
+        row_hi, col_hi = self._rows_cols(lat_hi, longitude + dlng)
+        if dlng >= 180.0:
+            col_ranges = [(0, self.n_cols - 1)]
+        elif col_lo <= col_hi:
+            col_ranges = [(col_lo, col_hi)]
+        else:  # wraps around the antimeridian
+            col_ranges = [(col_lo, self.n_cols - 1), (0, col_hi)]
+
+        # One contiguous block of occupied cells per (row, column range)
+        rows = np.arange(row_lo, row_hi + 1)
+        starts, ends = [], []
+        for c0, c1 in col_ranges:
+            starts.append(np.searchsorted(self.cells, rows * self.n_cols + c0, side='left'))
+            ends.append(np.searchsorted(self.cells, rows * self.n_cols + c1, side='right'))
+        return self.offsets[np.concatenate(starts)], self.offsets[np.concatenate(ends)]
+
+    def _candidates(self, latitude, longitude, radius_km):
+        """
+        Indices of all points in the cells that can hold points within radius_km
+        """
+        starts, ends = self._blocks(latitude, longitude, radius_km)
+        blocks = [np.arange(s, e) for s, e in zip(starts.tolist(), ends.tolist()) if e > s]
+        return np.concatenate(blocks) if blocks else np.empty(0, dtype=np.int64)
+
+    def query_radius(self, latitude, longitude, radius_km, limit=None, return_count=False):
+        """
+        (indices, distances_km) of points within radius_km, nearest first
+
+        limit: return only the nearest limit points; they are selected with a
+        partial sort, so a large radius does not pay for sorting every match
+        return_count: also return the number of points within radius_km
+        """
+        candidates = self._candidates(latitude, longitude, radius_km)
+        distances = haversine_km(
+            latitude, longitude, self.latitude[candidates], self.longitude[candidates]
+        )
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        count = len(candidates)
+        if limit is not None and limit < count:
+            nearest = np.argpartition(distances, max(limit, 1) - 1)[:max(limit, 0)]
+            candidates, distances = candidates[nearest], distances[nearest]
+        order = np.lexsort((candidates, distances))
+        if return_count:
+            return candidates[order], distances[order], count
+        return candidates[order], distances[order]
+
+    def query_nearest(self, latitude, longitude, k, max_radius_km=None):
+        """
+        (indices, distances_km) of the k nearest points, nearest first
+
+        The search radius doubles (counting candidates from the cell offsets
+        only) until the cells around the point hold k points. The k-th nearest
+        candidate distance then bounds the answer, and one radius query with
+        that bound returns the exact k nearest.
+        """
+        k = min(int(k), len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        limit = max_radius_km if max_radius_km is not None else np.pi * EARTH_RADIUS_KM
+        radius = min(self.cell_deg * KM_PER_DEG_LAT, limit)
+        while radius < limit:
+            starts, ends = self._blocks(latitude, longitude, radius)
+            if (ends - starts).sum() >= k:
+                break
+            radius = min(radius * 2, limit)
+
+        candidates = self._candidates(latitude, longitude, radius)
+        distances = haversine_km(
+            latitude, longitude, self.latitude[candidates], self.longitude[candidates]
+        )
+        if len(distances) >= k:
+            radius = min(np.partition(distances, k - 1)[k - 1], limit)
+        return self.query_radius(latitude, longitude, radius, limit=k)
+
+    def save(self, filename=INDEX_FILE):
+        """
+        Write the index to an aligned, uncompressed .npz artifact (memory-mapped on load), atomically
+        """
+        arrays = {
+            "format": np.array("grid_index"),
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "cells": self.cells,
+            "offsets": self.offsets,
+            "cell_deg": np.array(self.cell_deg),
+        }
+        arrays.update({f"column_{name}": values for name, values in self.columns.items()})
+
+        return atomic_npz_dump(arrays, filename)
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_arrays(load_npz(path))
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(
+            latitude=data["latitude"],
+            longitude=data["longitude"],
+            cells=data["cells"],
+            offsets=data["offsets"],
+            cell_deg=float(data["cell_deg"]),
+            columns={
+                name[len("column_"):]: values
+                for name, values in data.items() if name.startswith("column_")
+            },
+        )
@@ -0,0 +1,64 @@
+# startup.py
+"""
+Startup timing for the ML API
+Times each import group, model load and warmup inference of a worker and
+names the heavy packages each step imported first, so a slow cold start
+can be traced back to the module responsible
+"""
+
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+# Packages reported when a step is the first to import them
+HEAVY_PACKAGES = (
+    "pandas", "sklearn", "scipy", "joblib", "matplotlib", "tensorflow", "tflite_runtime", "PIL"
+)
+
+
+class StartupReport:
+    """
+    Ordered startup steps with their duration and the heavy packages they imported
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.steps = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name):
+        before = set(sys.modules.copy())
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            imported = {module.split(".")[0] for module in set(sys.modules.copy()) - before}
+            with self._lock:
+                self.steps.append({
+                    "step": name,
+                    "seconds": round(seconds, 4),
+                    "imported": sorted(imported.intersection(HEAVY_PACKAGES)),
+                })
+
+    def as_dict(self):
+        with self._lock:
+            steps = list(self.steps)
+        return {
+            "steps": steps,
+            "total_seconds": round(sum(step["seconds"] for step in steps), 4),
+            "since_start_seconds": round(time.perf_counter() - self.started_at, 4),
+        }
+
+    def print_report(self):
+        report = self.as_dict()
+        print("\nStartup time by step:")
+        for step in report["steps"]:
+            imported = f"  (imports {', '.join(step['imported'])})" if step["imported"] else ""
+            print(f"  {step['seconds'] * 1000:8.1f} ms  {step['step']}{imported}")
+        print(f"  {report['total_seconds'] * 1000:8.1f} ms  total")
+
+
+startup_report = StartupReport()
@@ -0,0 +1,274 @@
+# synthetic_data.py
+"""
+Vectorized synthetic data generators for scaling and load tests
+Waste reports, users and beachclean item mixes are generated in fixed-size
+blocks, each seeded from (seed, block number), so a dataset is reproducible
+whatever chunk size it is streamed to disk with, and city-scale volumes take
+seconds instead of the minutes a per-row Python loop needs
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Rows per independently seeded block
+BLOCK_ROWS = 65536
+DEFAULT_CHUNK_ROWS = 1_048_576
+
+# Hotspot areas of the sample city and its bounding box (lat_min, lat_max, lng_min, lng_max)
+CITY_HOTSPOTS = [
+    (19.0760, 72.8777),  # Mumbai Central
+    (19.1136, 72.8697),  # Dadar
+    (19.0596, 72.8295),  # Marine Drive
+    (19.2183, 72.9781),  # Thane
+]
+CITY_BOUNDS = (19.0, 19.3, 72.8, 73.1)
+
+# Expected median of the participation score in generate_users:
+# 2*9.5 events + 249.5/50 points + 3*4.5 badges + 3 rating + (30-44.5)/10 recency + 15/5 logins
+PARTICIPATION_THRESHOLD = 19 + 4.99 + 13.5 + 3 - 1.45 + 3
+
+
+def _block_rng(seed, block):
+    return np.random.default_rng([seed, block])
+
+
+def _blocks(n_rows, block_rows=BLOCK_ROWS):
+    """
+    (block number, first row, rows) of the blocks covering n_rows
+    """
+    for block, start in enumerate(range(0, n_rows, block_rows)):
+        yield block, start, min(block_rows, n_rows - start)
+
+
+def _report_ids(prefix, start, rows, width):
+    """
+    prefix + zero-padded 1-based row numbers as fixed-width ASCII bytes (R0001, R0002, ...)
+    """
+    numbers = np.arange(start + 1, start + rows + 1, dtype=np.int64)
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    digits = (numbers[:, None] // powers % 10 + ord('0')).astype(np.uint8)
+    prefix = np.frombuffer(prefix.encode('ascii'), dtype=np.uint8)
+    chars = np.hstack([np.broadcast_to(prefix, (rows, len(prefix))), digits])
+    return np.ascontiguousarray(chars).view(f'S{chars.shape[1]}').ravel()
+
+
+def _sampling_table(weights, size=1 << 16):
+    """
+    Lookup table for drawing indices in proportion to weights with one integer draw
+
+    Each index fills a share of the table matching its weight (rounded to
+    1/size), which is much cheaper than an inverse-CDF search per draw.
+    """
+    share = weights / weights.sum() * size
+    counts = np.floor(share).astype(np.int64)
+    # Hand the slots lost to rounding to the largest remainders
+    counts[np.argsort(counts - share)[:size - counts.sum()]] += 1
+    return np.repeat(np.arange(len(weights)), counts)
+
+
+def _report_block(rng, start, rows, reference_date, centers, hotspot_share, spread_deg, id_width):
+    near_hotspot = rng.random(rows) < hotspot_share
+    center = centers[rng.integers(0, len(centers), rows)]
+    lat_min, lat_max, lng_min, lng_max = CITY_BOUNDS
+
+    latitude = np.where(
+        near_hotspot, center[:, 0] + rng.normal(0, spread_deg, rows), rng.uniform(lat_min, lat_max, rows)
+    )
+    longitude = np.where(
+        near_hotspot, center[:, 1] + rng.normal(0, spread_deg, rows), rng.uniform(lng_min, lng_max, rows)
+    )
+    days_old = rng.integers(0, 90, rows)
+
+    return {
+        'report_id': _report_ids('R', start, rows, id_width),
+        'latitude': latitude,
+        'longitude': longitude,
+        'waste_amount_kg': rng.uniform(5, 100, rows),
+        'severity': rng.integers(1, 6, rows),  # 1-5 scale
+        'report_date': np.datetime64(reference_date, 's') - days_old.astype('timedelta64[D]'),
+    }
+
+
+def iter_reports(n_reports, seed=42, chunk_rows=DEFAULT_CHUNK_ROWS, reference_date=None,
+                 centers=None, hotspot_share=0.7, spread_deg=0.02):
+    """
+    Waste reports in chunks of about chunk_rows rows (dicts of column arrays)
+
+    hotspot_share of the reports scatter around the hotspot centers
+    (default CITY_HOTSPOTS), the rest are uniform over CITY_BOUNDS; report
+    dates are up to 90 days before reference_date (default: today, midnight).
+    Report ids are ASCII bytes, zero-padded to the width of n_reports.
+    """
+    id_width = max(4, len(str(n_reports)))
+    if reference_date is None:
+        reference_date = pd.Timestamp.now().normalize()
+    reference_date = pd.Timestamp(reference_date).to_datetime64()
+    centers = np.asarray(centers if centers is not None else CITY_HOTSPOTS, dtype=np.float64)
+
+    def block(block, start, rows):
+        return _report_block(_block_rng(seed, block), start, rows,
+                             reference_date, centers, hotspot_share, spread_deg, id_width)
+
+    return _iter_chunks(block, n_reports, chunk_rows)
+
+
+def iter_users(n_users, seed=42, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    User engagement rows like generate_sample_user_data, in chunks
+
+    will_participate uses the fixed PARTICIPATION_THRESHOLD instead of the
+    median of the whole dataset, so chunks can be labelled independently.
+    """
+    def block(block, start, rows):
+        rng = _block_rng(seed, block)
+        data = {
+            'user_id': np.arange(start, start + rows),
+            'age': rng.integers(18, 65, rows),
+            'points_earned': rng.integers(0, 500, rows),
+            'events_attended': rng.integers(0, 20, rows),
+            'waste_reports': rng.integers(0, 30, rows),
+            'days_since_last_activity': rng.integers(0, 90, rows),
+            'badges_earned': rng.integers(0, 10, rows),
+            'avg_event_rating': rng.uniform(1, 5, rows),
+            'friend_count': rng.integers(0, 50, rows),
+            'time_on_platform_mins': rng.integers(10, 300, rows),
+            'login_frequency': rng.integers(1, 30, rows),  # logins per month
+        }
+        participation_score = (
+            data['events_attended'] * 2
+            + data['points_earned'] / 50
+            + data['badges_earned'] * 3
+            + data['avg_event_rating']
+            + (30 - data['days_since_last_activity']) / 10
+            + data['login_frequency'] / 5
+            + rng.normal(0, 5, rows)
+        )
+        data['will_participate'] = (participation_score > PARTICIPATION_THRESHOLD).astype(np.int8)
+        return data
+
+    return _iter_chunks(block, n_users, chunk_rows)
+
+
+def iter_item_mixes(n_events, seed=42, chunk_rows=DEFAULT_CHUNK_ROWS, catalog_csv=None,
+                    mean_items=8):
+    """
+    Beachclean cleanup events as (event_id, item_id, quantity) rows, in chunks
+
+    Each event collects 1 + Poisson(mean_items - 1) catalog items, drawn in
+    proportion to their Frequency_Score; common items also come in larger
+    quantities. Chunks hold about chunk_rows events.
+    """
+    from emission_catalog import CATALOG_CSV
+
+    catalog = pd.read_csv(catalog_csv or CATALOG_CSV, usecols=['Item_ID', 'Frequency_Score'])
+    item_ids = catalog['Item_ID'].to_numpy(dtype=np.int64)
+    frequency = catalog['Frequency_Score'].to_numpy(dtype=np.float64)
+    table = _sampling_table(frequency)
+
+    def block(block, start, rows):
+        rng = _block_rng(seed, block)
+        sizes = 1 + rng.poisson(mean_items - 1, rows)
+        picks = table[rng.integers(0, len(table), int(sizes.sum()))]
+        return {
+            'event_id': np.repeat(np.arange(start, start + rows), sizes),
+            'item_id': item_ids[picks],
+            'quantity': 1 + rng.poisson(frequency[picks] / 2),
+        }
+
+    return _iter_chunks(block, n_events, chunk_rows)
+
+
+def _iter_chunks(make_block, n_rows, chunk_rows):
+    """
+    Concatenate whole blocks into chunks of about chunk_rows rows
+    """
+    blocks_per_chunk = max(1, int(round(chunk_rows / BLOCK_ROWS)))
+    pending = []
+    for block, start, rows in _blocks(n_rows):
+        pending.append(make_block(block, start, rows))
+        if len(pending) == blocks_per_chunk:
+            yield _concat(pending)
+            pending = []
+    if pending:
+        yield _concat(pending)
+
+
+def _concat(blocks):
+    if len(blocks) == 1:
+        return blocks[0]
+    return {name: np.concatenate([b[name] for b in blocks]) for name in blocks[0]}
+
+
+def generate_reports(n_reports, seed=42, **kwargs):
+    """
+    All reports of iter_reports in one DataFrame
+    """
+    chunks = [pd.DataFrame(chunk) for chunk in iter_reports(n_reports, seed, **kwargs)]
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    if len(df):
+        df['report_id'] = df['report_id'].str.decode('ascii')
+    return df
+
+
+def write_chunks(chunks, path):
+    """
+    Stream chunks to disk; returns the number of rows written
+
+    A path ending in .csv is written as one CSV file; any other path is a
+    report store directory (report chunks only).
+    """
+    rows = 0
+    if path.endswith('.csv'):
+        for i, chunk in enumerate(chunks):
+            # Fixed-width byte ids (report_id) would be written as b'R0001'
+            frame = pd.DataFrame({
+                name: values.astype(str) if values.dtype.kind == 'S' else values
+                for name, values in chunk.items()
+            })
+            frame.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            rows += len(next(iter(chunk.values())))
+        return rows
+
+    from report_store import ReportStore
+
+    store = ReportStore(path)
+    for chunk in chunks:
+        rows += store.append(chunk)
+    return rows
+
+
+GENERATORS = {
+    'reports': iter_reports,
+    'users': iter_users,
+    'items': iter_item_mixes,
+}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate large synthetic EcoTrack datasets")
+    parser.add_argument('kind', choices=sorted(GENERATORS),
+                        help="reports (waste reports), users (engagement rows) or items (cleanup item mixes)")
+    parser.add_argument('-n', '--rows', type=int, default=1_000_000,
+                        help="reports, users or cleanup events to generate")
+    parser.add_argument('--out', required=True,
+                        help="CSV file, or report store directory for reports")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    if not args.out.endswith('.csv') and args.kind != 'reports':
+        parser.error("only reports can be written to a report store; use a .csv output")
+    if args.out.endswith('.csv') and os.path.exists(args.out):
+        os.remove(args.out)
+
+    started = time.perf_counter()
+    chunks = GENERATORS[args.kind](args.rows, seed=args.seed, chunk_rows=args.chunk_rows)
+    rows = write_chunks(chunks, args.out)
+    elapsed = time.perf_counter() - started
+    print(f"✓ {rows} {args.kind} rows written to {args.out} in {elapsed:.1f}s "
+          f"({rows / max(elapsed, 1e-9):,.0f} rows/s)")
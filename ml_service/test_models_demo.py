@@ -9,6 +9,8 @@ import pandas as pd
 import numpy as np
 import json
 
+from emission_encoder import EmissionEncoder
+
 print("="*70)
 print("🧪 ECOTRACK ML MODELS - TESTING & DEMONSTRATION")
 print("="*70)
@@ -31,11 +33,14 @@ try:
         "Glass": 8
     }
     
-    df = pd.DataFrame([test_waste])
-    df = pd.get_dummies(df).reindex(columns=emission_columns, fill_value=0)
-    prediction = emission_model.predict(df)[0]
+    # Same encoder as /api/predict-emission, so the vectors are identical
+    encoder = EmissionEncoder(emission_columns)
+    row, unknown_fields = encoder.encode(test_waste)
+    prediction = emission_model.predict(pd.DataFrame([row], columns=emission_columns))[0]
     
     print(f"Input Waste: {test_waste}")
+    if unknown_fields:
+        print(f"⚠ Fields not used by the model: {unknown_fields}")
     print(f"✓ Predicted CO2 Emission: {prediction:.2f} kg CO2e")
     print(f"💡 This is equivalent to driving a car for {prediction/2.3:.1f} km")
     
@@ -173,6 +178,42 @@ try:
 except Exception as e:
     print(f"✗ Error: {e}")
 
+# ============================================================================
+# TEST 4: Compiled Forest Parity
+# ============================================================================
+print("\n" + "="*70)
+print("⚡ TEST 4: Compiled Forest Parity (vs sklearn)")
+print("-"*70)
+
+try:
+    from compiled_forest import compile_forest, check_parity
+    from user_engagement_predictor import generate_sample_user_data
+    
+    # Emission forest on the full item catalog
+    catalog = pd.read_csv("beachclean_dataset.csv")
+    X_catalog = pd.get_dummies(
+        catalog.drop(columns=["Emission_Impact_CO2e", "Item_ID", "Item_Name"])
+    ).reindex(columns=emission_columns, fill_value=0)
+    emission_diff = check_parity(
+        emission_model, compile_forest(emission_model), X_catalog.to_numpy(dtype=np.float64)
+    )
+    print(f"  Emission forest max |diff|: {emission_diff:.2e}")
+    assert emission_diff < 1e-4, "Emission compiled forest diverges from sklearn"
+    
+    # Engagement forest with the scaler folded into its thresholds
+    X_users = generate_sample_user_data(n_samples=1000)[engagement_features]
+    engagement_diff = check_parity(
+        engagement_model, compile_forest(engagement_model, scaler=engagement_scaler),
+        X_users.to_numpy(dtype=np.float64), scaler=engagement_scaler
+    )
+    print(f"  Engagement forest max |diff|: {engagement_diff:.2e}")
+    assert engagement_diff < 1e-6, "Engagement compiled forest diverges from sklearn"
+    
+    print("  ✓ Compiled forests match sklearn outputs")
+    
+except Exception as e:
+    print(f"✗ Error: {e}")
+
 # ============================================================================
 # Summary
 # ============================================================================
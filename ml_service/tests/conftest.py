@@ -0,0 +1,50 @@
+# tests/conftest.py
+"""
+The service modules import each other by bare name (from model_registry
+import ...), so the tests run with ml_service on the import path
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    """
+    Empty model directory the trainers write to and the shared registry serves from
+    """
+    import model_registry
+
+    monkeypatch.setattr(model_registry, "MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(model_registry.registry, "model_dir", str(tmp_path))
+    monkeypatch.setattr(model_registry.registry, "check_interval", 0)
+
+    def forget_loaded_models():
+        for entry in model_registry.registry._entries.values():
+            entry.bundle = None
+            entry.checked_at = 0.0
+
+    forget_loaded_models()
+    yield tmp_path
+    forget_loaded_models()
+
+
+@pytest.fixture
+def api(model_dir, monkeypatch):
+    """
+    Flask test client with a fresh hotspot stream and report store in model_dir
+    """
+    import ml_api
+    from hotspot_stream import HotspotStream
+    from report_store import ReportStore
+
+    stream = HotspotStream()
+    monkeypatch.setattr(ml_api, "hotspot_stream", stream)
+    monkeypatch.setattr(ml_api, "report_store", ReportStore(str(model_dir / "report_store")))
+    yield ml_api.app.test_client()
+    # Before model_dir is restored, so the background writer cannot write elsewhere
+    stream.close()
@@ -0,0 +1,136 @@
+# tests/test_compiled_forest.py
+"""
+Parity of the compiled forests with sklearn
+Small forests shaped like the emission (regressor) and engagement
+(classifier with a folded-in StandardScaler) models, including inputs that
+sit exactly on the split thresholds
+"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from compiled_forest import compile_forest
+
+
+def emission_like_data(n=400, seed=0):
+    """
+    One-hot material/category columns plus continuous weight and distance
+    """
+    rng = np.random.default_rng(seed)
+    material = np.eye(5)[rng.integers(0, 5, n)]
+    category = np.eye(3)[rng.integers(0, 3, n)]
+    weight = rng.gamma(2.0, 0.7, n)
+    distance = rng.uniform(0, 40, n).round(1)
+    X = np.column_stack([material, category, weight, distance])
+    y = weight * (1 + material @ np.arange(5)) + 0.05 * distance + rng.normal(0, 0.1, n)
+    return X, y
+
+
+def engagement_like_data(n=400, seed=1):
+    """
+    Integer activity counts and a rating on very different scales
+    """
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(18, 65, n),
+        rng.integers(0, 1000, n),
+        rng.integers(0, 30, n),
+        rng.integers(0, 60, n),
+        rng.uniform(1, 5, n).round(1),
+    ]).astype(np.float64)
+    y = (X[:, 2] * 0.1 + X[:, 1] * 0.002 - X[:, 3] * 0.05 + rng.normal(0, 0.5, n)) > 0.5
+    return X, y.astype(int)
+
+
+def split_thresholds(forest):
+    """
+    (feature, threshold) of every internal node in the forest
+    """
+    pairs = []
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        internal = tree.children_left != -1
+        pairs.extend(zip(tree.feature[internal].tolist(), tree.threshold[internal].tolist()))
+    return pairs
+
+
+def on_threshold_rows(X, pairs):
+    """
+    Copies of X's first rows with one feature set on, and one ulp either side of, a threshold
+    """
+    rows = []
+    for i, (feature, value) in enumerate(pairs):
+        for candidate in (np.nextafter(value, -np.inf), value, np.nextafter(value, np.inf)):
+            row = X[i % len(X)].copy()
+            row[feature] = candidate
+            rows.append(row)
+    return np.array(rows)
+
+
+@pytest.fixture(scope="module")
+def emission_forest():
+    X, y = emission_like_data()
+    forest = RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0).fit(X, y)
+    return forest, X
+
+
+@pytest.fixture(scope="module")
+def engagement_forest():
+    X, y = engagement_like_data()
+    scaler = StandardScaler().fit(X)
+    forest = RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0)
+    forest.fit(scaler.transform(X), y)
+    return forest, scaler, X
+
+
+def test_emission_forest_matches_sklearn(emission_forest):
+    forest, X = emission_forest
+    compiled = compile_forest(forest)
+
+    np.testing.assert_allclose(compiled.predict(X), forest.predict(X), rtol=1e-5, atol=1e-6)
+
+
+def test_engagement_forest_with_folded_scaler_matches_sklearn(engagement_forest):
+    forest, scaler, X = engagement_forest
+    compiled = compile_forest(forest, scaler=scaler)
+
+    np.testing.assert_allclose(
+        compiled.predict_proba(X), forest.predict_proba(scaler.transform(X)), atol=1e-6
+    )
+    np.testing.assert_array_equal(compiled.predict(X), forest.predict(scaler.transform(X)))
+
+
+def test_emission_forest_on_split_thresholds(emission_forest):
+    forest, X = emission_forest
+    compiled = compile_forest(forest)
+    X_edge = on_threshold_rows(X, split_thresholds(forest))
+
+    np.testing.assert_allclose(compiled.predict(X_edge), forest.predict(X_edge), rtol=1e-5, atol=1e-6)
+
+
+def test_engagement_forest_on_split_thresholds(engagement_forest):
+    forest, scaler, X = engagement_forest
+    compiled = compile_forest(forest, scaler=scaler)
+
+    # Raw values whose scaled value lands on (or next to) each threshold
+    pairs = [
+        (feature, threshold * scaler.scale_[feature] + scaler.mean_[feature])
+        for feature, threshold in split_thresholds(forest)
+    ]
+    X_edge = on_threshold_rows(X, pairs)
+
+    np.testing.assert_allclose(
+        compiled.predict_proba(X_edge), forest.predict_proba(scaler.transform(X_edge)), atol=1e-6
+    )
+
+
+def test_save_and_load_round_trip(engagement_forest, tmp_path):
+    forest, scaler, X = engagement_forest
+    compiled = compile_forest(forest, scaler=scaler)
+    path = compiled.save(str(tmp_path / "engagement_forest.npz"))
+
+    loaded = type(compiled).load(path)
+
+    np.testing.assert_array_equal(loaded.predict_proba(X), compiled.predict_proba(X))
@@ -0,0 +1,69 @@
+# tests/test_density_hotspots.py
+"""
+The API endpoints served from the density (DBSCAN) hotspot artifacts
+"""
+
+import numpy as np
+import pytest
+
+from synthetic_data import generate_reports
+from test_hotspot_stream import report_payload
+
+
+@pytest.fixture
+def density_model(model_dir):
+    from density_hotspots import train_density_hotspot_detector
+
+    df = generate_reports(3000, seed=7)
+    model, cluster_stats, df = train_density_hotspot_detector(
+        df=df, eps_m=400, min_samples=10, n_jobs=1
+    )
+    assert model.n_clusters > 0
+    return model, df
+
+
+def test_scaler_returns_an_array(density_model):
+    from model_registry import registry
+
+    bundle = registry.get("hotspot")
+    X = bundle["scaler"].transform(generate_reports(5)[bundle["features"]])
+
+    assert isinstance(X, np.ndarray)
+
+
+def test_detect(api, density_model):
+    model, df = density_model
+    sample = df.sample(100, random_state=0)
+
+    response = api.post("/api/detect-hotspots", json={"reports": report_payload(sample)})
+
+    assert response.status_code == 200, response.get_json()
+    predictions = response.get_json()["predictions"]
+    # Training reports are assigned to the hotspot DBSCAN put them in
+    assert [p["cluster_id"] for p in predictions] == sample['cluster'].tolist()
+    for p in predictions:
+        assert (p["priority"] == 'Unknown') == (p["cluster_id"] == -1)
+
+
+def test_ingest(api, density_model):
+    response = api.post(
+        "/api/hotspots/ingest", json={"reports": report_payload(generate_reports(100, seed=8))}
+    )
+
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["ingested"] == 100
+
+
+def test_nearby(api, density_model):
+    model, df = density_model
+    center = df[df['cluster'] >= 0].iloc[0]
+
+    response = api.get("/api/hotspots/nearby", query_string={
+        "latitude": center['latitude'], "longitude": center['longitude'], "radius_km": 1
+    })
+
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert body["reports_indexed"]
+    assert body["total_reports"] > 0
+    assert all(r["distance_km"] <= 1 for r in body["reports"])
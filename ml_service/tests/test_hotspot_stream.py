@@ -0,0 +1,168 @@
+# tests/test_hotspot_stream.py
+"""
+Live hotspot updates through /api/hotspots/ingest, against both the
+K-Means and the density (DBSCAN) hotspot models, and the merge of the
+updates of several API workers sharing one model directory
+"""
+
+import json
+import time
+
+import numpy as np
+import pytest
+
+from hotspot_stream import HotspotStream
+from model_registry import MODEL_SPECS, ModelRegistry
+from synthetic_data import generate_reports
+
+
+def report_payload(df):
+    """
+    JSON-ready report dicts, dates as strings like a client sends them
+    """
+    df = df.copy()
+    df['report_date'] = df['report_date'].dt.strftime('%Y-%m-%d')
+    return df.to_dict(orient='records')
+
+
+@pytest.fixture(params=["kmeans", "density"])
+def hotspot_model(request, model_dir):
+    """
+    A small hotspot model of either kind, trained into model_dir
+    """
+    df = generate_reports(3000, seed=7)
+    if request.param == "kmeans":
+        from waste_hotspot_detector import train_hotspot_detector
+        train_hotspot_detector(df=df, n_jobs=1)
+    else:
+        from density_hotspots import train_density_hotspot_detector
+        train_density_hotspot_detector(df=df, eps_m=400, min_samples=10, n_jobs=1)
+    return request.param
+
+
+def cluster_totals(model_dir):
+    with open(model_dir / "cluster_statistics.json") as f:
+        stats = json.load(f)
+    return sum(s['num_reports'] for s in stats), sum(s['total_waste_kg'] for s in stats)
+
+
+def test_ingest_updates_aggregates(api, hotspot_model):
+    new = generate_reports(200, seed=8)
+
+    response = api.post("/api/hotspots/ingest", json={"reports": report_payload(new)})
+
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert body["ingested"] == len(new)
+    labels = np.array(body["cluster_ids"])
+    assert (labels >= -1).all()
+
+    import ml_api
+    stats = ml_api.hotspot_stream.stats()
+    assert stats["ingested_reports"] == len(new)
+    assert len(ml_api.report_store) == len(new)
+
+
+def test_failed_ingest_changes_nothing(api, hotspot_model, monkeypatch):
+    import ml_api
+
+    def failing_append(reports):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(ml_api.report_store, "append", failing_append)
+    response = api.post("/api/hotspots/ingest", json={"reports": report_payload(generate_reports(50))})
+
+    assert response.status_code == 400
+    assert ml_api.hotspot_stream.stats()["ingested_reports"] == 0
+
+
+def test_failed_stream_update_stores_nothing(api, hotspot_model, monkeypatch):
+    import ml_api
+
+    def failing_sync(bundle):
+        raise RuntimeError("model reload failed")
+
+    monkeypatch.setattr(ml_api.hotspot_stream, "_sync", failing_sync)
+    response = api.post("/api/hotspots/ingest", json={"reports": report_payload(generate_reports(50))})
+
+    assert response.status_code == 400
+    assert len(ml_api.report_store) == 0
+
+
+def test_ingest_is_persisted(api, hotspot_model, model_dir):
+    import ml_api
+    ml_api.hotspot_stream.persist_interval = 0
+    before_reports, before_waste = cluster_totals(model_dir)
+    new = generate_reports(200, seed=9)
+
+    response = api.post("/api/hotspots/ingest", json={"reports": report_payload(new)})
+
+    assert response.get_json()["persisted"] is True
+    after_reports, after_waste = cluster_totals(model_dir)
+    clustered = np.array(response.get_json()["cluster_ids"]) >= 0
+    assert after_reports == before_reports + clustered.sum()
+    assert after_waste == pytest.approx(
+        before_waste + new['waste_amount_kg'][clustered].sum(), rel=1e-4
+    )
+
+
+def test_pending_reports_are_written_without_another_ingest(api, hotspot_model, model_dir):
+    import ml_api
+    ml_api.hotspot_stream.persist_interval = 0.2
+    before = cluster_totals(model_dir)
+    # Written less than persist_interval ago, so the ingest itself does not write
+    response = api.post("/api/hotspots/ingest", json={"reports": report_payload(generate_reports(1))})
+    assert response.status_code == 200
+    ml_api.hotspot_stream.persisted_at = time.monotonic()
+
+    response = api.post("/api/hotspots/ingest", json={"reports": report_payload(generate_reports(50))})
+    assert response.status_code == 200
+    assert response.get_json()["persisted"] is False
+
+    deadline = time.monotonic() + 5
+    while ml_api.hotspot_stream.stats()["pending_persist"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not ml_api.hotspot_stream.stats()["pending_persist"]
+    assert cluster_totals(model_dir) != before
+
+
+def worker_stream(model_dir):
+    """
+    (stream, registry) of one API worker process: its own registry and live state
+    """
+    worker_registry = ModelRegistry(str(model_dir), check_interval=0)
+    for spec in MODEL_SPECS:
+        worker_registry.register(spec)
+    return HotspotStream(persist_interval=3600, registry=worker_registry), worker_registry
+
+
+def test_workers_merge_their_updates(hotspot_model, model_dir):
+    (first, first_registry), (second, second_registry) = worker_stream(model_dir), worker_stream(model_dir)
+    before_reports, before_waste = cluster_totals(model_dir)
+    first_reports, second_reports = generate_reports(300, seed=10), generate_reports(200, seed=11)
+    try:
+        first_labels, _ = first.ingest(first_registry.get('hotspot'), report_payload(first_reports))
+        second_labels, _ = second.ingest(second_registry.get('hotspot'), report_payload(second_reports))
+
+        # Each worker writes on top of the other's write instead of replacing it
+        assert first.persist()
+        assert second.persist()
+        after_reports, after_waste = cluster_totals(model_dir)
+        first_clustered, second_clustered = first_labels >= 0, second_labels >= 0
+        assert after_reports == before_reports + first_clustered.sum() + second_clustered.sum()
+        assert after_waste == pytest.approx(
+            before_waste
+            + first_reports['waste_amount_kg'][first_clustered].sum()
+            + second_reports['waste_amount_kg'][second_clustered].sum(),
+            rel=1e-4,
+        )
+
+        # The first worker picks up the second one's write, and its next write keeps both
+        live = first.cluster_statistics(first_registry.get('hotspot'))
+        assert sum(s['num_reports'] for s in live) == after_reports
+        more_labels, _ = first.ingest(first_registry.get('hotspot'), report_payload(generate_reports(50, seed=12)))
+        assert first.persist()
+        assert cluster_totals(model_dir)[0] == after_reports + (more_labels >= 0).sum()
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,93 @@
+# tests/test_prediction_cache.py
+"""
+Prediction cache keys, bounds and invalidation when the model version changes
+"""
+
+import os
+import shutil
+import time
+
+import numpy as np
+import pytest
+
+from prediction_cache import PredictionCache, row_key
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_row_key_ignores_spelling():
+    assert row_key([0, 2, 0, 1]) == row_key(np.array([0.0, 2.0, 0.0, 1.0]))
+    assert row_key([0, 2, 0, 1]) != row_key([0, 1, 0, 2])
+
+
+def test_version_change_invalidates():
+    cache = PredictionCache()
+    cache.put(b"a", "v1", 1.0)
+    assert cache.get(b"a", "v1") == 1.0
+
+    assert cache.get(b"a", "v2") is None
+
+    stats = cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["entries"] == 0
+    assert stats["model_version"] == "v2"
+    # Entries written for the new version are kept
+    cache.put(b"a", "v2", 2.0)
+    assert cache.get(b"a", "v2") == 2.0
+
+
+def test_lru_eviction():
+    cache = PredictionCache(max_entries=2)
+    cache.put(b"a", "v1", 1.0)
+    cache.put(b"b", "v1", 2.0)
+    cache.get(b"a", "v1")
+    cache.put(b"c", "v1", 3.0)
+
+    assert cache.get(b"b", "v1") is None
+    assert cache.get(b"a", "v1") == 1.0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entries_miss(monkeypatch):
+    cache = PredictionCache(ttl_seconds=10)
+    cache.put(b"a", "v1", 1.0)
+
+    later = time.monotonic() + 11
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+
+    assert cache.get(b"a", "v1") is None
+    assert cache.stats()["expirations"] == 1
+
+
+@pytest.fixture
+def emission_model(model_dir):
+    """
+    The shipped emission artifacts, copied into model_dir
+    """
+    for filename in ("model_columns.pkl", "emission_model.pkl", "emission_forest.npz"):
+        source = os.path.join(SERVICE_DIR, filename)
+        if not os.path.exists(source):
+            pytest.skip(f"{filename} not trained")
+        shutil.copy(source, model_dir / filename)
+    return model_dir
+
+
+def test_republished_model_invalidates_the_endpoint_cache(api, emission_model, monkeypatch):
+    import ml_api
+    monkeypatch.setattr(ml_api, "emission_cache", PredictionCache())
+    items = {"Plastic": 2, "Metal": 1}
+
+    first = api.post("/api/predict-emission", json=items).get_json()
+    api.post("/api/predict-emission", json=items)
+    assert ml_api.emission_cache.stats()["hits"] == 1
+
+    # A new version of the forest (same content, new mtime) is published
+    forest = emission_model / "emission_forest.npz"
+    stat = os.stat(forest)
+    os.utime(forest, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    again = api.post("/api/predict-emission", json=items).get_json()
+
+    stats = ml_api.emission_cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["hits"] == 1
+    assert again["predicted_emission_CO2e"] == first["predicted_emission_CO2e"]
@@ -0,0 +1,120 @@
+# tests/test_report_store.py
+"""
+Appends, compaction and date-range reads of the columnar report store
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import report_store
+from report_store import ReportStore
+from synthetic_data import generate_reports
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ReportStore(str(tmp_path / "report_store"))
+
+
+def by_id(df):
+    # Synthetic ids repeat across seeds
+    return df.sort_values(['report_id', 'latitude']).reset_index(drop=True)
+
+
+def test_append_and_read_round_trip(store):
+    reports = generate_reports(500, seed=1)
+
+    assert store.append(reports) == 500
+
+    assert len(store) == 500
+    frame = store.read_frame()
+    pd.testing.assert_frame_equal(
+        by_id(frame)[['report_id', 'latitude', 'longitude', 'severity']],
+        by_id(reports)[['report_id', 'latitude', 'longitude', 'severity']],
+        check_dtype=False,
+    )
+    np.testing.assert_allclose(
+        by_id(frame)['waste_amount_kg'], by_id(reports)['waste_amount_kg'], rtol=1e-6
+    )
+    # Each segment is sorted by report date
+    assert frame['report_date'].is_monotonic_increasing
+
+
+def test_appends_from_report_dicts_get_ids(store):
+    reports = generate_reports(3, seed=2).drop(columns=['report_id'])
+    reports['report_date'] = reports['report_date'].dt.strftime('%Y-%m-%d')
+
+    store.append(reports.to_dict(orient='records'))
+
+    ids = store.read_frame(['report_id'])['report_id']
+    assert ids.nunique() == 3
+    assert ids.str.startswith('S1:').all()
+
+
+def test_invalid_reports_are_rejected(store):
+    reports = generate_reports(3, seed=3)
+
+    with pytest.raises(ValueError):
+        store.append(reports.drop(columns=['severity']))
+    with pytest.raises(ValueError):
+        store.append(reports.assign(report_id='Résumé'))
+    assert len(store) == 0
+
+
+def test_date_range_reads(store):
+    first = generate_reports(400, seed=4)
+    second = generate_reports(400, seed=5)
+    store.append(first)
+    store.append(second)
+    everything = pd.concat([first, second])
+    dates = everything['report_date'].sort_values()
+    start, end = dates.iloc[200], dates.iloc[600]
+
+    frame = store.read_frame(start=start, end=end)
+
+    expected = everything[(everything['report_date'] >= start) & (everything['report_date'] <= end)]
+    assert sorted(frame['report_id']) == sorted(expected['report_id'])
+    assert len(store.read_frame(start=dates.iloc[-1] + pd.Timedelta(days=1))) == 0
+
+
+def test_segments_outside_the_range_are_skipped(store):
+    old = generate_reports(100, seed=6).assign(report_date=pd.Timestamp('2020-01-01'))
+    new = generate_reports(100, seed=7).assign(report_date=pd.Timestamp('2024-01-01'))
+    store.append(old)
+    store.append(new)
+
+    assert len(store.segments(start='2023-01-01')) == 1
+    assert len(store.segments(end='2021-01-01')) == 1
+    assert len(store.segments()) == 2
+
+
+def test_compact_merges_segments(store):
+    for seed in range(4):
+        store.append(generate_reports(100, seed=seed))
+    before = by_id(store.read_frame())
+
+    assert store.compact() == 1
+
+    assert store.stats()["segments"] == 1
+    pd.testing.assert_frame_equal(by_id(store.read_frame()), before)
+
+
+def test_compact_max_rows_keeps_large_segments(store):
+    store.append(generate_reports(500, seed=1))
+    store.append(generate_reports(50, seed=2))
+    store.append(generate_reports(50, seed=3))
+
+    assert store.compact(max_rows=100) == 2
+
+    assert sorted(s['rows'] for s in store.manifest()['segments']) == [100, 500]
+
+
+def test_small_appends_are_merged(store, monkeypatch):
+    monkeypatch.setattr(report_store, "MAX_SMALL_SEGMENTS", 3)
+
+    for seed in range(3):
+        store.append(generate_reports(10, seed=seed))
+
+    assert store.stats()["segments"] == 1
+    assert len(store) == 30
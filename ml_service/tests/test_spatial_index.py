@@ -0,0 +1,107 @@
+# tests/test_spatial_index.py
+"""
+GridIndex queries against a brute-force haversine scan, including points
+near the poles and on both sides of the antimeridian
+"""
+
+import numpy as np
+import pytest
+
+from hotspot_clusters import haversine_km
+from spatial_index import GridIndex
+
+
+def city_points(n=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return 19.0 + rng.normal(0, 0.05, n), 72.9 + rng.normal(0, 0.05, n)
+
+
+def world_points(n=20_000, seed=1):
+    rng = np.random.default_rng(seed)
+    latitude = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    return latitude, rng.uniform(-180, 180, n)
+
+
+def brute_force(latitude, longitude, query_lat, query_lng):
+    return haversine_km(query_lat, query_lng, latitude, longitude)
+
+
+QUERIES = {
+    "city": [(19.0, 72.9), (19.05, 72.85), (18.9, 73.0)],
+    "world": [(0.0, 179.9), (0.0, -179.9), (89.5, 10.0), (-89.9, -45.0), (45.0, 0.0)],
+}
+
+
+@pytest.fixture(params=["city", "world"])
+def points(request):
+    """
+    (index, query points) over dense city data or points spread over the globe
+    """
+    latitude, longitude = city_points() if request.param == "city" else world_points()
+    return GridIndex.build(latitude, longitude), QUERIES[request.param]
+
+
+@pytest.mark.parametrize("radius_km", [0.1, 0.5, 2.0, 300.0])
+def test_query_radius_matches_brute_force(points, radius_km):
+    index, queries = points
+    for query_lat, query_lng in queries:
+        distances = brute_force(index.latitude, index.longitude, query_lat, query_lng)
+        expected = np.flatnonzero(distances <= radius_km)
+
+        indices, found = index.query_radius(query_lat, query_lng, radius_km)
+
+        np.testing.assert_array_equal(np.sort(indices), expected)
+        np.testing.assert_allclose(found, distances[indices])
+        assert (np.diff(found) >= 0).all()
+
+
+@pytest.mark.parametrize("limit", [0, 1, 10, 10_000])
+def test_query_radius_limit(points, limit):
+    index, queries = points
+    for query_lat, query_lng in queries:
+        all_indices, all_distances, count = index.query_radius(
+            query_lat, query_lng, 300.0, return_count=True
+        )
+        indices, distances, limited_count = index.query_radius(
+            query_lat, query_lng, 300.0, limit=limit, return_count=True
+        )
+
+        assert limited_count == count == len(all_indices)
+        assert len(indices) == min(limit, count)
+        np.testing.assert_allclose(distances, all_distances[:len(indices)])
+
+
+@pytest.mark.parametrize("k", [1, 5, 50])
+def test_query_nearest_matches_brute_force(points, k):
+    index, queries = points
+    for query_lat, query_lng in queries:
+        distances = brute_force(index.latitude, index.longitude, query_lat, query_lng)
+
+        indices, found = index.query_nearest(query_lat, query_lng, k)
+
+        assert len(indices) == k
+        np.testing.assert_allclose(found, np.sort(distances)[:k])
+        np.testing.assert_allclose(found, distances[indices])
+
+
+def test_query_nearest_within_max_radius(points):
+    index, queries = points
+    for query_lat, query_lng in queries:
+        distances = brute_force(index.latitude, index.longitude, query_lat, query_lng)
+
+        indices, found = index.query_nearest(query_lat, query_lng, 50, max_radius_km=0.5)
+
+        assert len(indices) == min(50, (distances <= 0.5).sum())
+        assert (found <= 0.5).all()
+
+
+def test_extra_columns_follow_their_points():
+    latitude, longitude = city_points(2000)
+    ids = np.arange(len(latitude))
+    index = GridIndex.build(latitude, longitude, report_id=ids)
+
+    indices, _ = index.query_radius(19.0, 72.9, 1.0)
+
+    rows = index.columns["report_id"][indices]
+    np.testing.assert_array_equal(latitude[rows], index.latitude[indices])
+    np.testing.assert_array_equal(longitude[rows], index.longitude[indices])
@@ -1,109 +1,307 @@
 # train_all_models.py
 """
 Train all EcoTrack ML models at once
+The models do not depend on each other, so each one trains in its own
+process with its own CPU budget and log file; a failure in one model
+does not stop the others
 """
 
+import os
 import sys
+import json
 import time
+import queue
+import argparse
+import traceback
+import multiprocessing
+from datetime import datetime
+
+LOG_DIR = "training_logs"
+SUMMARY_FILE = "training_summary.json"
+
+# name, title, training function, artifacts it produces, default CPU budget.
+# The budget can be overridden per model with ECOTRACK_TRAIN_CPUS_<NAME>.
+TRAINING_JOBS = [
+    {
+        "name": "emission",
+        "title": "📊 CO2 Emission Impact Predictor",
+        "target": "train_model:train_emission_model",
+        "artifacts": ["emission_model.pkl", "model_columns.pkl", "emission_forest.npz",
+                      "item_emission_table.json"],
+        "cpus": 1,
+    },
+    {
+        "name": "engagement",
+        "title": "👥 User Engagement Predictor",
+        "target": "user_engagement_predictor:train_engagement_model",
+        "artifacts": ["engagement_model.pkl", "engagement_scaler.pkl", "engagement_features.json",
+                      "engagement_forest.npz", "feature_importance.json"],
+        "cpus": 2,
+    },
+    {
+        "name": "hotspot",
+        "title": "📍 Waste Hotspot Detector",
+        "target": "train_all_models:train_hotspot_with_map",
+        "artifacts": ["hotspot_model.pkl", "hotspot_scaler.pkl", "hotspot_features.json",
+                      "cluster_statistics.json", "waste_hotspots_map.png"],
+        "cpus": 1,
+    },
+    {
+        "name": "waste_classifier",
+        "title": "🖼️  Waste Image Classifier (Demo Mode)",
+        "target": "waste_classifier:create_demo_model",
+        "artifacts": ["waste_classifier_model.h5", "waste_categories.json"],
+        "cpus": 2,
+    },
+]
+
+# Fewer reports than this in the report store are not enough to find hotspots
+MIN_STORE_REPORTS = 100
+
+THREAD_ENV_VARS = [
+    "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS", "LOKY_MAX_CPU_COUNT",
+    "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS",
+]
+
 
-print("="*70)
-print("🚀 ECOTRACK ML MODELS - TRAINING ALL MODELS")
-print("="*70)
-print()
-
-# Model 1: CO2 Emission Predictor
-print("📊 MODEL 1: CO2 Emission Impact Predictor")
-print("-"*70)
-try:
-    import train_model
-    print("✓ CO2 Emission model trained successfully!\n")
-except Exception as e:
-    print(f"✗ Error training CO2 model: {e}\n")
-
-time.sleep(1)
-
-# Model 2: User Engagement Predictor
-print("\n" + "="*70)
-print("👥 MODEL 2: User Engagement Predictor")
-print("-"*70)
-try:
-    import user_engagement_predictor as uep
-    model, scaler, features = uep.train_engagement_model()
-    print("\n✓ User Engagement model trained successfully!\n")
-except Exception as e:
-    print(f"✗ Error training Engagement model: {e}\n")
-
-time.sleep(1)
-
-# Model 3: Waste Hotspot Detector
-print("\n" + "="*70)
-print("📍 MODEL 3: Waste Hotspot Detector")
-print("-"*70)
-try:
+def train_hotspot_with_map():
+    """
+    Hotspot training plus the cluster map, as one job
+
+    Trains on the report store once it holds MIN_STORE_REPORTS reports,
+    before that on sample data.
+    """
     import waste_hotspot_detector as whd
-    kmeans, scaler, stats, df = whd.train_hotspot_detector()
+    from report_store import ReportStore
+
+    store = ReportStore()
+    use_store = len(store) >= MIN_STORE_REPORTS
+    kmeans, scaler, stats, df = whd.train_hotspot_detector(store=store if use_store else None)
     whd.visualize_hotspots(df)
-    print("\n✓ Waste Hotspot model trained successfully!\n")
-except Exception as e:
-    print(f"✗ Error training Hotspot model: {e}\n")
-
-time.sleep(1)
-
-# Model 4: Waste Image Classifier (Demo mode)
-print("\n" + "="*70)
-print("🖼️  MODEL 4: Waste Image Classifier (Demo Mode)")
-print("-"*70)
-print("Note: Full training requires actual image dataset")
-try:
-    import waste_classifier as wc
-    wc.create_demo_model()
-    print("\n✓ Waste Classifier demo model created!\n")
-except Exception as e:
-    print(f"✗ Error creating Waste Classifier: {e}\n")
-
-# Summary
-print("\n" + "="*70)
-print("📋 TRAINING SUMMARY")
-print("="*70)
 
-import os
 
-models_status = []
-
-# Check which models were created
-if os.path.exists("emission_model.pkl"):
-    models_status.append("✓ CO2 Emission Predictor - Ready")
-else:
-    models_status.append("✗ CO2 Emission Predictor - Failed")
-
-if os.path.exists("engagement_model.pkl"):
-    models_status.append("✓ User Engagement Predictor - Ready")
-else:
-    models_status.append("✗ User Engagement Predictor - Failed")
-
-if os.path.exists("hotspot_model.pkl"):
-    models_status.append("✓ Waste Hotspot Detector - Ready")
-else:
-    models_status.append("✗ Waste Hotspot Detector - Failed")
-
-if os.path.exists("waste_classifier_model.h5"):
-    models_status.append("✓ Waste Image Classifier - Ready (Demo)")
-else:
-    models_status.append("✗ Waste Image Classifier - Not Created")
-
-for status in models_status:
-    print(f"  {status}")
-
-print("\n" + "="*70)
-print("🎯 NEXT STEPS:")
-print("="*70)
-print("1. Review model training outputs above")
-print("2. Check generated files (*.pkl, *.h5, *.json)")
-print("3. Start the ML API service:")
-print("   > python ml_api.py")
-print("4. Test API endpoints:")
-print("   > http://localhost:5001/api/health")
-print("   > http://localhost:5001/api/models/info")
-print("\n" + "="*70)
-print("🎓 For Tejas: Review README_ML_MODELS.md for detailed documentation")
-print("="*70)
+def cpu_budget(job):
+    return max(1, int(os.environ.get(f"ECOTRACK_TRAIN_CPUS_{job['name'].upper()}", job["cpus"])))
+
+
+def available_cpus():
+    """
+    IDs of the CPUs this process may run on (its cpuset in a container)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _limit_cpus(cpus, cpu_ids):
+    """
+    Apply the CPU budget in a fresh worker, before numpy/sklearn/TF are imported
+    """
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(cpus)
+    if cpu_ids and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpu_ids)
+        except OSError as e:
+            # Pinning is an optimization; the thread limits above still apply
+            print(f"⚠ Could not pin to CPUs {cpu_ids}: {e}")
+
+
+def _peak_memory_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_job(job, cpus, cpu_ids, log_path, results):
+    """
+    Worker process: train one model with stdout/stderr going to its log file
+    """
+    log = open(log_path, "w", buffering=1)
+    # Redirect at the file-descriptor level so output from C extensions lands in the log too
+    os.dup2(log.fileno(), 1)
+    os.dup2(log.fileno(), 2)
+    sys.stdout = sys.stderr = log
+
+    _limit_cpus(cpus, cpu_ids)
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
+    started = time.perf_counter()
+    status, error = "success", None
+    try:
+        module_name, function_name = job["target"].split(":")
+        module = __import__(module_name)
+        getattr(module, function_name)()
+    except Exception as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+
+    results.put({
+        "name": job["name"],
+        "status": status,
+        "error": error,
+        "wall_time_s": round(time.perf_counter() - started, 3),
+        "peak_memory_mb": _peak_memory_mb(),
+    })
+    log.flush()
+
+
+def _artifact_info(filename):
+    from model_registry import artifact_path
+
+    path = os.path.abspath(artifact_path(filename))
+    return {
+        "path": path,
+        "exists": os.path.exists(path),
+        "size_bytes": os.path.getsize(path) if os.path.exists(path) else None,
+    }
+
+
+def train_all_models(names=None, max_cpus=None, log_dir=LOG_DIR, summary_file=SUMMARY_FILE):
+    """
+    Train the selected models in parallel worker processes
+
+    Jobs start as long as the running jobs' CPU budgets fit in max_cpus
+    (a job larger than max_cpus still runs, alone). Returns the summary
+    that is also written to summary_file.
+    """
+    jobs = [job for job in TRAINING_JOBS if names is None or job["name"] in names]
+    free_cpus = available_cpus()
+    max_cpus = max_cpus or len(free_cpus)
+    os.makedirs(log_dir, exist_ok=True)
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    pending = list(jobs)
+    running = {}  # name -> (process, cpus, cpu_ids, log_path, started)
+    reports = {}
+    started_at = datetime.now().isoformat()
+    wall_start = time.perf_counter()
+
+    def start(job):
+        cpus = cpu_budget(job)
+        cpu_ids = free_cpus[:cpus] if len(free_cpus) >= cpus else None
+        del free_cpus[:len(cpu_ids or [])]
+        log_path = os.path.abspath(os.path.join(log_dir, f"{job['name']}.log"))
+        process = context.Process(
+            target=_run_job, args=(job, cpus, cpu_ids, log_path, results),
+            name=f"train-{job['name']}"
+        )
+        process.start()
+        running[job["name"]] = (process, cpus, cpu_ids, log_path, time.perf_counter())
+        print(f"▶ {job['title']} started ({cpus} CPU{'s' if cpus > 1 else ''}, log: {log_path})")
+
+    def finish(name, report):
+        # A worker marked as crashed may still deliver its result afterwards
+        if name not in running:
+            return
+        process, cpus, cpu_ids, log_path, started = running.pop(name)
+        process.join()
+        free_cpus.extend(cpu_ids or [])
+        free_cpus.sort()
+        job = next(job for job in jobs if job["name"] == name)
+        report.update({
+            "title": job["title"],
+            "cpus": cpus,
+            "log": log_path,
+            "exit_code": process.exitcode,
+            "artifacts": [_artifact_info(filename) for filename in job["artifacts"]],
+        })
+        reports[name] = report
+        mark = "✓" if report["status"] == "success" else "✗"
+        detail = f" - {report['error']}" if report.get("error") else ""
+        print(f"{mark} {job['title']} {report['status']} in {report['wall_time_s']:.1f}s{detail}")
+
+    while pending or running:
+        # Start everything that fits in the CPU budget
+        while pending:
+            in_use = sum(cpus for _, cpus, _, _, _ in running.values())
+            if running and in_use + cpu_budget(pending[0]) > max_cpus:
+                break
+            start(pending.pop(0))
+
+        try:
+            report = results.get(timeout=1.0)
+            finish(report["name"], report)
+        except queue.Empty:
+            # No result yet; pick up workers that died without reporting (crash, OOM kill)
+            for name, (process, _, _, _, started) in list(running.items()):
+                if not process.is_alive() and process.exitcode != 0:
+                    finish(name, {
+                        "name": name,
+                        "status": "failed",
+                        "error": f"worker exited with code {process.exitcode}",
+                        "wall_time_s": round(time.perf_counter() - started, 3),
+                        "peak_memory_mb": None,
+                    })
+
+    summary = {
+        "started_at": started_at,
+        "wall_time_s": round(time.perf_counter() - wall_start, 3),
+        "max_cpus": max_cpus,
+        "succeeded": sum(r["status"] == "success" for r in reports.values()),
+        "failed": sum(r["status"] != "success" for r in reports.values()),
+        "models": [reports[job["name"]] for job in jobs],
+    }
+    with open(summary_file, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train all EcoTrack ML models in parallel")
+    parser.add_argument("--models", help="comma-separated subset of: "
+                        + ", ".join(job["name"] for job in TRAINING_JOBS))
+    parser.add_argument("--max-cpus", type=int, help="total CPU budget (default: all CPUs available to this process)")
+    parser.add_argument("--log-dir", default=LOG_DIR)
+    parser.add_argument("--summary", default=SUMMARY_FILE)
+    args = parser.parse_args()
+
+    print("="*70)
+    print("🚀 ECOTRACK ML MODELS - TRAINING ALL MODELS")
+    print("="*70)
+    print()
+
+    names = args.models.split(",") if args.models else None
+    summary = train_all_models(names, max_cpus=args.max_cpus,
+                               log_dir=args.log_dir, summary_file=args.summary)
+
+    # Summary
+    print("\n" + "="*70)
+    print("📋 TRAINING SUMMARY")
+    print("="*70)
+    for report in summary["models"]:
+        mark = "✓" if report["status"] == "success" else "✗"
+        memory = f"{report['peak_memory_mb']:.0f} MB" if report["peak_memory_mb"] else "n/a"
+        print(f"  {mark} {report['title'].split(' ', 1)[1].strip():40} "
+              f"{report['wall_time_s']:7.1f}s  peak {memory}")
+    print(f"\n  Total wall time: {summary['wall_time_s']:.1f}s "
+          f"({summary['succeeded']} succeeded, {summary['failed']} failed)")
+    print(f"  Summary: {os.path.abspath(args.summary)}")
+    print(f"  Logs:    {os.path.abspath(args.log_dir)}/")
+
+    print("\n" + "="*70)
+    print("🎯 NEXT STEPS:")
+    print("="*70)
+    print("1. Review model training logs in training_logs/")
+    print("2. Check generated files (*.pkl, *.h5, *.json)")
+    print("3. Start the ML API service:")
+    print("   > python ml_api.py")
+    print("4. Test API endpoints:")
+    print("   > http://localhost:5001/api/health")
+    print("   > http://localhost:5001/api/models/info")
+    print("\n" + "="*70)
+    print("🎓 For Tejas: Review README_ML_MODELS.md for detailed documentation")
+    print("="*70)
+
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
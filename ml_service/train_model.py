@@ -4,21 +4,40 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 import joblib
 
-# Load dataset
-df = pd.read_csv("beachclean_dataset.csv")
-# Prepare features and target (e.g., Emission_Impact)
-X = pd.get_dummies(df.drop(columns=["Emission_Impact_CO2e", "Item_ID", "Item_Name"]))
-y = df["Emission_Impact_CO2e"]
+from compiled_forest import compile_forest
+from emission_catalog import build_item_emission_table, save_item_emission_table
+from emission_encoder import EmissionEncoder
+from model_registry import atomic_joblib_dump, publishing
 
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def train_emission_model(csv_path="beachclean_dataset.csv"):
+    # Load dataset
+    df = pd.read_csv(csv_path)
+    # Prepare features and target (e.g., Emission_Impact)
+    X = pd.get_dummies(df.drop(columns=["Emission_Impact_CO2e", "Item_ID", "Item_Name"]))
+    y = df["Emission_Impact_CO2e"]
 
-# Train model
-model = RandomForestRegressor(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
+    # Train-test split
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-# Save model and columns
-joblib.dump(model, "emission_model.pkl")
-joblib.dump(X_train.columns.tolist(), "model_columns.pkl")
+    # Train model
+    model = RandomForestRegressor(n_estimators=100, random_state=42)
+    model.fit(X_train, y_train)
 
-print("Model trained and saved.")
+    # Save model, columns, and the compiled forest used for serving
+    forest = compile_forest(model)
+    with publishing("emission"):
+        atomic_joblib_dump(model, "emission_model.pkl")
+        atomic_joblib_dump(X_train.columns.tolist(), "model_columns.pkl")
+        forest.save("emission_forest.npz")
+
+    # Precompute the emission of every catalog item for table lookups
+    table = build_item_emission_table(forest, EmissionEncoder(X_train.columns), csv_path)
+    with publishing("item_emission"):
+        save_item_emission_table(table)
+
+    print("Model trained and saved.")
+
+    return model, X_train.columns.tolist()
+
+if __name__ == "__main__":
+    train_emission_model()
@@ -5,20 +5,23 @@ Predicts likelihood of user participating in environmental events
 Uses Random Forest Classifier
 """
 
-import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-import joblib
 import json
+from contextlib import nullcontext
+
+# pandas, sklearn and joblib are imported where they are used: the API imports
+# this module for build_engagement_matrix / score_engagement_batch only
+
+from compiled_forest import compile_forest
+from model_registry import artifact_path, atomic_joblib_dump, atomic_json_dump, publishing
 
 def generate_sample_user_data(n_samples=1000):
     """
     Generate synthetic user engagement data for training
     In production, this would come from actual user database
     """
+    import pandas as pd
+    
     np.random.seed(42)
     
     data = {
@@ -61,6 +64,12 @@ def train_engagement_model(df=None):
     """
     Train user engagement prediction model
     """
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, classification_report
+    from sklearn.model_selection import cross_val_score, train_test_split
+    from sklearn.preprocessing import StandardScaler
+    
     if df is None:
         print("Generating sample user data...")
         df = generate_sample_user_data(n_samples=1000)
@@ -123,19 +132,85 @@ def train_engagement_model(df=None):
     print(feature_importance)
     
     # Save model, scaler, and feature columns
-    joblib.dump(model, 'engagement_model.pkl')
-    joblib.dump(scaler, 'engagement_scaler.pkl')
-    
-    with open('engagement_features.json', 'w') as f:
-        json.dump(feature_columns, f)
+    with publishing('engagement'):
+        atomic_joblib_dump(model, 'engagement_model.pkl')
+        atomic_joblib_dump(scaler, 'engagement_scaler.pkl')
+        atomic_json_dump(feature_columns, 'engagement_features.json')
+        compile_forest(model, scaler=scaler).save('engagement_forest.npz')
     
-    with open('feature_importance.json', 'w') as f:
-        json.dump(feature_importance.to_dict('records'), f)
+    atomic_json_dump(feature_importance.to_dict('records'), 'feature_importance.json')
     
     print("\n✓ Model, scaler, and features saved!")
     
     return model, scaler, feature_columns
 
+def load_engagement_artifacts():
+    """
+    Load the trained engagement model, scaler, and feature columns
+    """
+    import joblib
+    
+    model = joblib.load(artifact_path('engagement_model.pkl'))
+    scaler = joblib.load(artifact_path('engagement_scaler.pkl'))
+    
+    with open(artifact_path('engagement_features.json'), 'r') as f:
+        feature_columns = json.load(f)
+    
+    return model, scaler, feature_columns
+
+def engagement_recommendation(participation_probability):
+    """
+    Map a participation probability to an admin recommendation
+    """
+    if participation_probability > 0.7:
+        return 'High priority for event invitation'
+    if participation_probability > 0.5:
+        return 'Moderate priority'
+    return 'Send reminder with incentives'
+
+def build_engagement_matrix(users_data, feature_columns):
+    """
+    Build a (n_users, n_features) float matrix from a list of user dicts
+    
+    Filled one feature column at a time so the cost is one pass per feature
+    instead of one DataFrame per user. Missing features raise KeyError.
+    """
+    X = np.empty((len(users_data), len(feature_columns)), dtype=np.float64)
+    for j, feature in enumerate(feature_columns):
+        X[:, j] = [user[feature] for user in users_data]
+    return X
+
+def score_engagement_batch(users_data, model, scaler, feature_columns, stage=None):
+    """
+    Vectorized engagement scoring for many users at once
+    
+    Runs the scaler and the forest a single time over the whole batch and
+    derives will_participate from the same predict_proba output.
+    model may also be a CompiledForest with scaler=None (scaler folded in).
+    stage: optional callable(name) -> context manager wrapped around the
+    "features" and "inference" steps (used for the API's stage timings).
+    
+    Returns (will_participate, probabilities) where will_participate is a
+    bool array of shape (n_users,) and probabilities is (n_users, 2).
+    """
+    if len(users_data) == 0:
+        return np.zeros(0, dtype=bool), np.zeros((0, len(model.classes_)))
+    
+    stage = stage or (lambda name: nullcontext())
+    with stage("features"):
+        X = build_engagement_matrix(users_data, feature_columns)
+        if scaler is None:
+            X_scaled = X
+        else:
+            import pandas as pd
+            X_scaled = scaler.transform(pd.DataFrame(X, columns=feature_columns))
+    
+    with stage("inference"):
+        probabilities = model.predict_proba(X_scaled)
+        will_participate = model.classes_.take(np.argmax(probabilities, axis=1)).astype(bool)
+    
+    return will_participate, probabilities
+
 def predict_user_engagement(user_data):
     """
     Predict if a user will participate in next event
@@ -155,31 +230,19 @@ def predict_user_engagement(user_data):
         'login_frequency': 20
     }
     """
-    # Load model, scaler, and features
-    model = joblib.load('engagement_model.pkl')
-    scaler = joblib.load('engagement_scaler.pkl')
-    
-    with open('engagement_features.json', 'r') as f:
-        feature_columns = json.load(f)
+    model, scaler, feature_columns = load_engagement_artifacts()
     
-    # Create dataframe from user data
-    user_df = pd.DataFrame([user_data])[feature_columns]
-    
-    # Scale features
-    user_scaled = scaler.transform(user_df)
-    
-    # Predict
-    prediction = model.predict(user_scaled)[0]
-    probability = model.predict_proba(user_scaled)[0]
+    will_participate, probabilities = score_engagement_batch(
+        [user_data], model, scaler, feature_columns
+    )
+    probability = probabilities[0]
     
     result = {
-        'will_participate': bool(prediction),
+        'will_participate': bool(will_participate[0]),
         'participation_probability': float(probability[1]),
         'non_participation_probability': float(probability[0]),
         'confidence': float(max(probability)),
-        'recommendation': 'High priority for event invitation' if probability[1] > 0.7 
-                         else 'Moderate priority' if probability[1] > 0.5 
-                         else 'Send reminder with incentives'
+        'recommendation': engagement_recommendation(probability[1])
     }
     
     return result
@@ -187,12 +250,29 @@ def predict_user_engagement(user_data):
 def batch_predict_users(users_data):
     """
     Predict engagement for multiple users
+    
+    Loads the artifacts once and scores all users in a single vectorized pass
     """
+    model, scaler, feature_columns = load_engagement_artifacts()
+    
+    will_participate, probabilities = score_engagement_batch(
+        users_data, model, scaler, feature_columns
+    )
+    
+    participation = probabilities[:, 1].tolist()
+    non_participation = probabilities[:, 0].tolist()
+    confidence = probabilities.max(axis=1).tolist()
+    
     results = []
-    for user_data in users_data:
-        prediction = predict_user_engagement(user_data)
-        prediction['user_id'] = user_data.get('user_id', 'unknown')
-        results.append(prediction)
+    for i, user_data in enumerate(users_data):
+        results.append({
+            'will_participate': bool(will_participate[i]),
+            'participation_probability': participation[i],
+            'non_participation_probability': non_participation[i],
+            'confidence': confidence[i],
+            'recommendation': engagement_recommendation(participation[i]),
+            'user_id': user_data.get('user_id', 'unknown')
+        })
     
     return results
 
@@ -11,20 +11,34 @@ from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
 from tensorflow.keras.models import Model
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 import numpy as np
+import hashlib
 import json
+import os
+import time
+
+from image_preprocessing import IMAGE_SIZE, load_image_array
+from model_registry import artifact_path, atomic_json_dump, atomic_write, publishing
 
 # Define waste categories
 WASTE_CATEGORIES = ['Plastic', 'Paper', 'Metal', 'Glass', 'Organic', 'E-waste']
 
-def create_waste_classifier_model():
+CLASSIFIER_FILE = 'waste_classifier_model.h5'
+CATEGORIES_FILE = 'waste_categories.json'
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+def create_waste_classifier_model(weights='imagenet'):
     """
     Create a CNN model for waste classification using MobileNetV2 transfer learning
+    
+    weights: 'imagenet' for the pre-trained base, or None to build it offline
+    with random weights (no download needed)
     """
     # Load pre-trained MobileNetV2 (without top layers)
     base_model = MobileNetV2(
         input_shape=(224, 224, 3),
         include_top=False,
-        weights='imagenet'
+        weights=weights
     )
     
     # Freeze base model layers
@@ -51,23 +65,13 @@ def create_waste_classifier_model():
     
     return model
 
-def train_waste_classifier(data_dir='waste_images', epochs=20):
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
+
+def build_generator_pipeline(data_dir='waste_images', batch_size=32):
     """
-    Train the waste classifier model
+    The original ImageDataGenerator input pipeline (single-threaded, Python augmentation)
     
-    Expected directory structure:
-    waste_images/
-        train/
-            Plastic/
-            Paper/
-            Metal/
-            Glass/
-            Organic/
-            E-waste/
-        validation/
-            Plastic/
-            Paper/
-            ...
+    Returns (train_generator, validation_generator).
     """
     # Data augmentation for training
     train_datagen = ImageDataGenerator(
@@ -87,8 +91,8 @@ def train_waste_classifier(data_dir='waste_images', epochs=20):
     # Load training data
     train_generator = train_datagen.flow_from_directory(
         f'{data_dir}/train',
-        target_size=(224, 224),
-        batch_size=32,
+        target_size=IMAGE_SIZE,
+        batch_size=batch_size,
         class_mode='categorical',
         classes=WASTE_CATEGORIES
     )
@@ -96,12 +100,206 @@ def train_waste_classifier(data_dir='waste_images', epochs=20):
     # Load validation data
     validation_generator = val_datagen.flow_from_directory(
         f'{data_dir}/validation',
-        target_size=(224, 224),
-        batch_size=32,
+        target_size=IMAGE_SIZE,
+        batch_size=batch_size,
         class_mode='categorical',
         classes=WASTE_CATEGORIES
     )
     
+    return train_generator, validation_generator
+
+def list_image_files(directory):
+    """
+    Image paths and class indices under directory/<category>/, in WASTE_CATEGORIES order
+    
+    Same layout and label order as flow_from_directory(classes=WASTE_CATEGORIES).
+    """
+    paths, labels = [], []
+    for label, category in enumerate(WASTE_CATEGORIES):
+        class_dir = os.path.join(directory, category)
+        if not os.path.isdir(class_dir):
+            continue
+        for name in sorted(os.listdir(class_dir)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(class_dir, name))
+                labels.append(label)
+    return paths, labels
+
+def image_set_digest(paths):
+    """
+    Short digest of the file list (names, sizes, mtimes) used to key the decode cache
+    """
+    digest = hashlib.sha1(repr(IMAGE_SIZE).encode())
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:12]
+
+def _decode_and_resize(path, label):
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, IMAGE_SIZE, method='nearest')
+    image = tf.cast(image, tf.float32) / 255.0
+    image.set_shape((*IMAGE_SIZE, 3))
+    return image, tf.one_hot(label, len(WASTE_CATEGORIES))
+
+def build_augmenter(seed=None):
+    """
+    Batch-level augmentation matching the ImageDataGenerator settings
+    
+    Runs on whole batches as graph ops instead of image by image in Python.
+    Keras has no shear layer, so shear_range is the one setting not reproduced.
+    """
+    return keras.Sequential([
+        keras.layers.RandomFlip('horizontal', seed=seed),
+        keras.layers.RandomRotation(20 / 360, fill_mode='nearest', seed=seed),
+        keras.layers.RandomTranslation(0.2, 0.2, fill_mode='nearest', seed=seed),
+        keras.layers.RandomZoom(0.2, fill_mode='nearest', seed=seed),
+    ], name='augmentation')
+
+def build_image_dataset(directory, batch_size=32, training=False, cache_dir=None, seed=42):
+    """
+    tf.data input pipeline for one split (train/ or validation/)
+    
+    read + decode + resize in parallel -> on-disk cache of decoded images
+    -> shuffle -> batch -> vectorized augmentation (training only) -> prefetch
+    
+    cache_dir: directory for the decoded-image cache; the cache file name
+    includes a digest of the file list, so adding, removing or editing
+    images starts a fresh cache instead of reusing a stale one.
+    """
+    paths, labels = list_image_files(directory)
+    if not paths:
+        raise ValueError(f"No images found under {directory}")
+    
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    dataset = dataset.map(_decode_and_resize, num_parallel_calls=AUTOTUNE, deterministic=False)
+    
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        split = os.path.basename(os.path.normpath(directory))
+        dataset = dataset.cache(os.path.join(cache_dir, f"{split}_{image_set_digest(paths)}"))
+    
+    if training:
+        dataset = dataset.shuffle(len(paths), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    
+    if training:
+        augmenter = build_augmenter(seed=seed)
+        dataset = dataset.map(
+            lambda images, labels: (augmenter(images, training=True), labels),
+            num_parallel_calls=AUTOTUNE
+        )
+    
+    return dataset.prefetch(AUTOTUNE)
+
+def build_tfdata_pipeline(data_dir='waste_images', batch_size=32, cache_dir='tfdata_cache'):
+    """
+    tf.data equivalent of build_generator_pipeline
+    
+    Returns (train_dataset, validation_dataset).
+    """
+    train_dataset = build_image_dataset(
+        f'{data_dir}/train', batch_size=batch_size, training=True, cache_dir=cache_dir
+    )
+    validation_dataset = build_image_dataset(
+        f'{data_dir}/validation', batch_size=batch_size, training=False, cache_dir=cache_dir
+    )
+    return train_dataset, validation_dataset
+
+def measure_throughput(batches, n_batches=50):
+    """
+    Images/sec delivered by an input pipeline (generator or tf.data dataset)
+    
+    The first batch is pulled before timing starts, so worker start-up
+    is not counted.
+    """
+    iterator = iter(batches)
+    next(iterator)
+    
+    n_images = 0
+    start = time.perf_counter()
+    for _ in range(n_batches):
+        try:
+            images, _ = next(iterator)
+        except StopIteration:
+            break
+        n_images += len(images)
+    elapsed = time.perf_counter() - start
+    
+    return n_images / elapsed if elapsed > 0 else 0.0
+
+def compare_input_pipelines(data_dir='waste_images', batch_size=32, n_batches=50,
+                            cache_dir='tfdata_cache'):
+    """
+    Report training images/sec for the ImageDataGenerator and tf.data pipelines
+    
+    The tf.data pipeline is measured twice: the first epoch fills the
+    decode cache, later epochs read from it.
+    """
+    train_generator, _ = build_generator_pipeline(data_dir, batch_size=batch_size)
+    generator_rate = measure_throughput(train_generator, n_batches)
+    
+    train_dataset = build_image_dataset(
+        f'{data_dir}/train', batch_size=batch_size, training=True, cache_dir=cache_dir
+    )
+    # Full pass so the cache is complete before the warm measurement
+    start = time.perf_counter()
+    n_images = sum(len(images) for images, _ in train_dataset)
+    cold_rate = n_images / (time.perf_counter() - start)
+    warm_rate = measure_throughput(train_dataset.repeat(), n_batches)
+    
+    results = {
+        'generator_images_per_sec': generator_rate,
+        'tfdata_first_epoch_images_per_sec': cold_rate,
+        'tfdata_cached_images_per_sec': warm_rate,
+    }
+    
+    print("\nInput pipeline throughput (training split):")
+    print(f"  ImageDataGenerator:       {generator_rate:8.1f} images/sec")
+    print(f"  tf.data (first epoch):    {cold_rate:8.1f} images/sec")
+    print(f"  tf.data (cached):         {warm_rate:8.1f} images/sec")
+    
+    return results
+
+def train_waste_classifier(data_dir='waste_images', epochs=20, pipeline='generator',
+                           batch_size=32, cache_dir='tfdata_cache'):
+    """
+    Train the waste classifier model
+    
+    Expected directory structure:
+    waste_images/
+        train/
+            Plastic/
+            Paper/
+            Metal/
+            Glass/
+            Organic/
+            E-waste/
+        validation/
+            Plastic/
+            Paper/
+            ...
+    
+    pipeline: 'generator' for ImageDataGenerator, 'tfdata' for the
+    parallel tf.data pipeline with a decoded-image cache in cache_dir,
+    'bottleneck' to train only the head from cached MobileNetV2 features
+    (see bottleneck_features.py)
+    """
+    if pipeline == 'bottleneck':
+        from bottleneck_features import train_head_from_features
+        return train_head_from_features(data_dir, epochs=epochs)
+    
+    if pipeline == 'tfdata':
+        train_data, validation_data = build_tfdata_pipeline(
+            data_dir, batch_size=batch_size, cache_dir=cache_dir
+        )
+    elif pipeline == 'generator':
+        train_data, validation_data = build_generator_pipeline(data_dir, batch_size=batch_size)
+    else:
+        raise ValueError(
+            f"Unknown pipeline: {pipeline!r} (expected 'generator', 'tfdata' or 'bottleneck')"
+        )
+    
     # Create model
     model = create_waste_classifier_model()
     
@@ -122,7 +320,7 @@ def train_waste_classifier(data_dir='waste_images', epochs=20):
             min_lr=1e-7
         ),
         keras.callbacks.ModelCheckpoint(
-            'waste_classifier_best.h5',
+            artifact_path('waste_classifier_best.h5'),
             monitor='val_accuracy',
             save_best_only=True,
             mode='max'
@@ -131,18 +329,14 @@ def train_waste_classifier(data_dir='waste_images', epochs=20):
     
     # Train model
     history = model.fit(
-        train_generator,
+        train_data,
         epochs=epochs,
-        validation_data=validation_generator,
+        validation_data=validation_data,
         callbacks=callbacks
     )
     
-    # Save final model
-    model.save('waste_classifier_model.h5')
-    
-    # Save category mapping
-    with open('waste_categories.json', 'w') as f:
-        json.dump(WASTE_CATEGORIES, f)
+    # Save final model and category mapping
+    save_classifier(model)
     
     print("\n✓ Waste classifier model trained and saved!")
     print(f"Final Training Accuracy: {history.history['accuracy'][-1]:.4f}")
@@ -150,15 +344,40 @@ def train_waste_classifier(data_dir='waste_images', epochs=20):
     
     return model, history
 
+def save_classifier(model, filename=CLASSIFIER_FILE):
+    """
+    Publish the Keras model and its category mapping together, atomically
+    
+    Both files are written next to the other model artifacts (ECOTRACK_MODEL_DIR),
+    so the API swaps in the new pair without ever loading half of it.
+    """
+    def write(tmp):
+        # Keras picks the file format from the extension
+        h5_path = tmp + '.h5'
+        try:
+            model.save(h5_path)
+            os.replace(h5_path, tmp)
+        finally:
+            if os.path.exists(h5_path):
+                os.remove(h5_path)
+    
+    with publishing('waste_classifier'):
+        path = atomic_write(filename, write)
+        atomic_json_dump(WASTE_CATEGORIES, CATEGORIES_FILE)
+    return path
+
+def load_classifier(path=CLASSIFIER_FILE):
+    """
+    Load a saved classifier for inference only (no optimizer state)
+    """
+    return keras.models.load_model(artifact_path(path), compile=False)
+
 def predict_waste_type(model, image_path):
     """
     Predict waste category from image
     """
     # Load and preprocess image
-    img = keras.preprocessing.image.load_img(image_path, target_size=(224, 224))
-    img_array = keras.preprocessing.image.img_to_array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    img_array = img_array / 255.0
+    img_array = np.expand_dims(load_image_array(image_path), axis=0)
     
     # Predict
     predictions = model.predict(img_array)
@@ -166,7 +385,7 @@ def predict_waste_type(model, image_path):
     confidence = predictions[0][predicted_class_idx]
     
     # Load categories
-    with open('waste_categories.json', 'r') as f:
+    with open(artifact_path(CATEGORIES_FILE), 'r') as f:
         categories = json.load(f)
     
     result = {
@@ -181,22 +400,37 @@ def predict_waste_type(model, image_path):
     return result
 
 # For demonstration without actual image data
-def create_demo_model():
+def create_demo_model(weights='imagenet'):
     """
     Create and save a demo model without training
     """
-    model = create_waste_classifier_model()
-    model.save('waste_classifier_model.h5')
-    
-    with open('waste_categories.json', 'w') as f:
-        json.dump(WASTE_CATEGORIES, f)
+    model = create_waste_classifier_model(weights=weights)
+    save_classifier(model)
     
     print("✓ Demo waste classifier model created!")
     print(f"Categories: {', '.join(WASTE_CATEGORIES)}")
 
 if __name__ == "__main__":
-    # Create demo model (since we don't have actual waste image dataset)
-    create_demo_model()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Create the waste classifier demo model")
+    parser.add_argument('--offline', action='store_true',
+                        help="build MobileNetV2 with weights=None instead of downloading ImageNet weights")
+    parser.add_argument('--train', metavar='DATA_DIR',
+                        help="train on DATA_DIR/train and DATA_DIR/validation instead of creating the demo model")
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--pipeline', choices=['generator', 'tfdata', 'bottleneck'], default='generator',
+                        help="input pipeline used with --train")
+    parser.add_argument('--compare-pipelines', metavar='DATA_DIR',
+                        help="report images/sec of both input pipelines on DATA_DIR and exit")
+    args = parser.parse_args()
     
-    # To train with actual data, uncomment:
-    # model, history = train_waste_classifier(data_dir='waste_images', epochs=20)
+    if args.compare_pipelines:
+        compare_input_pipelines(data_dir=args.compare_pipelines)
+    elif args.train:
+        model, history = train_waste_classifier(
+            data_dir=args.train, epochs=args.epochs, pipeline=args.pipeline
+        )
+    else:
+        # Create demo model (since we don't have actual waste image dataset)
+        create_demo_model(weights=None if args.offline else 'imagenet')
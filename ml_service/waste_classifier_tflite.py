@@ -0,0 +1,229 @@
+# waste_classifier_tflite.py
+"""
+Int8-quantized TFLite export and lightweight runtime for the waste classifier
+Serving only needs the TFLite interpreter (tflite-runtime), not the full
+TensorFlow install that the Keras .h5 model drags into every API worker
+"""
+
+import os
+import time
+import threading
+
+import numpy as np
+
+from image_preprocessing import load_image_array
+
+TFLITE_FILE = "waste_classifier_int8.tflite"
+REPORT_FILE = "waste_classifier_int8_report.json"
+
+
+def _interpreter_class():
+    """
+    tflite_runtime's Interpreter if installed, else the one bundled with TensorFlow
+    """
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        from tensorflow.lite import Interpreter
+    return Interpreter
+
+
+def _quantize(x, details):
+    scale, zero_point = details["quantization"]
+    if not scale:
+        return x.astype(details["dtype"])
+    info = np.iinfo(details["dtype"])
+    q = np.round(x / scale + zero_point)
+    return np.clip(q, info.min, info.max).astype(details["dtype"])
+
+
+def _dequantize(q, details):
+    scale, zero_point = details["quantization"]
+    if not scale:
+        return q.astype(np.float32)
+    return (q.astype(np.float32) - zero_point) * scale
+
+
+class TFLiteClassifier:
+    """
+    TFLite model with the same predict_on_batch interface as the Keras model
+
+    Takes float images in [0, 1] and returns float probabilities; int8
+    quantization of inputs and outputs happens here.
+    """
+
+    def __init__(self, path, num_threads=None):
+        if num_threads is None:
+            num_threads = int(os.environ.get("ECOTRACK_TFLITE_THREADS", os.cpu_count() or 1))
+        self.path = path
+        self.interpreter = _interpreter_class()(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.batch_size = int(self.input_details["shape"][0])
+        self._lock = threading.Lock()
+
+    def _resize(self, batch_size):
+        # Caller holds the lock; reallocating is only needed when the batch size changes
+        if batch_size != self.batch_size:
+            shape = [batch_size, *self.input_details["shape"][1:]]
+            self.interpreter.resize_tensor_input(self.input_details["index"], shape)
+            self.interpreter.allocate_tensors()
+            self.input_details = self.interpreter.get_input_details()[0]
+            self.output_details = self.interpreter.get_output_details()[0]
+            self.batch_size = batch_size
+
+    def predict_on_batch(self, images):
+        images = np.asarray(images, dtype=np.float32)
+        with self._lock:
+            self._resize(len(images))
+            self.interpreter.set_tensor(
+                self.input_details["index"], _quantize(images, self.input_details)
+            )
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output_details["index"])
+            return _dequantize(output, self.output_details)
+
+
+def load_tflite_classifier(path=TFLITE_FILE):
+    return TFLiteClassifier(path)
+
+
+def _sample_paths(directory, n, seed=42):
+    from waste_classifier import list_image_files
+
+    paths, labels = list_image_files(directory)
+    if not paths:
+        raise ValueError(f"No images found under {directory}")
+    rng = np.random.default_rng(seed)
+    idx = np.sort(rng.permutation(len(paths))[:n]) if n and n < len(paths) else np.arange(len(paths))
+    return [paths[i] for i in idx], np.asarray(labels)[idx]
+
+
+def quantize_classifier(model, calibration_paths):
+    """
+    Post-training full-integer quantization, calibrated on the given images
+
+    Weights, activations, input and output are all int8.
+    """
+    import tensorflow as tf
+
+    def representative_dataset():
+        for path in calibration_paths:
+            yield [load_image_array(path)[np.newaxis]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def _evaluate(predict_on_batch, images, labels, batch_size=32):
+    probabilities = np.concatenate([
+        np.asarray(predict_on_batch(images[i:i + batch_size]), dtype=np.float32)
+        for i in range(0, len(images), batch_size)
+    ])
+    accuracy = float(np.mean(np.argmax(probabilities, axis=1) == labels)) if len(labels) else 0.0
+    return probabilities, accuracy
+
+
+def _latency_ms(predict_on_batch, images, batch_size, repeats=20):
+    """
+    Median wall time of one predict_on_batch call, after a warm-up call
+    """
+    batch = images[:batch_size]
+    predict_on_batch(batch)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_on_batch(batch)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def export_quantized_classifier(data_dir='waste_images', model_path='waste_classifier_model.h5',
+                                output=TFLITE_FILE, calibration_samples=200,
+                                eval_samples=500, seed=42):
+    """
+    Export the int8 TFLite model and compare it with the float Keras model
+
+    Calibrates on a sample of data_dir/train, evaluates both models on a
+    sample of data_dir/validation and writes the numbers to REPORT_FILE.
+    """
+    from model_registry import artifact_path, atomic_json_dump, atomic_write, publishing
+    from waste_classifier import load_classifier
+
+    float_model = load_classifier(artifact_path(model_path))
+
+    calibration_paths, _ = _sample_paths(f'{data_dir}/train', calibration_samples, seed)
+    tflite_bytes = quantize_classifier(float_model, calibration_paths)
+
+    def write(tmp):
+        with open(tmp, 'wb') as f:
+            f.write(tflite_bytes)
+
+    with publishing("waste_classifier"):
+        tflite_path = atomic_write(output, write)
+    print(f"✓ Int8 model calibrated on {len(calibration_paths)} images saved to {tflite_path}")
+
+    # Accuracy and latency on held-out images
+    eval_paths, eval_labels = _sample_paths(f'{data_dir}/validation', eval_samples, seed)
+    images = np.stack([load_image_array(path) for path in eval_paths])
+    int8_model = TFLiteClassifier(tflite_path)
+
+    float_probs, float_accuracy = _evaluate(float_model.predict_on_batch, images, eval_labels)
+    int8_probs, int8_accuracy = _evaluate(int8_model.predict_on_batch, images, eval_labels)
+    agreement = float(np.mean(np.argmax(float_probs, axis=1) == np.argmax(int8_probs, axis=1)))
+
+    report = {
+        'eval_images': len(eval_paths),
+        'calibration_images': len(calibration_paths),
+        'float': {
+            'accuracy': float_accuracy,
+            'latency_ms_batch1': _latency_ms(float_model.predict_on_batch, images, 1),
+            'latency_ms_batch16': _latency_ms(float_model.predict_on_batch, images, 16),
+            'size_mb': os.path.getsize(artifact_path(model_path)) / 1e6,
+        },
+        'int8': {
+            'accuracy': int8_accuracy,
+            'latency_ms_batch1': _latency_ms(int8_model.predict_on_batch, images, 1),
+            'latency_ms_batch16': _latency_ms(int8_model.predict_on_batch, images, 16),
+            'size_mb': os.path.getsize(tflite_path) / 1e6,
+        },
+        'top1_agreement': agreement,
+        'max_abs_probability_diff': float(np.max(np.abs(float_probs - int8_probs))),
+    }
+    atomic_json_dump(report, REPORT_FILE)
+
+    print(f"\nFloat vs int8 on {len(eval_paths)} validation images:")
+    print(f"  {'':18} {'float':>10} {'int8':>10}")
+    for key, label in [('accuracy', 'accuracy'),
+                       ('latency_ms_batch1', 'latency ms (1)'),
+                       ('latency_ms_batch16', 'latency ms (16)'),
+                       ('size_mb', 'size MB')]:
+        print(f"  {label:18} {report['float'][key]:10.4f} {report['int8'][key]:10.4f}")
+    print(f"  top-1 agreement: {agreement:.4f}")
+    print(f"✓ Comparison saved to {REPORT_FILE}")
+
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the int8 TFLite waste classifier")
+    parser.add_argument('data_dir', nargs='?', default='waste_images',
+                        help="dataset with train/ (calibration) and validation/ (comparison)")
+    parser.add_argument('--model', default='waste_classifier_model.h5')
+    parser.add_argument('--output', default=TFLITE_FILE)
+    parser.add_argument('--calibration-samples', type=int, default=200)
+    parser.add_argument('--eval-samples', type=int, default=500)
+    args = parser.parse_args()
+
+    export_quantized_classifier(
+        data_dir=args.data_dir, model_path=args.model, output=args.output,
+        calibration_samples=args.calibration_samples, eval_samples=args.eval_samples
+    )
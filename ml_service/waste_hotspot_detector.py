@@ -6,77 +6,208 @@ Identifies areas with high waste accumulation for targeted cleanup
 
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans, DBSCAN
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import silhouette_score
 import joblib
 import json
-import matplotlib.pyplot as plt
+from joblib import Parallel, delayed
+
+from hotspot_clusters import ClusterTable, rank_clusters
+from model_registry import artifact_path, atomic_joblib_dump, atomic_json_dump, publishing
+from report_store import ReportStore
+from spatial_index import INDEX_FILE, GridIndex
 
 def generate_waste_location_data(n_reports=500):
     """
     Generate synthetic waste report location data
     In production, this comes from actual waste reports in database
+    
+    70% of the reports scatter around four hotspot areas of the city, the
+    rest are spread uniformly (see synthetic_data.iter_reports).
     """
-    np.random.seed(42)
-    
-    # Simulate multiple hotspot areas in a city
-    hotspot_centers = [
-        (19.0760, 72.8777),  # Mumbai Central
-        (19.1136, 72.8697),  # Dadar
-        (19.0596, 72.8295),  # Marine Drive
-        (19.2183, 72.9781),  # Thane
-    ]
+    from synthetic_data import generate_reports
     
-    reports = []
-    
-    for i in range(n_reports):
-        # 70% reports near hotspots, 30% random
-        if np.random.random() < 0.7:
-            center = hotspot_centers[np.random.randint(0, len(hotspot_centers))]
-            lat = center[0] + np.random.normal(0, 0.02)
-            lng = center[1] + np.random.normal(0, 0.02)
-        else:
-            lat = 19.0 + np.random.uniform(0, 0.3)
-            lng = 72.8 + np.random.uniform(0, 0.3)
-        
-        reports.append({
-            'report_id': f'R{i+1:04d}',
-            'latitude': lat,
-            'longitude': lng,
-            'waste_amount_kg': np.random.uniform(5, 100),
-            'severity': np.random.randint(1, 6),  # 1-5 scale
-            'report_date': pd.Timestamp.now() - pd.Timedelta(days=np.random.randint(0, 90))
-        })
+    return generate_reports(n_reports, seed=42)
+
+# Above this many reports, training switches to the scalable mode
+SCALABLE_MIN_REPORTS = 50000
+
+# Reports sampled for each silhouette estimate in the scalable mode
+SILHOUETTE_SAMPLE_SIZE = 10000
+
+def _make_kmeans(k, scalable, random_state=42):
+    """
+    Full K-Means, or MiniBatchKMeans for the scalable mode
+    """
+    if scalable:
+        return MiniBatchKMeans(
+            n_clusters=k, random_state=random_state, n_init=3,
+            batch_size=4096, max_no_improvement=20
+        )
+    return KMeans(n_clusters=k, random_state=random_state, n_init=10)
+
+def sampled_silhouette_score(data, labels, sample_size=SILHOUETTE_SAMPLE_SIZE,
+                             random_state=42, chunk_size=1000):
+    """
+    Silhouette score of a random sample of the points
     
-    df = pd.DataFrame(reports)
-    return df
+    Same definition as sklearn's silhouette_score on the sample, but the
+    per-cluster distance sums come from chunked matrix products, so memory
+    stays at chunk_size x sample_size and 10k points take well under a second.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    labels = np.asarray(labels)
+    if sample_size is not None and sample_size < len(data):
+        idx = np.random.RandomState(random_state).choice(len(data), sample_size, replace=False)
+        data, labels = data[idx], labels[idx]
+    
+    cluster_ids, labels = np.unique(labels, return_inverse=True)
+    n_clusters = len(cluster_ids)
+    if not 2 <= n_clusters <= len(data) - 1:
+        raise ValueError(f"Silhouette needs 2 to n_samples - 1 clusters, got {n_clusters}")
+    
+    one_hot = np.zeros((len(data), n_clusters), dtype=np.float32)
+    one_hot[np.arange(len(data)), labels] = 1.0
+    sizes = one_hot.sum(axis=0)
+    sq_norms = np.einsum('ij,ij->i', data, data)
+    
+    scores = np.empty(len(data))
+    for start in range(0, len(data), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        sq_dist = sq_norms[chunk, None] + sq_norms[None, :] - 2 * data[chunk] @ data.T
+        # float32 square roots are twice as fast and plenty for an averaged score
+        dist = np.sqrt(np.maximum(sq_dist, 0).astype(np.float32))
+        dist_sums = (dist @ one_hot).astype(np.float64)
+        
+        own = labels[chunk]
+        rows = np.arange(len(own))
+        own_size = sizes[own]
+        a = dist_sums[rows, own] / np.maximum(own_size - 1, 1)
+        mean_other = dist_sums / sizes
+        mean_other[rows, own] = np.inf
+        b = mean_other.min(axis=1)
+        s = (b - a) / np.maximum(a, b)
+        # sklearn convention: points alone in their cluster score 0
+        scores[chunk] = np.where(own_size > 1, np.nan_to_num(s), 0.0)
+    
+    return float(scores.mean())
+
+def _score_k(data, k, scalable, silhouette_sample_size, random_state):
+    kmeans = _make_kmeans(k, scalable, random_state).fit(data)
+    if silhouette_sample_size is None:
+        silhouette = silhouette_score(data, kmeans.labels_)
+    else:
+        silhouette = sampled_silhouette_score(
+            data, kmeans.labels_, sample_size=silhouette_sample_size, random_state=random_state
+        )
+    return kmeans.inertia_, silhouette
 
-def find_optimal_clusters(data, max_clusters=10):
+def find_optimal_clusters(data, max_clusters=10, scalable=False,
+                          silhouette_sample_size=None, n_jobs=1, random_state=42):
     """
     Find optimal number of clusters using elbow method and silhouette score
-    """
-    inertias = []
-    silhouette_scores = []
     
-    for k in range(2, max_clusters + 1):
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-        kmeans.fit(data)
-        inertias.append(kmeans.inertia_)
-        silhouette_scores.append(silhouette_score(data, kmeans.labels_))
+    scalable: fit MiniBatchKMeans instead of full K-Means for every k
+    silhouette_sample_size: estimate each silhouette score on this many
+    sampled points instead of all of them (exact score is O(n^2))
+    n_jobs: evaluate the candidate k values in parallel processes
+    """
+    ks = list(range(2, max_clusters + 1))
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_score_k)(data, k, scalable, silhouette_sample_size, random_state) for k in ks
+    )
+    inertias = [float(inertia) for inertia, _ in scores]
+    silhouette_scores = [float(silhouette) for _, silhouette in scores]
     
     # Find optimal k (highest silhouette score)
     optimal_k = silhouette_scores.index(max(silhouette_scores)) + 2
     
     return optimal_k, inertias, silhouette_scores
 
-def train_hotspot_detector(df=None):
+def compute_cluster_statistics(df, n_clusters):
+    """
+    Per-cluster statistics in one grouped pass over the reports
+    
+    Sorted by priority score, with High/Medium/Low priority levels.
+    """
+    grouped = df.groupby('cluster', sort=True).agg(
+        num_reports=('cluster', 'size'),
+        avg_latitude=('latitude', 'mean'),
+        avg_longitude=('longitude', 'mean'),
+        total_waste_kg=('waste_amount_kg', 'sum'),
+        avg_waste_kg=('waste_amount_kg', 'mean'),
+        avg_severity=('severity', 'mean'),
+    )
+    grouped['priority_score'] = (
+        grouped['num_reports'] * grouped['avg_severity'] * grouped['avg_waste_kg'] / 100
+    )
+    
+    cluster_stats = [
+        {
+            'cluster_id': int(cluster_id),
+            'num_reports': int(row.num_reports),
+            'avg_latitude': float(row.avg_latitude),
+            'avg_longitude': float(row.avg_longitude),
+            'total_waste_kg': float(row.total_waste_kg),
+            'avg_severity': float(row.avg_severity),
+            'priority_score': float(row.priority_score)
+        }
+        for cluster_id, row in zip(grouped.index, grouped.itertuples(index=False))
+    ]
+    
+    return rank_clusters(cluster_stats, n_clusters)
+
+def build_report_index(df):
+    """
+    Grid spatial index over the report coordinates, with report id and cluster
+    """
+    report_ids = df['report_id'] if 'report_id' in df else pd.Series(df.index)
+    return GridIndex.build(
+        df['latitude'].to_numpy(dtype=float),
+        df['longitude'].to_numpy(dtype=float),
+        report_id=report_ids.astype(str).to_numpy(dtype=str),
+        cluster=df['cluster'].to_numpy(dtype=np.int32)
+    )
+
+def load_training_reports(df=None, store=None, start=None, end=None):
+    """
+    Reports to train on: df, else the reports in the store dated in
+    [start, end], else generated sample data
+    
+    store: a ReportStore or the path of one
+    """
+    if df is not None:
+        return df
+    if store is not None:
+        if not isinstance(store, ReportStore):
+            store = ReportStore(store)
+        df = store.read_frame(start=start, end=end)
+        print(f"Loaded {len(df)} reports from the report store ({store.path})")
+        return df
+    print("Generating sample waste report data...")
+    return generate_waste_location_data(n_reports=500)
+
+def train_hotspot_detector(df=None, scalable=None, silhouette_sample_size=SILHOUETTE_SAMPLE_SIZE,
+                           n_jobs=None, store=None, start=None, end=None):
     """
     Train waste hotspot detection model using K-Means clustering
+    
+    df / store, start, end: training reports (see load_training_reports)
+    scalable: MiniBatchKMeans, sampled silhouette scores and a parallel
+    k sweep; by default used from SCALABLE_MIN_REPORTS reports upwards
+    silhouette_sample_size: points per silhouette estimate in scalable mode
+    n_jobs: parallel processes for the k sweep (default: all CPUs when scalable)
     """
-    if df is None:
-        print("Generating sample waste report data...")
-        df = generate_waste_location_data(n_reports=500)
+    df = load_training_reports(df, store, start, end)
+    if len(df) < 3:
+        raise ValueError(f"Need at least 3 reports to find hotspots, got {len(df)}")
+    
+    if scalable is None:
+        scalable = len(df) >= SCALABLE_MIN_REPORTS
+    if n_jobs is None:
+        n_jobs = -1 if scalable else 1
+    sample_size = silhouette_sample_size if scalable else None
     
     # Features for clustering
     feature_columns = ['latitude', 'longitude', 'waste_amount_kg', 'severity']
@@ -91,48 +222,24 @@ def train_hotspot_detector(df=None):
     X_scaled = scaler.fit_transform(X)
     
     # Find optimal number of clusters
-    print("Finding optimal number of clusters...")
-    optimal_k, inertias, silhouette_scores = find_optimal_clusters(X_scaled, max_clusters=10)
+    mode = "scalable mode, " if scalable else ""
+    print(f"Finding optimal number of clusters ({mode}{len(df)} reports)...")
+    optimal_k, inertias, silhouette_scores = find_optimal_clusters(
+        X_scaled, max_clusters=min(10, len(df) - 1), scalable=scalable,
+        silhouette_sample_size=sample_size, n_jobs=n_jobs
+    )
     print(f"Optimal number of clusters: {optimal_k}")
     
     # Train K-Means with optimal k
     print(f"\nTraining K-Means Clustering Model with {optimal_k} clusters...")
-    kmeans = KMeans(n_clusters=optimal_k, random_state=42, n_init=10)
+    kmeans = _make_kmeans(optimal_k, scalable)
     clusters = kmeans.fit_predict(X_scaled)
     
     # Add cluster labels to dataframe
     df['cluster'] = clusters
     
     # Calculate cluster statistics
-    cluster_stats = []
-    for cluster_id in range(optimal_k):
-        cluster_data = df[df['cluster'] == cluster_id]
-        
-        stats = {
-            'cluster_id': int(cluster_id),
-            'num_reports': len(cluster_data),
-            'avg_latitude': float(cluster_data['latitude'].mean()),
-            'avg_longitude': float(cluster_data['longitude'].mean()),
-            'total_waste_kg': float(cluster_data['waste_amount_kg'].sum()),
-            'avg_severity': float(cluster_data['severity'].mean()),
-            'priority_score': float(
-                len(cluster_data) * cluster_data['severity'].mean() * 
-                cluster_data['waste_amount_kg'].mean() / 100
-            )
-        }
-        cluster_stats.append(stats)
-    
-    # Sort by priority score
-    cluster_stats = sorted(cluster_stats, key=lambda x: x['priority_score'], reverse=True)
-    
-    # Assign priority levels
-    for i, stats in enumerate(cluster_stats):
-        if i < optimal_k // 3:
-            stats['priority'] = 'High'
-        elif i < 2 * optimal_k // 3:
-            stats['priority'] = 'Medium'
-        else:
-            stats['priority'] = 'Low'
+    cluster_stats = compute_cluster_statistics(df, optimal_k)
     
     print("\n✓ Hotspot Detection Model Trained!")
     print("\nCluster Statistics (Sorted by Priority):")
@@ -146,20 +253,21 @@ def train_hotspot_detector(df=None):
         print(f"  Priority Score: {stats['priority_score']:.2f}")
     
     # Silhouette score
-    silhouette_avg = silhouette_score(X_scaled, clusters)
+    if scalable:
+        silhouette_avg = sampled_silhouette_score(X_scaled, clusters, sample_size=sample_size)
+    else:
+        silhouette_avg = silhouette_score(X_scaled, clusters)
     print(f"\nModel Quality (Silhouette Score): {silhouette_avg:.4f}")
     
     # Save model, scaler, and statistics
-    joblib.dump(kmeans, 'hotspot_model.pkl')
-    joblib.dump(scaler, 'hotspot_scaler.pkl')
-    
-    with open('hotspot_features.json', 'w') as f:
-        json.dump(feature_columns + ['recency_weight'], f)
-    
-    with open('cluster_statistics.json', 'w') as f:
-        json.dump(cluster_stats, f)
+    with publishing('hotspot'):
+        atomic_joblib_dump(kmeans, 'hotspot_model.pkl')
+        atomic_joblib_dump(scaler, 'hotspot_scaler.pkl')
+        atomic_json_dump(feature_columns + ['recency_weight'], 'hotspot_features.json')
+        atomic_json_dump(cluster_stats, 'cluster_statistics.json')
+        build_report_index(df).save(INDEX_FILE)
     
-    print("\n✓ Model, scaler, and statistics saved!")
+    print("\n✓ Model, scaler, statistics and spatial index saved!")
     
     return kmeans, scaler, cluster_stats, df
 
@@ -170,13 +278,13 @@ def predict_waste_hotspots(new_reports):
     new_reports: list of dicts with keys ['latitude', 'longitude', 'waste_amount_kg', 'severity', 'report_date']
     """
     # Load model, scaler, and features
-    kmeans = joblib.load('hotspot_model.pkl')
-    scaler = joblib.load('hotspot_scaler.pkl')
+    kmeans = joblib.load(artifact_path('hotspot_model.pkl'))
+    scaler = joblib.load(artifact_path('hotspot_scaler.pkl'))
     
-    with open('hotspot_features.json', 'r') as f:
+    with open(artifact_path('hotspot_features.json'), 'r') as f:
         features = json.load(f)
     
-    with open('cluster_statistics.json', 'r') as f:
+    with open(artifact_path('cluster_statistics.json'), 'r') as f:
         cluster_stats = json.load(f)
     
     # Prepare data
@@ -192,17 +300,25 @@ def predict_waste_hotspots(new_reports):
     # Predict clusters
     predictions = kmeans.predict(X_scaled)
     
+    # Indexed cluster lookup and vectorized distance to each hotspot center
+    table = ClusterTable(cluster_stats)
+    rows = table.rows(predictions)
+    distances = table.distances_km(
+        rows, df['latitude'].to_numpy(dtype=float), df['longitude'].to_numpy(dtype=float)
+    )
+    
     results = []
-    for i, cluster_id in enumerate(predictions):
-        # Find cluster stats
-        stats = next((s for s in cluster_stats if s['cluster_id'] == cluster_id), None)
+    for i, (cluster_id, row, distance) in enumerate(
+        zip(predictions.tolist(), rows.tolist(), distances.tolist())
+    ):
+        stats = table.records[row] if row >= 0 else None
         
         result = {
             'report_index': i,
-            'cluster_id': int(cluster_id),
+            'cluster_id': cluster_id,
             'priority': stats['priority'] if stats else 'Unknown',
             'hotspot_location': (stats['avg_latitude'], stats['avg_longitude']) if stats else None,
-            'distance_to_center_km': None  # Calculate if needed
+            'distance_to_center_km': round(distance, 3) if stats else None
         }
         results.append(result)
     
@@ -212,7 +328,7 @@ def get_top_priority_hotspots(top_n=5):
     """
     Get top N priority hotspots for cleanup planning
     """
-    with open('cluster_statistics.json', 'r') as f:
+    with open(artifact_path('cluster_statistics.json'), 'r') as f:
         cluster_stats = json.load(f)
     
     # Already sorted by priority score
@@ -237,6 +353,8 @@ def visualize_hotspots(df):
     """
     Create visualization of waste hotspots
     """
+    import matplotlib.pyplot as plt
+    
     plt.figure(figsize=(12, 8))
     
     # Scatter plot colored by cluster
@@ -256,7 +374,7 @@ def visualize_hotspots(df):
     plt.grid(True, alpha=0.3)
     
     # Add cluster centers
-    with open('cluster_statistics.json', 'r') as f:
+    with open(artifact_path('cluster_statistics.json'), 'r') as f:
         cluster_stats = json.load(f)
     
     for stats in cluster_stats:
@@ -282,8 +400,16 @@ def visualize_hotspots(df):
     plt.close()
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train the waste hotspot detector")
+    parser.add_argument('--store', help="train on the reports in this report store")
+    parser.add_argument('--start', help="first report date to train on (with --store)")
+    parser.add_argument('--end', help="last report date to train on (with --store)")
+    args = parser.parse_args()
+    
     # Train model
-    kmeans, scaler, stats, df = train_hotspot_detector()
+    kmeans, scaler, stats, df = train_hotspot_detector(store=args.store, start=args.start, end=args.end)
     
     # Visualize
     visualize_hotspots(df)